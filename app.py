@@ -3,28 +3,89 @@ API Flask para el procesamiento OCR
 Expone endpoints para que la interfaz web pueda procesar imágenes
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, request, jsonify
 from flask_cors import CORS
+import io
 import os
 import tempfile
 import shutil
+import threading
+import time
 from datetime import datetime
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 import logging
 
 # Importar funciones del script original
 from procesar_ocr import (
-    preprocess_image, 
-    perform_ocr, 
+    recognize_image,
+    recognize_cascade,
+    DUPLICATE_EVENT,
     clean_ocr_artifacts,
     reconstruct_broken_words,
     spell_check_text,
-    ocr_engine
+    ocr_engines,
+    get_inference_client,
+    get_search_index
 )
-from config import PREPROCESS_CONFIG, CONFIDENCE_THRESHOLD, MIN_TEXT_LENGTH, PERFILES
+from config import (
+    PREPROCESS_CONFIG, CONFIDENCE_THRESHOLD, MIN_TEXT_LENGTH, PERFILES,
+    OCR_LANGUAGES, OCR_WARMUP_LANGUAGES, OCR_TEXTLINE_ORIENTATION,
+    JOBS_FOLDER, JOB_WORKERS, JOB_LEASE_SECONDS, JOB_RETENTION_HOURS, CASCADE_ENABLED,
+    DUPLICATE_DETECTION, DUPLICATE_MAX_DISTANCE, DUPLICATE_MIN_SIMILARITY
+)
+from trabajos import JobManager
+from duplicados import DuplicateIndex, image_thumbnail
+from paginas import iter_page_refs
+from metricas import EVENT_PREFIX, MetricsRegistry, collect, span
+
+# Configuración
+UPLOAD_FOLDER = tempfile.gettempdir()
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'bmp', 'tiff', 'tif', 'pdf'}
+MAX_FILE_SIZE = 20 * 1024 * 1024  # 20MB por archivo
+MAX_REQUEST_SIZE = 200 * 1024 * 1024  # 200MB por pedido (todos los archivos juntos)
+# Documentos de varias páginas: se pasan al disco para leerlos de a una página (ver paginas.py)
+MULTIPAGE_EXTENSIONS = {'tiff', 'tif', 'pdf'}
+MAX_SEARCH_RESULTS = 100
+
+class UploadStream(io.BytesIO):
+    """
+    Destino en memoria de un archivo subido, con límite de tamaño.
+
+    Werkzeug escribe acá el archivo a medida que lo lee del pedido. Al pasar
+    el límite deja de guardarlo (y descarta lo recibido), así que un archivo
+    demasiado grande no ocupa memoria ni disco y se rechaza sin leerlo entero
+    dos veces.
+    """
+
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+        self.received = 0
+        self.too_large = False
+
+    def write(self, data):
+        self.received += len(data)
+        if self.too_large:
+            return len(data)
+        if self.received > self.limit:
+            self.too_large = True
+            self.seek(0)
+            self.truncate()
+            return len(data)
+        return super().write(data)
+
+class UploadRequest(Request):
+    """Pedido cuyos archivos subidos quedan en memoria (UploadStream) en lugar de un temporal."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadStream(MAX_FILE_SIZE)
 
 # Configurar Flask
 app = Flask(__name__)
+app.request_class = UploadRequest
+# Los pedidos más grandes se rechazan con 413 antes de leerlos (o apenas se pasan, si no informan el tamaño)
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_SIZE
 CORS(app)  # Permitir peticiones desde el frontend
 
 # Configurar logging
@@ -34,10 +95,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Configuración
-UPLOAD_FOLDER = tempfile.gettempdir()
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'bmp', 'tiff', 'tif'}
-MAX_FILE_SIZE = 20 * 1024 * 1024  # 20MB
+
+# Tiempos por perfil y etapa, expuestos en /metrics (uno por proceso del servidor)
+metrics_registry = MetricsRegistry()
 
 def allowed_file(filename):
     """Verificar si el archivo tiene una extensión válida"""
@@ -111,12 +171,33 @@ def index():
                 <p>Procesar imágenes con OCR</p>
                 <p>Parámetros:</p>
                 <ul>
-                    <li><code>files</code>: Archivos de imagen</li>
+                    <li><code>files</code>: Archivos de imagen, TIFF o PDF de varias páginas</li>
                     <li><code>profile</code>: HISTORICOS o ALTA_CALIDAD</li>
                     <li><code>language</code>: es o en</li>
                 </ul>
             </div>
             
+            <div class="endpoint">
+                <strong>POST /jobs</strong>
+                <p>Crear un trabajo OCR asíncrono (mismos parámetros que <code>/process</code>). Responde de inmediato con un <code>job_id</code></p>
+            </div>
+            
+            <div class="endpoint">
+                <strong>GET /jobs/&lt;id&gt;</strong>
+                <p>Avance del trabajo página por página. El texto se obtiene en <code>GET /jobs/&lt;id&gt;/result</code></p>
+            </div>
+            
+            <div class="endpoint">
+                <strong>GET /search?q=</strong>
+                <p>Buscar en las transcripciones de <code>texto/</code> (sin distinguir acentos ni mayúsculas)</p>
+                <p>Parámetros opcionales: <code>folder</code> (una carpeta), <code>limit</code> (resultados, 20 por defecto)</p>
+            </div>
+            
+            <div class="endpoint">
+                <strong>GET /metrics</strong>
+                <p>Tiempos por perfil y etapa, páginas procesadas, fallas y profundidad de la cola (formato Prometheus)</p>
+            </div>
+            
             <div class="endpoint">
                 <strong>GET /profiles</strong>
                 <p>Obtener perfiles de procesamiento disponibles</p>
@@ -141,11 +222,151 @@ def index():
 @app.route('/health', methods=['GET'])
 def health_check():
     """Endpoint para verificar que el servidor está funcionando"""
-    return jsonify({
+    respuesta = {
         'status': 'ok',
         'message': 'Servidor OCR funcionando correctamente',
-        'timestamp': datetime.now().isoformat()
-    })
+        'timestamp': datetime.now().isoformat(),
+        'engines_loaded': [language for language, _ in ocr_engines.loaded()],
+        'inference_server': None
+    }
+    # Con el servidor de inferencia compartido los motores están en él: se le pregunta
+    inference_client = get_inference_client()
+    if inference_client is None:
+        return jsonify(respuesta)
+    try:
+        estado = inference_client.status()
+    except (ConnectionError, TimeoutError) as e:
+        respuesta.update(status='degraded', message=f'El servidor de inferencia no responde: {e}',
+                         engines_loaded=[],
+                         inference_server={'address': inference_client.address, 'reachable': False})
+        return jsonify(respuesta), 503
+    respuesta['engines_loaded'] = estado.pop('engines_loaded', [])
+    respuesta['inference_server'] = {'address': inference_client.address, 'reachable': True, **estado}
+    return jsonify(respuesta)
+
+def _read_form():
+    """
+    Valida los archivos, el perfil y el idioma de un formulario de /process o /jobs.
+    
+    Retorna:
+    - (files, profile, language, None) si es válido
+    - (None, None, None, respuesta_de_error) si no
+    """
+    # Leer el formulario: los pedidos de más de MAX_REQUEST_SIZE se cortan acá
+    try:
+        request.files
+    except RequestEntityTooLarge:
+        return None, None, None, (jsonify({
+            'error': f'El pedido supera el máximo de {MAX_REQUEST_SIZE // (1024 * 1024)} MB'}), 413)
+    
+    # Verificar que se enviaron archivos
+    if 'files' not in request.files:
+        return None, None, None, (jsonify({'error': 'No se enviaron archivos'}), 400)
+    
+    files = request.files.getlist('files')
+    if not files or len(files) == 0:
+        return None, None, None, (jsonify({'error': 'La lista de archivos está vacía'}), 400)
+    
+    # Obtener configuración
+    profile = request.form.get('profile', 'HISTORICOS')
+    language = request.form.get('language', 'es')
+    
+    # Validar perfil
+    if profile not in PERFILES:
+        return None, None, None, (jsonify({'error': f'Perfil inválido: {profile}'}), 400)
+    
+    # Validar idioma
+    if language not in OCR_LANGUAGES:
+        return None, None, None, (jsonify({'error': f'Idioma inválido: {language}'}), 400)
+    
+    # Descartar archivos vacíos o con extensión no válida
+    valid_files = []
+    for file in files:
+        if not file or file.filename == '':
+            continue
+        if not allowed_file(file.filename):
+            logger.warning(f"Archivo ignorado (extensión no válida): {file.filename}")
+            continue
+        if getattr(file.stream, 'too_large', False):
+            logger.warning(f"Archivo muy grande: {file.filename} ({file.stream.received / (1024 * 1024):.1f} MB)")
+            continue
+        valid_files.append(file)
+    
+    return valid_files, profile, language, None
+
+def _recognize_file(path, profile, language):
+    """
+    Preprocesa y reconoce una imagen con el perfil pedido (reutiliza la caché).
+    Con CASCADE_ENABLED el preprocesamiento lo decide la cascada de confianza.
+    'path' es la ruta de la página o los bytes de la imagen subida.
+    
+    Retorna:
+    - lines: Líneas que superan el umbral de confianza y el largo mínimo del perfil
+    - recognized: Si el OCR encontró alguna línea
+    """
+    perfil_config = PERFILES[profile]
+    confidence_threshold = perfil_config['confidence_threshold']
+    min_text_length = perfil_config['min_text_length']
+    tiempos = {}
+    try:
+        with collect() as tiempos, span('total'):
+            if CASCADE_ENABLED:
+                lineas = recognize_cascade(path, confidence_threshold, language=language, save_processed=False)
+            else:
+                lineas = recognize_image(path, perfil_config['preprocess'], confidence_threshold,
+                                         language=language, save_processed=False)
+    except Exception:
+        metrics_registry.page_done(profile, ok=False)
+        raise
+    finally:
+        metrics_registry.observe(profile, tiempos)
+    metrics_registry.page_done(profile)
+    lines = [text for text, confidence, _ in lineas
+             if confidence >= confidence_threshold and len(text) >= min_text_length]
+    return {'lines': lines, 'recognized': bool(lineas)}
+
+def _build_transcript(all_text, processed_count, profile, language):
+    """Une las líneas de todas las imágenes, aplica el postprocesamiento del perfil y arma la respuesta."""
+    perfil_config = PERFILES[profile]
+    spell_check_enabled = perfil_config['spell_check_enabled']
+    spell_check_language = language if spell_check_enabled else None
+    aggressive_cleaning = perfil_config['aggressive_cleaning']
+    
+    # Unir y limpiar texto
+    full_text = '\n'.join(all_text)
+    
+    with collect() as tiempos:
+        # Aplicar limpieza de artefactos
+        with span('postprocess.clean'):
+            full_text = clean_ocr_artifacts(full_text, aggressive=aggressive_cleaning, profile=profile)
+        
+        # Reconstruir palabras partidas
+        with span('postprocess.reconstruct'):
+            lines = full_text.split('\n')
+            lines = reconstruct_broken_words(lines)
+            full_text = '\n'.join(lines)
+        
+        # Aplicar corrección ortográfica si está habilitada
+        if spell_check_enabled and spell_check_language:
+            try:
+                with span('postprocess.spell'):
+                    full_text = spell_check_text(full_text, spell_check_language)
+            except Exception as e:
+                logger.warning(f"Error en corrección ortográfica: {e}")
+    # El postprocesamiento se mide una vez por transcripción (todas las páginas juntas)
+    metrics_registry.observe(profile, tiempos)
+    
+    # Generar nombre de archivo
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_filename = f'transcripcion_{timestamp}.txt'
+    
+    return {
+        'text': full_text,
+        'filename': output_filename,
+        'files_processed': processed_count,
+        'profile': profile,
+        'language': language
+    }
 
 @app.route('/process', methods=['POST'])
 def process_images():
@@ -160,124 +381,86 @@ def process_images():
     Retorna:
     - text: Texto extraído
     - filename: Nombre sugerido para el archivo de salida
+    - duplicates: Páginas casi idénticas a otra del pedido {copia: original};
+      reusan el texto de la original sin pasar por el OCR
+    - pages_skipped: Cantidad de páginas duplicadas
     """
     try:
-        # Verificar que se enviaron archivos
-        if 'files' not in request.files:
-            return jsonify({'error': 'No se enviaron archivos'}), 400
-        
-        files = request.files.getlist('files')
-        if not files or len(files) == 0:
-            return jsonify({'error': 'La lista de archivos está vacía'}), 400
-        
-        # Obtener configuración
-        profile = request.form.get('profile', 'HISTORICOS')
-        language = request.form.get('language', 'es')
-        
-        # Validar perfil
-        if profile not in PERFILES:
-            return jsonify({'error': f'Perfil inválido: {profile}'}), 400
-        
-        # Obtener configuración del perfil
-        perfil_config = PERFILES[profile]
-        preprocess_config = perfil_config['preprocess']
-        confidence_threshold = perfil_config['confidence_threshold']
-        min_text_length = perfil_config['min_text_length']
-        spell_check_enabled = perfil_config['spell_check_enabled']
-        spell_check_language = language if spell_check_enabled else None
-        aggressive_cleaning = perfil_config['aggressive_cleaning']
+        files, profile, language, error = _read_form()
+        if error is not None:
+            return error
         
         logger.info(f"Procesando {len(files)} archivo(s) con perfil {profile} e idioma {language}")
         
         # Crear directorio temporal para procesamiento
         temp_dir = tempfile.mkdtemp()
-        processed_dir = os.path.join(temp_dir, 'processed')
-        os.makedirs(processed_dir, exist_ok=True)
         
         all_text = []
         processed_count = 0
+        # Páginas casi idénticas a otra del mismo pedido: reusan su resultado sin OCR
+        indice_duplicados = DuplicateIndex(DUPLICATE_MAX_DISTANCE, DUPLICATE_MIN_SIMILARITY)
+        resultados = {}
+        duplicates = {}
         
         try:
             # Procesar cada archivo
-            for file in files:
-                if not file or file.filename == '':
-                    continue
-                
-                if not allowed_file(file.filename):
-                    logger.warning(f"Archivo ignorado (extensión no válida): {file.filename}")
-                    continue
-                
-                # Guardar archivo temporal
+            for numero, file in enumerate(files):
                 filename = secure_filename(file.filename)
-                temp_path = os.path.join(temp_dir, filename)
-                file.save(temp_path)
-                
-                # Verificar tamaño
-                if os.path.getsize(temp_path) > MAX_FILE_SIZE:
-                    logger.warning(f"Archivo muy grande: {filename}")
-                    continue
-                
                 logger.info(f"Procesando: {filename}")
                 
-                # Preprocesar imagen
-                try:
-                    preprocessed_path = os.path.join(processed_dir, filename)
-                    preprocessed_img = preprocess_image(temp_path, **preprocess_config)
-                    
-                    import cv2
-                    cv2.imwrite(preprocessed_path, preprocessed_img)
-                    
-                    # Realizar OCR
-                    results = ocr_engine.ocr(preprocessed_path, cls=True)
-                    
-                    if results and results[0]:
-                        for line in results[0]:
-                            if line and len(line) >= 2:
-                                text, confidence = line[1]
-                                
-                                if confidence >= confidence_threshold and len(text) >= min_text_length:
-                                    all_text.append(text)
+                # El archivo ya está en memoria (UploadStream): las imágenes se
+                # decodifican desde ahí, sin escribirlas en disco ni volver a leerlas
+                data = file.stream.getvalue()
+                if filename.rsplit('.', 1)[-1].lower() in MULTIPAGE_EXTENSIONS:
+                    # Los TIFF y PDF de varias páginas se decodifican de a una desde el disco
+                    temp_path = os.path.join(temp_dir, f"{numero:04d}_{filename}")
+                    with open(temp_path, 'wb') as f:
+                        f.write(data)
+                    try:
+                        # 'doc.pdf#p2' para la página 2 de doc.pdf
+                        paginas = [(filename + ref[len(temp_path):], ref) for ref in iter_page_refs(temp_path)]
+                    except Exception as e:
+                        logger.error(f"No se pudo abrir {filename}: {e}")
+                        continue
+                else:
+                    paginas = [(filename, data)]
+                
+                # Preprocesar y reconocer página por página
+                for nombre, pagina in paginas:
+                    try:
+                        clave = f"{numero}:{nombre}"
+                        original = None
+                        if DUPLICATE_DETECTION:
+                            thumb = image_thumbnail(pagina)
+                            if thumb is not None:
+                                original = indice_duplicados.check(clave, thumb, keep_thumbnail=True)
+                        if original is not None and original in resultados:
+                            duplicates[nombre] = original.split(':', 1)[1]
+                            logger.info(f"{nombre} es un duplicado de {duplicates[nombre]}: no pasa por el OCR")
+                            metrics_registry.observe(profile, {EVENT_PREFIX + DUPLICATE_EVENT: 1})
+                            resultado = resultados[original]
+                        else:
+                            resultado = _recognize_file(pagina, profile, language)
+                            resultados[clave] = resultado
+                        all_text.extend(resultado['lines'])
+                        if resultado['recognized']:
+                            processed_count += 1
                         
-                        processed_count += 1
-                    
-                except Exception as e:
-                    logger.error(f"Error procesando {filename}: {e}")
-                    continue
+                    except Exception as e:
+                        logger.error(f"Error procesando {nombre}: {e}")
+                        continue
             
             if processed_count == 0:
                 return jsonify({'error': 'No se pudo procesar ningún archivo'}), 400
             
-            # Unir y limpiar texto
-            full_text = '\n'.join(all_text)
-            
-            # Aplicar limpieza de artefactos
-            full_text = clean_ocr_artifacts(full_text, aggressive=aggressive_cleaning)
+            respuesta = _build_transcript(all_text, processed_count, profile, language)
+            respuesta['duplicates'] = duplicates
+            respuesta['pages_skipped'] = len(duplicates)
             
-            # Reconstruir palabras partidas
-            lines = full_text.split('\n')
-            lines = reconstruct_broken_words(lines)
-            full_text = '\n'.join(lines)
+            logger.info(f"Procesamiento completado exitosamente. {processed_count} archivo(s) procesado(s)"
+                        f"{f', {len(duplicates)} duplicado(s) sin OCR' if duplicates else ''}")
             
-            # Aplicar corrección ortográfica si está habilitada
-            if spell_check_enabled and spell_check_language:
-                try:
-                    full_text = spell_check_text(full_text, spell_check_language)
-                except Exception as e:
-                    logger.warning(f"Error en corrección ortográfica: {e}")
-            
-            # Generar nombre de archivo
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            output_filename = f'transcripcion_{timestamp}.txt'
-            
-            logger.info(f"Procesamiento completado exitosamente. {processed_count} archivo(s) procesado(s)")
-            
-            return jsonify({
-                'text': full_text,
-                'filename': output_filename,
-                'files_processed': processed_count,
-                'profile': profile,
-                'language': language
-            })
+            return jsonify(respuesta)
         
         finally:
             # Limpiar archivos temporales
@@ -290,6 +473,151 @@ def process_images():
         logger.error(f"Error en proceso OCR: {e}", exc_info=True)
         return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
 
+def _process_job_page(path, job):
+    """Procesa una página de un trabajo asíncrono (se ejecuta en la cola)."""
+    return _recognize_file(path, job['perfil'], job['idioma'])
+
+def _finalize_job(job, paginas):
+    """Arma la transcripción de un trabajo con los resultados de todas sus páginas."""
+    all_text = []
+    processed_count = 0
+    for _, datos in paginas:
+        if datos is None:
+            continue
+        all_text.extend(datos['lines'])
+        if datos['recognized']:
+            processed_count += 1
+    if processed_count == 0:
+        raise ValueError('No se pudo procesar ningún archivo')
+    return _build_transcript(all_text, processed_count, job['perfil'], job['idioma'])
+
+# Cola de trabajos asíncronos (ver trabajos.py): sobrevive a reinicios del servidor
+job_manager = JobManager(
+    os.path.join(JOBS_FOLDER, 'trabajos.sqlite'),
+    JOBS_FOLDER,
+    _process_job_page,
+    _finalize_job,
+    workers=JOB_WORKERS,
+    lease_seconds=JOB_LEASE_SECONDS,
+    retention_hours=JOB_RETENTION_HOURS,
+    split_pages=iter_page_refs
+)
+
+def start_background_workers():
+    """
+    Arranca los hilos de cada proceso del servidor: la cola de trabajos y la
+    precarga de los motores OCR pedidos (sin demorar el arranque).
+
+    No se hace al importar el módulo: los hilos no sobreviven a un fork, así
+    que con gunicorn se llama en cada worker (post_worker_init en
+    gunicorn.conf.py) y con python app.py, al iniciar.
+    """
+    job_manager.start()
+    # Con el servidor de inferencia compartido los motores los precarga él (ver gunicorn.conf.py)
+    if OCR_WARMUP_LANGUAGES and get_inference_client() is None:
+        threading.Thread(
+            target=ocr_engines.warm_up,
+            args=(OCR_WARMUP_LANGUAGES, OCR_TEXTLINE_ORIENTATION),
+            name="ocr-warmup",
+            daemon=True
+        ).start()
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """
+    Crea un trabajo OCR asíncrono y responde de inmediato.
+    
+    Recibe los mismos campos que /process (files, profile, language).
+    
+    Retorna (202):
+    - job_id: Identificador del trabajo
+    - status_url: URL para consultar el avance
+    - pages: Cantidad de páginas encoladas
+    """
+    try:
+        files, profile, language, error = _read_form()
+        if error is not None:
+            return error
+        
+        job_id, pages = job_manager.create_job(profile, language, files)
+        if job_id is None:
+            return jsonify({'error': 'No se pudo procesar ningún archivo'}), 400
+        
+        return jsonify({
+            'job_id': job_id,
+            'status': 'en_cola',
+            'status_url': f'/jobs/{job_id}',
+            'result_url': f'/jobs/{job_id}/result',
+            'pages': pages
+        }), 202
+    
+    except Exception as e:
+        logger.error(f"Error creando trabajo OCR: {e}", exc_info=True)
+        return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Estado de un trabajo con el avance página por página"""
+    status = job_manager.get_status(job_id)
+    if status is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    return jsonify(status)
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """
+    Resultado de un trabajo (mismo formato que /process).
+    Responde 202 si todavía no terminó.
+    """
+    resultado = job_manager.get_result(job_id)
+    if resultado is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    estado, datos, error = resultado
+    if estado == 'completado':
+        return jsonify(datos)
+    if estado == 'fallido':
+        return jsonify({'error': error or 'Error al procesar los archivos'}), 400
+    return jsonify({'status': estado}), 202
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métricas en formato de texto de Prometheus: tiempos por perfil y etapa, páginas y cola"""
+    gauges = {
+        'ocr_job_queue_depth': ('Páginas pendientes o en proceso en la cola de trabajos',
+                                job_manager.queue_depth()),
+        'ocr_engines_loaded': ('Motores OCR cargados en este proceso', len(ocr_engines.loaded())),
+    }
+    return Response(metrics_registry.render_prometheus(gauges),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/search', methods=['GET'])
+def search():
+    """Buscar en el índice de las transcripciones: resultados por relevancia con un fragmento"""
+    search_index = get_search_index()
+    if search_index is None:
+        return jsonify({'error': 'El índice de búsqueda está desactivado'}), 503
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Falta el parámetro q'}), 400
+    try:
+        limit = min(max(1, int(request.args.get('limit', 20))), MAX_SEARCH_RESULTS)
+    except ValueError:
+        return jsonify({'error': 'El parámetro limit tiene que ser un número'}), 400
+    inicio = time.perf_counter()
+    resultados = search_index.search(query, limit=limit, folder=request.args.get('folder') or None)
+    return jsonify({
+        'query': query,
+        'results': [{
+            'folder': r['carpeta'],
+            'page_name': r['nombre'],
+            'file': r['archivo'],
+            'page': r['pagina'],
+            'snippet': r['fragmento'],
+            'score': r['puntaje'],
+        } for r in resultados],
+        'time_ms': round(1000 * (time.perf_counter() - inicio), 2),
+    })
+
 @app.route('/profiles', methods=['GET'])
 def get_profiles():
     """Obtener lista de perfiles disponibles"""
@@ -308,6 +636,7 @@ if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     logger.info(f"Servidor disponible en http://0.0.0.0:{port}")
     logger.info("Presiona Ctrl+C para detener el servidor")
+    start_background_workers()
     
     # Ejecutar servidor
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,134 @@
+"""
+Micro-benchmark de la limpieza de artefactos del OCR (limpieza.py).
+
+Compara la implementación original de clean_ocr_artifacts (un str.replace por
+regla y re.sub sin compilar renglón por renglón) contra las reglas compiladas
+de cada perfil, llamadas renglón por renglón y con la API por lotes.
+
+Antes de medir verifica que las tres den exactamente el mismo resultado, sobre
+los renglones de las páginas sintéticas y sobre textos aleatorios armados con
+los caracteres que usan las reglas (donde los reemplazos se encadenan).
+
+Uso:
+    python benchmarks/bench_limpieza.py [--lines 20000] [--repeat 5] [--json salida.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PERFILES  # noqa: E402
+from limpieza import CleanupRules  # noqa: E402
+from documentos import TEXTOS  # noqa: E402
+from motor_simulado import StubOCREngine  # noqa: E402
+
+def legacy_clean(text, replacements, noise_symbols, aggressive=False):
+    """clean_ocr_artifacts antes de limpieza.py (referencia)."""
+    if not text:
+        return text
+    for old, new in replacements.items():
+        text = text.replace(old, new)
+    if aggressive:
+        lines = text.split('\n')
+        cleaned_lines = []
+        for line in lines:
+            if len(line.strip()) <= 2 and not line.strip().isalpha():
+                continue
+            line = re.sub('[' + re.escape(noise_symbols) + ']', '', line)
+            line = re.sub(r'\s{2,}', ' ', line)
+            cleaned_lines.append(line)
+        text = '\n'.join(cleaned_lines)
+    return text
+
+def ocr_lines(n, seed=0):
+    """Renglones con los errores del motor simulado (n0, rn, |...)."""
+    engine = StubOCREngine(error_rate=0.08, seed=seed)
+    engine.set_page([linea for texto in TEXTOS.values() for linea in texto])
+    # Mitad blanca y mitad negra: contraste máximo, se usa error_rate tal cual
+    page = np.zeros((64, 64, 3), np.uint8)
+    page[:32] = 255
+    lines = []
+    while len(lines) < n:
+        lines.extend(engine.ocr(page)[0]['rec_texts'])
+        engine.seed += 1
+    return lines[:n]
+
+def fuzz_texts(rules, n, seed=0):
+    """Textos aleatorios con los caracteres de las reglas, espacios y saltos de línea."""
+    rng = random.Random(seed)
+    alphabet = sorted(set(''.join(rules['replacements']) + ''.join(rules['replacements'].values())
+                          + rules['noise_symbols'])) + [' ', ' ', '\n', 'a', '.']
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 30))) for _ in range(n)]
+
+def check(rules, compiled, texts, aggressive):
+    expected = [legacy_clean(t, rules['replacements'], rules['noise_symbols'], aggressive) for t in texts]
+    uno_por_uno = [compiled.clean(t, aggressive) if t else t for t in texts]
+    por_lotes = compiled.clean_batch(texts, aggressive)
+    for text, a, b, c in zip(texts, expected, uno_por_uno, por_lotes):
+        if not a == b == c:
+            raise AssertionError(f"Resultado distinto para {text!r}: original {a!r}, "
+                                 f"compilada {b!r}, por lotes {c!r}")
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run(n_lines, repeat):
+    lines = ocr_lines(n_lines)
+    reporte = {'renglones': len(lines), 'perfiles': {}}
+    for nombre, perfil in PERFILES.items():
+        rules = perfil['cleanup_rules']
+        compiled = CleanupRules(**rules)
+        for aggressive in (False, True):
+            check(rules, compiled, lines, aggressive)
+            check(rules, compiled, fuzz_texts(rules, 5000), aggressive)
+        resultado = {'reglas': len(rules['replacements']), 'grupos': compiled.groups}
+        for aggressive in (False, True):
+            original = timed(lambda: [legacy_clean(t, rules['replacements'], rules['noise_symbols'], aggressive)
+                                      for t in lines], repeat)
+            renglon = timed(lambda: [compiled.clean(t, aggressive) for t in lines], repeat)
+            lotes = timed(lambda: compiled.clean_batch(lines, aggressive), repeat)
+            resultado['agresiva' if aggressive else 'normal'] = {
+                'original_us_por_renglon': round(1e6 * original / len(lines), 3),
+                'compilada_us_por_renglon': round(1e6 * renglon / len(lines), 3),
+                'por_lotes_us_por_renglon': round(1e6 * lotes / len(lines), 3),
+                'aceleracion_por_lotes': round(original / lotes, 2),
+            }
+        reporte['perfiles'][nombre] = resultado
+    return reporte
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark de clean_ocr_artifacts')
+    parser.add_argument('--lines', type=int, default=20000, help='Renglones a limpiar')
+    parser.add_argument('--repeat', type=int, default=5, help='Repeticiones (se toma la mejor)')
+    parser.add_argument('--json', help='Guardar el reporte en este archivo')
+    args = parser.parse_args()
+
+    reporte = run(args.lines, args.repeat)
+    print(f"Resultados idénticos a la implementación original ({reporte['renglones']} renglones + textos aleatorios)\n")
+    print(f"{'perfil':<14}{'modo':<10}{'original':>12}{'compilada':>12}{'por lotes':>12}{'x':>8}   (µs por renglón)")
+    for nombre, r in reporte['perfiles'].items():
+        for modo in ('normal', 'agresiva'):
+            m = r[modo]
+            print(f"{nombre:<14}{modo:<10}{m['original_us_por_renglon']:>12}{m['compilada_us_por_renglon']:>12}"
+                  f"{m['por_lotes_us_por_renglon']:>12}{m['aceleracion_por_lotes']:>8}")
+        print(f"{'':<14}{r['reglas']} reglas en {r['grupos']} grupos")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+
+if __name__ == '__main__':
+    main()
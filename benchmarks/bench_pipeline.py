@@ -0,0 +1,219 @@
+"""
+Benchmark del pipeline completo, etapa por etapa y perfil por perfil.
+
+Genera páginas sintéticas degradadas (documentos.py) que imitan las entradas
+de cada perfil y mide por separado:
+
+    preprocess   : preprocess_image con los parámetros del perfil
+    ocr          : inferencia (motor simulado o PaddleOCR) + parse_ocr_result
+    clean        : clean_ocr_artifacts_batch sobre los renglones de la página
+    reconstruct  : reconstruct_broken_words
+    spell        : spell_check_lines (se mide aunque el perfil la tenga desactivada)
+
+Reporta páginas por segundo, latencias p50/p95 por etapa y memoria pico (RSS)
+en JSON, y opcionalmente lo compara contra una línea de base guardada.
+
+Sin modelos de PaddleOCR disponibles se usa el motor simulado determinista
+(motor_simulado.py), que devuelve el texto real de la página con errores
+de OCR inyectados: la etapa 'ocr' no mide entonces la inferencia real, pero
+el resto del pipeline trabaja sobre texto y páginas realistas.
+
+Uso:
+    python benchmarks/bench_pipeline.py [--engine stub|paddle] [--pages 4]
+        [--json resultados.json] [--save-baseline benchmarks/linea_base.json]
+        [--baseline benchmarks/linea_base.json] [--tolerance 0.15]
+
+Con --baseline el programa termina con código 1 si alguna etapa empeoró
+su p95 más que la tolerancia.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PERFILES, OCR_TEXTLINE_ORIENTATION  # noqa: E402
+from procesar_ocr import (  # noqa: E402
+    preprocess_image, run_ocr, parse_ocr_result, clean_ocr_artifacts_batch,
+    reconstruct_broken_words, spell_check_lines, ocr_engines
+)
+from documentos import generate_corpus  # noqa: E402
+from motor_simulado import StubOCREngine  # noqa: E402
+
+ETAPAS = ('preprocess', 'ocr', 'clean', 'reconstruct', 'spell')
+# Diferencias menores a esto (ms) se consideran ruido de medición
+MIN_DELTA_MS = 1.0
+
+def peak_rss_mb():
+    """Memoria residente pico del proceso en MB (None si no se puede medir, ej. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def run_page(page, nombre, engine):
+    """Procesa una página con el perfil 'nombre' y devuelve el tiempo de cada etapa en segundos."""
+    perfil = PERFILES[nombre]
+    tiempos = {}
+
+    t0 = time.perf_counter()
+    img = preprocess_image(page['path'], **perfil['preprocess'])
+    tiempos['preprocess'] = time.perf_counter() - t0
+
+    if isinstance(engine, StubOCREngine):
+        engine.set_page(page['lines'])
+    t0 = time.perf_counter()
+    lineas = parse_ocr_result(run_ocr(img, engine=engine))
+    tiempos['ocr'] = time.perf_counter() - t0
+
+    # Mismo filtro que postprocess_lines (no se mide: es despreciable)
+    texto = [t.strip() for t, score, _ in lineas if score >= perfil['confidence_threshold'] and t.strip()]
+    texto = [t for t in texto if len(t) > perfil['min_text_length'] and not t.isdigit()]
+
+    t0 = time.perf_counter()
+    limpio = clean_ocr_artifacts_batch(texto, aggressive=perfil['aggressive_cleaning'], profile=nombre)
+    limpio = [linea for linea in limpio if linea.strip()]
+    tiempos['clean'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    reconstruido = reconstruct_broken_words(limpio)
+    tiempos['reconstruct'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    spell_check_lines(reconstruido, perfil['spell_check_language'])
+    tiempos['spell'] = time.perf_counter() - t0
+    return tiempos
+
+def _stats(valores):
+    ms = 1000 * np.asarray(valores)
+    return {
+        'media_ms': round(float(ms.mean()), 2),
+        'p50_ms': round(float(np.percentile(ms, 50)), 2),
+        'p95_ms': round(float(np.percentile(ms, 95)), 2),
+    }
+
+def run(pages, engine_name='stub', repeat=1):
+    resultados = {}
+    for nombre, perfil in PERFILES.items():
+        propias = [p for p in pages if p['estilo'] == nombre] or pages
+        if engine_name == 'stub':
+            engine = StubOCREngine()
+        else:
+            engine = ocr_engines.get(perfil['ocr_language'], OCR_TEXTLINE_ORIENTATION)
+
+        # Calentamiento: carga de diccionarios, modelos y kernels de OpenCV
+        run_page(propias[0], nombre, engine)
+
+        por_etapa = {etapa: [] for etapa in ETAPAS}
+        totales = []
+        for _ in range(repeat):
+            for page in propias:
+                tiempos = run_page(page, nombre, engine)
+                for etapa in ETAPAS:
+                    por_etapa[etapa].append(tiempos[etapa])
+                totales.append(sum(tiempos.values()))
+
+        resultados[nombre] = {
+            'paginas': len(totales),
+            'paginas_por_segundo': round(len(totales) / sum(totales), 3),
+            'total': _stats(totales),
+            'etapas': {etapa: _stats(v) for etapa, v in por_etapa.items()},
+            'ortografia_activada': perfil['spell_check_enabled'],
+            # Pico del proceso hasta este perfil inclusive (no se reinicia entre perfiles)
+            'rss_pico_mb': peak_rss_mb(),
+        }
+    return resultados
+
+def compare(resultados, baseline, tolerance):
+    """
+    Compara el p95 de cada etapa contra la línea de base.
+
+    Returns:
+        list: Textos de las regresiones encontradas
+    """
+    regresiones = []
+    print(f"\n{'perfil':<14} {'etapa':<12} {'base p95':>9} {'p95':>9} {'cambio':>8}")
+    for nombre, r in resultados.items():
+        base = baseline.get('perfiles', {}).get(nombre)
+        if base is None:
+            continue
+        for etapa in ('total',) + ETAPAS:
+            antes = base['total'] if etapa == 'total' else base['etapas'].get(etapa)
+            ahora = r['total'] if etapa == 'total' else r['etapas'][etapa]
+            if not antes or not antes['p95_ms']:
+                continue
+            cambio = (ahora['p95_ms'] - antes['p95_ms']) / antes['p95_ms']
+            marca = ''
+            if cambio > tolerance and ahora['p95_ms'] - antes['p95_ms'] > MIN_DELTA_MS:
+                marca = '  REGRESIÓN'
+                regresiones.append(f"{nombre}/{etapa}: p95 {antes['p95_ms']} -> {ahora['p95_ms']} ms")
+            print(f"{nombre:<14} {etapa:<12} {antes['p95_ms']:>9} {ahora['p95_ms']:>9} {cambio:>+8.0%}{marca}")
+    return regresiones
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engine', choices=('stub', 'paddle'), default='stub',
+                        help="Motor OCR: simulado (sin modelos) o PaddleOCR real")
+    parser.add_argument('--pages', type=int, default=4, help="Páginas sintéticas por perfil")
+    parser.add_argument('--repeat', type=int, default=1, help="Pasadas sobre las páginas")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--folder', default=os.path.join('benchmarks', '.paginas_sinteticas'),
+                        help="Carpeta donde se generan las páginas")
+    parser.add_argument('--json', help="Guardar resultados en un archivo JSON")
+    parser.add_argument('--save-baseline', help="Guardar los resultados como línea de base")
+    parser.add_argument('--baseline', help="Línea de base contra la que comparar")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="Aumento relativo del p95 tolerado antes de marcar una regresión")
+    args = parser.parse_args()
+
+    # El pipeline registra cada página en INFO; acá solo interesa el resultado
+    logging.getLogger().setLevel(logging.WARNING)
+
+    pages = generate_corpus(args.folder, args.pages, args.seed)
+    reporte = {
+        'entorno': {
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'plataforma': platform.platform(),
+            'motor': args.engine,
+            'paginas_por_perfil': args.pages,
+            'semilla': args.seed,
+        },
+        'perfiles': run(pages, args.engine, args.repeat),
+    }
+
+    print(f"{'perfil':<14} {'pág/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>7}")
+    for nombre, r in reporte['perfiles'].items():
+        print(f"{nombre:<14} {r['paginas_por_segundo']:>7} {r['total']['p50_ms']:>8} "
+              f"{r['total']['p95_ms']:>8} {str(r['rss_pico_mb']):>7}")
+        for etapa, s in r['etapas'].items():
+            print(f"  {etapa:<12} {'':>7} {s['p50_ms']:>8} {s['p95_ms']:>8}")
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(reporte, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('entorno', {}).get('motor') != args.engine:
+            print("Aviso: la línea de base se midió con otro motor OCR")
+        regresiones = compare(reporte['perfiles'], baseline, args.tolerance)
+        if regresiones:
+            print("\nRegresiones:\n  " + "\n  ".join(regresiones))
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
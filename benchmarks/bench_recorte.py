@@ -0,0 +1,152 @@
+"""
+Benchmark del recorte de márgenes (recorte.py) sobre las carpetas de 'image/'.
+
+Cada página se lee ya normalizada (como en procesar_ocr) y se preprocesa con
+el perfil dos veces, sin recorte y con recorte, midiendo:
+
+    pixeles    : píxeles que entran al preprocesamiento y cuántos ahorra el recorte
+    preprocess : latencia del preprocesamiento (la mejor de --repeat pasadas),
+                 incluida la búsqueda de la zona con texto
+    ocr        : latencia de la detección y el reconocimiento sobre la página
+                 preprocesada (solo con --engine paddle: el motor simulado no
+                 mira los píxeles)
+
+Si 'image/' no tiene páginas se usan las páginas sintéticas de documentos.py
+(tienen márgenes en blanco pero no bordes de escáner ni perforaciones).
+
+Uso:
+    python benchmarks/bench_recorte.py [--profile HISTORICOS] [--folder image]
+        [--max-pages 20] [--repeat 1] [--engine stub|paddle] [--json salida.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PERFILES, OCR_TEXTLINE_ORIENTATION, PDF_RENDER_DPI, VALID_EXTENSIONS  # noqa: E402
+from paginas import iter_page_refs, read_page  # noqa: E402
+from preproceso import PreprocessPipeline  # noqa: E402
+from procesar_ocr import run_ocr, ocr_engines  # noqa: E402
+from resolucion import load_normalized  # noqa: E402
+from documentos import generate_corpus  # noqa: E402
+
+def sample_pages(folder, max_pages):
+    """Páginas de las subcarpetas de 'folder' (referencias 'archivo#pN' en los documentos)."""
+    pages = []
+    if not os.path.isdir(folder):
+        return pages
+    for subfolder in sorted(os.listdir(folder)):
+        path = os.path.join(folder, subfolder)
+        if not os.path.isdir(path):
+            continue
+        for name in sorted(os.listdir(path)):
+            if name.lower().endswith(VALID_EXTENSIONS):
+                pages.extend(iter_page_refs(os.path.join(path, name)))
+            if len(pages) >= max_pages:
+                return pages[:max_pages]
+    return pages
+
+def timed(fn, repeat):
+    """(resultado, mejor tiempo en segundos) de 'repeat' llamadas."""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def run(pages, preprocess, engine=None, repeat=1):
+    sin_recorte = PreprocessPipeline(**dict(preprocess, crop_margins=False))
+    con_recorte = PreprocessPipeline(**dict(preprocess, crop_margins=True))
+    filas = []
+    for ref in pages:
+        img, _ = load_normalized(ref, preprocess.get('target_text_height', 0),
+                                 lambda r: read_page(r, dpi=PDF_RENDER_DPI))
+        if img is None:
+            logging.warning(f"No se pudo leer {ref}")
+            continue
+        fila = {'pagina': os.path.basename(ref), 'pixeles': img.shape[0] * img.shape[1]}
+        for nombre, pipeline in (('sin', sin_recorte), ('con', con_recorte)):
+            info = {}
+            salida, segundos = timed(lambda: pipeline.run(img, info=info), repeat)
+            fila[f'pixeles_{nombre}'] = salida.shape[0] * salida.shape[1]
+            fila[f'preprocess_ms_{nombre}'] = 1000 * segundos
+            if engine is not None:
+                _, segundos = timed(lambda: run_ocr(salida, engine=engine), repeat)
+                fila[f'ocr_ms_{nombre}'] = 1000 * segundos
+        filas.append(fila)
+    return filas
+
+def totals(filas):
+    """Totales de todas las páginas: píxeles ahorrados y latencia con y sin recorte."""
+    resumen = {
+        'paginas': len(filas),
+        'pixeles_ahorrados': round(1 - sum(f['pixeles_con'] for f in filas) /
+                                   max(1, sum(f['pixeles_sin'] for f in filas)), 4),
+    }
+    for etapa in ('preprocess', 'ocr'):
+        if filas and f'{etapa}_ms_sin' in filas[0]:
+            sin = float(np.sum([f[f'{etapa}_ms_sin'] for f in filas]))
+            con = float(np.sum([f[f'{etapa}_ms_con'] for f in filas]))
+            resumen[f'{etapa}_ms_sin'] = round(sin, 1)
+            resumen[f'{etapa}_ms_con'] = round(con, 1)
+            resumen[f'{etapa}_aceleracion'] = round(sin / con, 2) if con > 0 else None
+    return resumen
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=list(PERFILES), default='HISTORICOS',
+                        help="Perfil cuyo preprocesamiento se usa")
+    parser.add_argument('--folder', default='image', help="Carpeta con las subcarpetas de páginas")
+    parser.add_argument('--max-pages', type=int, default=20, help="Páginas a medir como máximo")
+    parser.add_argument('--repeat', type=int, default=1, help="Pasadas de cada medición (se toma la mejor)")
+    parser.add_argument('--engine', choices=('stub', 'paddle'), default='stub',
+                        help="Con 'paddle' además se mide la latencia del OCR")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--synthetic-folder', default=os.path.join('benchmarks', '.paginas_sinteticas'),
+                        help="Carpeta donde se generan las páginas sintéticas si 'folder' está vacía")
+    parser.add_argument('--json', help="Guardar resultados en un archivo JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    perfil = PERFILES[args.profile]
+    pages = sample_pages(args.folder, args.max_pages)
+    origen = args.folder
+    if not pages:
+        corpus = generate_corpus(args.synthetic_folder, max(1, args.max_pages // 2), args.seed)
+        pages = [p['path'] for p in corpus][:args.max_pages]
+        origen = 'páginas sintéticas'
+    engine = None
+    if args.engine == 'paddle':
+        engine = ocr_engines.get(perfil['ocr_language'], OCR_TEXTLINE_ORIENTATION)
+    filas = run(pages, perfil['preprocess'], engine, args.repeat)
+    resumen = totals(filas)
+
+    print(f"Perfil {args.profile}, {len(filas)} páginas ({origen})\n")
+    print(f"{'página':<32}{'megapíxeles':>12}{'ahorro':>8}{'prep. sin':>11}{'prep. con':>11}")
+    for f in filas:
+        print(f"{f['pagina'][:31]:<32}{f['pixeles_sin'] / 1e6:>12.2f}{1 - f['pixeles_con'] / f['pixeles_sin']:>8.0%}"
+              f"{f['preprocess_ms_sin']:>9.0f}ms{f['preprocess_ms_con']:>9.0f}ms")
+    print(f"\nPíxeles ahorrados: {resumen['pixeles_ahorrados']:.1%}")
+    for etapa in ('preprocess', 'ocr'):
+        if f'{etapa}_ms_sin' in resumen:
+            print(f"{etapa}: {resumen[f'{etapa}_ms_sin']:.0f} ms -> {resumen[f'{etapa}_ms_con']:.0f} ms "
+                  f"(x{resumen[f'{etapa}_aceleracion']})")
+    if engine is None:
+        print("OCR: usar --engine paddle (el motor simulado no depende de los píxeles)")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'perfil': args.profile, 'origen': origen, 'resumen': resumen, 'paginas': filas},
+                      f, indent=2, ensure_ascii=False)
+
+if __name__ == '__main__':
+    main()
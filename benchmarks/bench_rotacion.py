@@ -0,0 +1,104 @@
+"""
+Benchmark de los estimadores de inclinación (rotacion.py).
+
+Compara precisión del ángulo, latencia y memoria pico de cada estimador
+contra el método original (minAreaRect a resolución completa).
+
+- Precisión absoluta: páginas sintéticas derechas rotadas con ángulos conocidos.
+- Precisión relativa: páginas reales de 'image/' rotadas; se compara contra
+  la estimación del mismo método sobre la página sin rotar.
+- Memoria: pico de memoria de NumPy/Python medido con tracemalloc
+  (no incluye buffers internos de OpenCV).
+
+Uso:
+    python benchmarks/bench_rotacion.py [--angles -7 -3 -1 0 1 3 7] [--json salida.json]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rotacion import ESTIMATORS, estimate_skew  # noqa: E402
+
+def synthetic_page(width=2480, height=3508, seed=0):
+    """Página A4 a 300 dpi con renglones de texto derechos."""
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width), 235, np.uint8)
+    palabras = ["archivo", "expediente", "informe", "Montevideo", "fecha", "ministerio",
+                "documento", "copia", "asunto", "referencia", "dirección", "nacional"]
+    y = 250
+    while y < height - 250:
+        x = 200
+        while x < width - 400:
+            palabra = palabras[rng.integers(len(palabras))]
+            cv2.putText(page, palabra, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 1.6, 30, 3, cv2.LINE_AA)
+            x += 60 + 30 * len(palabra)
+        y += 90
+    return page
+
+def rotate(gray, angle):
+    h, w = gray.shape
+    M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+    return cv2.warpAffine(gray, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+
+def measure(method, gray):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    angle = estimate_skew(gray, method)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return angle, elapsed, peak
+
+def run(angles):
+    pages = [("sintetica", synthetic_page(), True)]
+    for path in sorted(glob.glob(os.path.join("image", "**", "*.jpg"), recursive=True)):
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is not None:
+            pages.append((os.path.basename(path), img, False))
+
+    resultados = {}
+    for method in ESTIMATORS:
+        errores, tiempos, picos = [], [], []
+        for nombre, gray, derecha in pages:
+            base = 0.0 if derecha else estimate_skew(gray, method)
+            for angle in angles:
+                estimado, elapsed, peak = measure(method, rotate(gray, angle))
+                # La corrección esperada deshace la rotación aplicada
+                errores.append(abs(estimado - (base - angle)))
+                tiempos.append(elapsed)
+                picos.append(peak)
+        resultados[method] = {
+            'error_medio_grados': round(float(np.mean(errores)), 3),
+            'error_max_grados': round(float(np.max(errores)), 3),
+            'latencia_media_ms': round(1000 * float(np.mean(tiempos)), 1),
+            'memoria_pico_mb': round(max(picos) / 1e6, 1),
+        }
+    return resultados
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--angles', type=float, nargs='+', default=[-7, -3, -1, 0, 1, 3, 7])
+    parser.add_argument('--json', help="Guardar resultados en un archivo JSON")
+    args = parser.parse_args()
+
+    resultados = run(args.angles)
+    print(f"{'estimador':<12} {'err medio':>10} {'err max':>9} {'ms':>8} {'MB pico':>8}")
+    for method, r in resultados.items():
+        print(f"{method:<12} {r['error_medio_grados']:>10} {r['error_max_grados']:>9} "
+              f"{r['latencia_media_ms']:>8} {r['memoria_pico_mb']:>8}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark de los filtros de ruido (ruido.py) sobre las páginas sintéticas.
+
+Cada página se preprocesa con el perfil (sin el filtro de ruido, sin deskew
+para que quede alineada con la referencia, y sin omitir etapas por calidad)
+y sobre esa imagen se mide cada filtro candidato:
+
+    ms           : latencia del filtro (la mejor de --repeat pasadas)
+    cambiados    : fracción de píxeles que el filtro modificó
+    tinta_perdida: fracción de la tinta de la página original que el
+                   resultado ya no tiene (letras erosionadas o borradas)
+    manchas      : píxeles de tinta que no están en la original, como
+                   fracción de la tinta original (ruido que quedó)
+    cer          : Character Error Rate del OCR contra el texto real
+                   (solo con --engine paddle: el motor simulado no mira los
+                   píxeles, así que con él no tiene sentido medirlo)
+
+La referencia es la misma página renderizada sin degradar (documentos.ink_reference).
+'sin filtro' es la imagen binarizada tal cual entra a la etapa.
+
+Uso:
+    python benchmarks/bench_ruido.py [--profile HISTORICOS] [--pages 2] [--repeat 1]
+        [--engine stub|paddle] [--json salida.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PERFILES, OCR_TEXTLINE_ORIENTATION  # noqa: E402
+from ortografia import edit_distance  # noqa: E402
+from procesar_ocr import preprocess_image, run_ocr, parse_ocr_result, ocr_engines  # noqa: E402
+from ruido import denoise, INK_THRESHOLD  # noqa: E402
+from documentos import generate_corpus, ink_reference  # noqa: E402
+
+# (nombre, filtro, parámetros); filtro None = sin filtro
+CANDIDATOS = [
+    ('sin filtro', None, {}),
+    ('nlm', 'nlm', {}),
+    ('nlm 5/11', 'nlm', {'template_window': 5, 'search_window': 11}),
+    ('nlm_tiled', 'nlm_tiled', {}),
+    ('median 3', 'median', {'ksize': 3}),
+    ('bilateral', 'bilateral', {}),
+    ('speckle 8', 'speckle', {'min_area': 8}),
+    ('speckle 20', 'speckle', {'min_area': 20}),
+]
+
+def cer(reconocido, real):
+    """Distancia de edición entre los textos sobre la longitud del texto real."""
+    return edit_distance(reconocido, real, len(reconocido) + len(real)) / max(1, len(real))
+
+def ink_errors(img, reference):
+    """(tinta perdida, manchas) del resultado respecto de la tinta de referencia."""
+    ink = img < INK_THRESHOLD
+    total = max(1, int(np.count_nonzero(reference)))
+    perdida = np.count_nonzero(reference & ~ink) / total
+    manchas = np.count_nonzero(ink & ~reference) / total
+    return perdida, manchas
+
+def run(pages, perfil, engine=None, repeat=1):
+    preprocess = dict(perfil['preprocess'], denoise_h=0, deskew=False, target_text_height=0, adaptive=False)
+    h = perfil['preprocess']['denoise_h'] or 20
+    resultados = {nombre: {'ms': [], 'cambiados': [], 'tinta_perdida': [], 'manchas': [], 'cer': []}
+                  for nombre, _, _ in CANDIDATOS}
+    for page in pages:
+        entrada = preprocess_image(page['path'], **preprocess)
+        reference = ink_reference(page)
+        real = '\n'.join(page['lines'])
+        for nombre, method, params in CANDIDATOS:
+            best = None
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                salida = entrada if method is None else denoise(entrada, method, h, **params)
+                elapsed = time.perf_counter() - t0
+                best = elapsed if best is None else min(best, elapsed)
+            r = resultados[nombre]
+            r['ms'].append(1000 * best)
+            r['cambiados'].append(float(np.mean(salida != entrada)))
+            perdida, manchas = ink_errors(salida, reference)
+            r['tinta_perdida'].append(perdida)
+            r['manchas'].append(manchas)
+            if engine is not None:
+                lineas = parse_ocr_result(run_ocr(salida, engine=engine))
+                r['cer'].append(cer('\n'.join(texto for texto, _, _ in lineas), real))
+
+    return {nombre: {
+        'ms_media': round(float(np.mean(r['ms'])), 1),
+        'cambiados': round(float(np.mean(r['cambiados'])), 4),
+        'tinta_perdida': round(float(np.mean(r['tinta_perdida'])), 4),
+        'manchas': round(float(np.mean(r['manchas'])), 4),
+        'cer': round(float(np.mean(r['cer'])), 4) if r['cer'] else None,
+    } for nombre, r in resultados.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=list(PERFILES), default='HISTORICOS',
+                        help="Perfil cuyo preprocesamiento y páginas se usan")
+    parser.add_argument('--pages', type=int, default=2, help="Páginas sintéticas")
+    parser.add_argument('--repeat', type=int, default=1, help="Pasadas de cada filtro (se toma la mejor)")
+    parser.add_argument('--engine', choices=('stub', 'paddle'), default='stub',
+                        help="Con 'paddle' además se mide el CER del OCR real")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--folder', default=os.path.join('benchmarks', '.paginas_sinteticas'),
+                        help="Carpeta donde se generan las páginas")
+    parser.add_argument('--json', help="Guardar resultados en un archivo JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    perfil = PERFILES[args.profile]
+    pages = [p for p in generate_corpus(args.folder, args.pages, args.seed) if p['estilo'] == args.profile]
+    engine = None
+    if args.engine == 'paddle':
+        engine = ocr_engines.get(perfil['ocr_language'], OCR_TEXTLINE_ORIENTATION)
+    resultados = run(pages, perfil, engine, args.repeat)
+
+    print(f"Perfil {args.profile}, {len(pages)} páginas (denoise_h={perfil['preprocess']['denoise_h']})\n")
+    print(f"{'filtro':<12}{'ms':>10}{'cambiados':>11}{'tinta perdida':>15}{'manchas':>10}{'CER':>8}")
+    for nombre, r in resultados.items():
+        cer_txt = '-' if r['cer'] is None else f"{r['cer']:.3f}"
+        print(f"{nombre:<12}{r['ms_media']:>10}{r['cambiados']:>11.2%}{r['tinta_perdida']:>15.2%}"
+              f"{r['manchas']:>10.2%}{cer_txt:>8}")
+    if engine is None:
+        print("\nCER: usar --engine paddle (el motor simulado no depende de los píxeles)")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'perfil': args.profile, 'paginas': len(pages), 'filtros': resultados},
+                      f, indent=2, ensure_ascii=False)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Generador de páginas sintéticas degradadas para los benchmarks.
+
+Renderiza texto en español o inglés con PIL y le aplica las degradaciones
+típicas de cada tipo de documento del archivo:
+
+    'HISTORICOS'   : papel amarillento, bajo contraste, manchas, ruido,
+                     inclinación de varios grados y resoluciones bajas.
+    'ALTA_CALIDAD' : papel blanco, tinta negra, ruido mínimo, casi derecha
+                     y resolución alta.
+
+Todo es determinista a partir de la semilla, así que dos corridas del
+benchmark usan exactamente las mismas páginas. Cada página se guarda junto
+con el texto que contiene (ground truth) para que el motor simulado
+(motor_simulado.py) pueda devolverlo.
+"""
+
+import json
+import os
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+TEXTOS = {
+    'es': [
+        "Montevideo, 14 de marzo de 1976. Ministerio del Interior.",
+        "Se informa que el expediente de referencia fue remitido a la",
+        "Dirección Nacional de Información e Inteligencia para su archivo.",
+        "El ciudadano mencionado en el asunto registra antecedentes en",
+        "la Jefatura de Policía de Montevideo según consta en la ficha.",
+        "Se adjunta copia del informe elevado por la comisión investigadora",
+        "y la nómina de las personas detenidas durante el procedimiento.",
+        "Atentamente, saluda a usted el Jefe del Departamento de Archivo.",
+        "Nota: la presente documentación tiene carácter reservado y no",
+        "podrá ser reproducida sin autorización expresa de la superioridad.",
+    ],
+    'en': [
+        "Federal Bureau of Investigation, Washington, D.C., March 1976.",
+        "Reference is made to the memorandum dated February 12 regarding",
+        "the individual named above, who is currently residing in Uruguay.",
+        "The enclosed report was furnished by a source of known reliability",
+        "and contains information concerning his contacts in Montevideo.",
+        "No further investigation is being conducted at this time unless",
+        "additional information is received from the Legal Attache office.",
+        "This document contains neither recommendations nor conclusions.",
+        "It is the property of the Bureau and is loaned to your agency.",
+        "Copies have been forwarded to the Department of State for review.",
+    ],
+}
+
+ESTILOS = {
+    'HISTORICOS': {
+        'language': 'es',
+        'dpis': (150, 200, 300),
+        'paper': (200, 212, 226),   # BGR: papel amarillento
+        'ink': 85,                  # Tinta gastada: bajo contraste
+        'noise_sigma': 14,
+        'max_skew': 4.0,
+        'stains': 4,
+        'blur': 3,
+    },
+    'ALTA_CALIDAD': {
+        'language': 'en',
+        'dpis': (200, 300),
+        'paper': (250, 250, 250),
+        'ink': 15,
+        'noise_sigma': 2,
+        'max_skew': 0.3,
+        'stains': 0,
+        'blur': 0,
+    },
+}
+
+# Media página A4 (en pulgadas): suficiente para varios renglones y más rápido de procesar
+PAGE_INCHES = (8.27, 5.85)
+
+def _font(size):
+    """Fuente con tildes y eñes; si no hay ninguna instalada se usa la de PIL."""
+    for name in ("DejaVuSerif.ttf", "times.ttf", "DejaVuSans.ttf", "arial.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+def render_text(lines, dpi, ink):
+    """Renderiza los renglones en negro sobre blanco; devuelve la página en escala de grises."""
+    width, height = int(PAGE_INCHES[0] * dpi), int(PAGE_INCHES[1] * dpi)
+    page = Image.new('L', (width, height), 255)
+    draw = ImageDraw.Draw(page)
+    font = _font(max(10, int(dpi * 0.16)))    # ~11.5 pt
+    margin = int(0.6 * dpi)
+    y = margin
+    step = int(dpi * 0.3)
+    for line in lines:
+        if y + step > height - margin:
+            break
+        draw.text((margin, y), line, fill=ink, font=font)
+        y += step
+    return np.array(page)
+
+def degrade(gray, style, rng):
+    """
+    Aplica las degradaciones del estilo a una página renderizada.
+
+    Returns:
+        tuple: (página BGR, inclinación aplicada en grados)
+    """
+    h, w = gray.shape
+    angle = float(rng.uniform(-style['max_skew'], style['max_skew']))
+    M = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    gray = cv2.warpAffine(gray, M, (w, h), flags=cv2.INTER_LINEAR, borderValue=255)
+    if style['blur']:
+        gray = cv2.GaussianBlur(gray, (style['blur'], style['blur']), 0)
+
+    # Tinta sobre el color del papel
+    ink = gray.astype(np.float32) / 255.0
+    paper = np.array(style['paper'], np.float32)
+    page = ink[..., None] * paper[None, None, :]
+
+    # Manchas: elipses borrosas más oscuras que el papel
+    for _ in range(style['stains']):
+        mask = np.zeros((h, w), np.float32)
+        center = (int(rng.integers(w)), int(rng.integers(h)))
+        axes = (int(rng.integers(w // 20, w // 6)), int(rng.integers(h // 20, h // 6)))
+        cv2.ellipse(mask, center, axes, float(rng.uniform(0, 180)), 0, 360, 1.0, -1)
+        mask = cv2.GaussianBlur(mask, (0, 0), max(axes) / 4)
+        page *= 1.0 - 0.25 * mask[..., None]
+
+    if style['noise_sigma']:
+        page += rng.normal(0, style['noise_sigma'], page.shape).astype(np.float32)
+    return np.clip(page, 0, 255).astype(np.uint8), angle
+
+def generate_page(style_name, seed=0, dpi=None):
+    """
+    Genera una página sintética.
+
+    Args:
+        style_name: 'HISTORICOS' o 'ALTA_CALIDAD' (ver ESTILOS)
+        seed: Semilla; la misma semilla genera la misma página
+        dpi: Resolución; por defecto se elige una de las del estilo
+
+    Returns:
+        tuple: (imagen BGR, renglones de texto, metadatos)
+    """
+    style = ESTILOS[style_name]
+    rng = np.random.default_rng(seed)
+    if dpi is None:
+        dpi = int(style['dpis'][rng.integers(len(style['dpis']))])
+    textos = TEXTOS[style['language']]
+    start = int(rng.integers(len(textos)))
+    n_lines = int(rng.integers(4, len(textos) + 1))
+    lines = [textos[(start + i) % len(textos)] for i in range(n_lines)]
+    image, angle = degrade(render_text(lines, dpi, style['ink']), style, rng)
+    meta = {'estilo': style_name, 'idioma': style['language'], 'dpi': dpi,
+            'inclinacion': round(angle, 2), 'semilla': seed}
+    return image, lines, meta
+
+def ink_reference(page):
+    """
+    Máscara de la tinta de una página del corpus tal como se renderizó, sin
+    manchas, ruido ni desenfoque (solo con su inclinación). Sirve de
+    referencia para medir cuánto texto conserva un filtro y cuánto ruido deja.
+
+    Args:
+        page: Diccionario de generate_corpus ('lines', 'dpi', 'estilo', 'inclinacion')
+
+    Returns:
+        np.ndarray: Máscara booleana, True donde hay tinta
+    """
+    style = ESTILOS[page['estilo']]
+    gray = render_text(page['lines'], page['dpi'], style['ink'])
+    h, w = gray.shape
+    M = cv2.getRotationMatrix2D((w / 2, h / 2), page['inclinacion'], 1.0)
+    gray = cv2.warpAffine(gray, M, (w, h), flags=cv2.INTER_LINEAR, borderValue=255)
+    return gray < (255 + style['ink']) / 2
+
+def generate_corpus(folder, pages_per_style=4, seed=0):
+    """
+    Genera (o reutiliza, si ya existe) el conjunto de páginas del benchmark.
+
+    Cada página se guarda como PNG junto a un .json con su texto y metadatos.
+
+    Returns:
+        list: Diccionarios {'path', 'lines', 'estilo', 'idioma', 'dpi', ...}
+    """
+    os.makedirs(folder, exist_ok=True)
+    pages = []
+    for s, style_name in enumerate(ESTILOS):
+        for i in range(pages_per_style):
+            page_seed = seed * 1000 + s * 100 + i
+            path = os.path.join(folder, f"{style_name.lower()}_{page_seed:05d}.png")
+            meta_path = path[:-4] + '.json'
+            if os.path.exists(path) and os.path.exists(meta_path):
+                with open(meta_path, encoding='utf-8') as f:
+                    page = json.load(f)
+            else:
+                image, lines, meta = generate_page(style_name, page_seed)
+                cv2.imwrite(path, image)
+                page = dict(meta, lines=lines)
+                with open(meta_path, 'w', encoding='utf-8') as f:
+                    json.dump(page, f, ensure_ascii=False, indent=2)
+            page['path'] = path
+            pages.append(page)
+    return pages
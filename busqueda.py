@@ -0,0 +1,206 @@
+"""
+Índice de búsqueda de texto completo sobre las transcripciones.
+
+Buscar en miles de páginas con grep sobre los .txt de 'texto/' es lento y
+no encuentra "publicacion" si la página dice "publicación". SearchIndex
+guarda el texto de cada página en un SQLite local con FTS5:
+
+- El tokenizador 'unicode61' con remove_diacritics ignora acentos y
+  mayúsculas, tanto al indexar como al buscar (la ñ cuenta como n).
+- Cada página se identifica por carpeta y nombre ('archivo.pdf#p3'); se
+  guardan también el archivo y el número de página por separado.
+- add_page() reemplaza la página si ya estaba y no toca el índice si el
+  texto no cambió, así que se puede llamar con cada página de cada
+  ejecución (procesar_ocr lo hace apenas termina cada una).
+
+search() devuelve los resultados ordenados por relevancia (BM25) con un
+fragmento del texto alrededor de las palabras encontradas.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS paginas (
+    id INTEGER PRIMARY KEY,
+    carpeta TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    archivo TEXT NOT NULL,
+    pagina INTEGER,
+    huella TEXT NOT NULL,
+    UNIQUE (carpeta, nombre)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS textos USING fts5(
+    texto,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# Palabras de la consulta: letras y dígitos, con un '*' final opcional para buscar por prefijo
+_WORD = re.compile(r"\w+\*?")
+
+def build_query(text):
+    """
+    Consulta FTS5 a partir de lo que escribió el usuario.
+
+    Cada palabra se busca entre comillas (así los operadores y signos de
+    FTS5 no rompen la consulta) y tienen que aparecer todas; 'palabra*'
+    busca por prefijo.
+
+    Returns:
+        str: La consulta, o "" si no hay ninguna palabra
+    """
+    terms = []
+    for word in _WORD.findall(text):
+        prefix = word.endswith('*')
+        word = word.rstrip('*')
+        terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return ' '.join(terms)
+
+class SearchIndex:
+    """
+    Índice FTS5 de las páginas transcriptas.
+
+    Args:
+        db_path: Ruta del SQLite del índice (se crea si no existe)
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        # Una conexión por hilo: las carpetas se pueden procesar en paralelo
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def add_page(self, folder, name, text, filename=None, page=None):
+        """
+        Agrega o actualiza una página.
+
+        Args:
+            folder: Carpeta de la página (nombre de la salida en 'texto/')
+            name: Nombre de la página en la transcripción ('archivo.pdf#p3')
+            text: Texto de la página; vacío la quita del índice
+            filename: Archivo de la página (por defecto, 'name')
+            page: Número de página dentro del archivo (None si es una imagen suelta)
+
+        Returns:
+            bool: Si el índice cambió
+        """
+        if not text.strip():
+            return self.remove_pages(folder, [name]) > 0
+        huella = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        conn = self._connection()
+        with conn:
+            fila = conn.execute("SELECT id, huella FROM paginas WHERE carpeta = ? AND nombre = ?",
+                                (folder, name)).fetchone()
+            if fila is not None and fila[1] == huella:
+                return False
+            if fila is None:
+                rowid = conn.execute(
+                    "INSERT INTO paginas (carpeta, nombre, archivo, pagina, huella) VALUES (?, ?, ?, ?, ?)",
+                    (folder, name, filename or name, page, huella)).lastrowid
+            else:
+                rowid = fila[0]
+                conn.execute("UPDATE paginas SET archivo = ?, pagina = ?, huella = ? WHERE id = ?",
+                             (filename or name, page, huella, rowid))
+                conn.execute("DELETE FROM textos WHERE rowid = ?", (rowid,))
+            conn.execute("INSERT INTO textos (rowid, texto) VALUES (?, ?)", (rowid, text))
+        return True
+
+    def remove_pages(self, folder, names):
+        """Quita páginas de una carpeta. Devuelve cuántas había."""
+        conn = self._connection()
+        removed = 0
+        with conn:
+            for name in names:
+                fila = conn.execute("SELECT id FROM paginas WHERE carpeta = ? AND nombre = ?",
+                                    (folder, name)).fetchone()
+                if fila is not None:
+                    conn.execute("DELETE FROM textos WHERE rowid = ?", (fila[0],))
+                    conn.execute("DELETE FROM paginas WHERE id = ?", (fila[0],))
+                    removed += 1
+        return removed
+
+    def retain(self, folder, names):
+        """Quita de la carpeta las páginas que no están en 'names' (se borraron de la carpeta)."""
+        names = set(names)
+        stale = [fila[0] for fila in self._connection().execute(
+            "SELECT nombre FROM paginas WHERE carpeta = ?", (folder,)) if fila[0] not in names]
+        return self.remove_pages(folder, stale)
+
+    def clear(self, folder=None):
+        """Vacía el índice entero o el de una carpeta."""
+        conn = self._connection()
+        with conn:
+            if folder is None:
+                conn.execute("DELETE FROM textos")
+                conn.execute("DELETE FROM paginas")
+            else:
+                conn.execute("DELETE FROM textos WHERE rowid IN (SELECT id FROM paginas WHERE carpeta = ?)",
+                             (folder,))
+                conn.execute("DELETE FROM paginas WHERE carpeta = ?", (folder,))
+
+    def optimize(self):
+        """Une los segmentos del índice FTS5 (conviene después de reconstruirlo)."""
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT INTO textos (textos) VALUES ('optimize')")
+
+    def count(self):
+        """Cantidad de páginas indexadas."""
+        return self._connection().execute("SELECT COUNT(*) FROM paginas").fetchone()[0]
+
+    def search(self, text, limit=20, folder=None, mark=('[', ']'), snippet_words=16):
+        """
+        Busca páginas que contengan todas las palabras de 'text'.
+
+        Args:
+            text: Lo que escribió el usuario (ver build_query)
+            limit: Cantidad máxima de resultados
+            folder: Limitar la búsqueda a una carpeta
+            mark: Marcas de apertura y cierre de las palabras encontradas en el fragmento
+            snippet_words: Largo del fragmento, en palabras
+
+        Returns:
+            list: dicts {'carpeta', 'nombre', 'archivo', 'pagina', 'fragmento', 'puntaje'},
+                  de la más relevante a la menos relevante
+        """
+        query = build_query(text)
+        if not query:
+            return []
+        sql = ("SELECT p.carpeta, p.nombre, p.archivo, p.pagina, "
+               "snippet(textos, 0, ?, ?, '…', ?), bm25(textos) AS puntaje "
+               "FROM textos JOIN paginas p ON p.id = textos.rowid WHERE textos MATCH ?")
+        params = [mark[0], mark[1], snippet_words, query]
+        if folder is not None:
+            sql += " AND p.carpeta = ?"
+            params.append(folder)
+        sql += " ORDER BY puntaje LIMIT ?"
+        params.append(int(limit))
+        return [{'carpeta': carpeta, 'nombre': nombre, 'archivo': archivo, 'pagina': pagina,
+                 'fragmento': fragmento, 'puntaje': round(-puntaje, 6)}   # bm25: más negativo = mejor
+                for carpeta, nombre, archivo, pagina, fragmento, puntaje
+                in self._connection().execute(sql, params)]
+
+    def close(self):
+        """Cierra la conexión del hilo actual."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,172 @@
+"""
+Caché persistente de resultados de OCR, direccionada por contenido.
+
+La clave combina el hash de los bytes de la imagen con todo lo que afecta al
+reconocimiento (preprocesamiento, umbral, idioma y versión del motor). Se
+guardan las líneas reconocidas con su confianza y su cuadrilátero, antes de cualquier
+postprocesamiento, así que cambiar la corrección ortográfica o la limpieza
+reutiliza la caché sin volver a ejecutar la inferencia.
+
+Se guarda en un SQLite local que pueden compartir varios procesos (CLI en
+paralelo y workers de la API). Cuando supera el tamaño máximo se eliminan
+las entradas usadas hace más tiempo (LRU).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Versión del formato de las líneas guardadas: forma parte de la clave, así
+# que las entradas de un formato anterior quedan sin usar y se desalojan solas
+RESULT_FORMAT = 2   # 2: (texto, confianza, cuadrilátero)
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """
+    Calcula el SHA-256 del contenido de un archivo.
+
+    Args:
+        path: Ruta al archivo
+        chunk_size: Tamaño de lectura en bytes
+
+    Returns:
+        str: Hash hexadecimal
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def hash_bytes(data):
+    """SHA-256 de una imagen en memoria (el mismo que hash_file del archivo con esos bytes)."""
+    return hashlib.sha256(data).hexdigest()
+
+@lru_cache(maxsize=256)
+def _hash_file_version(path, size, mtime_ns):
+    return hash_file(path)
+
+def hash_file_cached(path):
+    """
+    hash_file recordado mientras el archivo no cambie (mismo tamaño y fecha).
+    Las páginas de un mismo PDF o TIFF comparten el hash del documento, que
+    así se lee una sola vez y no una por página.
+    """
+    stat = os.stat(path)
+    return _hash_file_version(path, stat.st_size, stat.st_mtime_ns)
+
+def make_cache_key(image_hash, preprocess_config, confidence_threshold, language, engine_version):
+    """
+    Arma la clave de caché a partir de todo lo que influye en el reconocimiento.
+
+    Args:
+        image_hash: Hash del contenido de la imagen
+        preprocess_config: Diccionario de preprocesamiento efectivo
+        confidence_threshold: Umbral de confianza
+        language: Idioma del motor OCR
+        engine_version: Versión del motor/modelos
+
+    Returns:
+        str: Clave hexadecimal
+    """
+    payload = json.dumps({
+        'imagen': image_hash,
+        'preprocess': preprocess_config,
+        'umbral': confidence_threshold,
+        'idioma': language,
+        'motor': engine_version,
+        'formato': RESULT_FORMAT,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class OCRCache:
+    """
+    Caché LRU en disco de líneas reconocidas [(texto, confianza, cuadrilátero), ...].
+
+    Args:
+        path: Ruta al archivo SQLite
+        max_bytes: Tamaño máximo de los datos guardados antes de desalojar
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        # Una conexión por proceso: tras spawn/fork se vuelve a abrir
+        if self._conn is None or self._pid != os.getpid():
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS resultados ("
+                " clave TEXT PRIMARY KEY,"
+                " datos TEXT NOT NULL,"
+                " tamano INTEGER NOT NULL,"
+                " ultimo_acceso REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_acceso ON resultados (ultimo_acceso)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key):
+        """
+        Busca un resultado en la caché y actualiza su último acceso.
+
+        Returns:
+            list | None: Líneas [(texto, confianza, cuadrilátero)] o None si no está
+        """
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute("SELECT datos FROM resultados WHERE clave = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE resultados SET ultimo_acceso = ? WHERE clave = ?", (time.time(), key))
+                conn.commit()
+            return [(text, score, box) for text, score, box in json.loads(row[0])]
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Error leyendo la caché OCR: {e}")
+            return None
+
+    def put(self, key, lines):
+        """Guarda las líneas reconocidas y desaloja entradas viejas si hace falta."""
+        datos = json.dumps([[text, float(score), box] for text, score, box in lines], ensure_ascii=False)
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO resultados (clave, datos, tamano, ultimo_acceso) VALUES (?, ?, ?, ?)",
+                    (key, datos, len(datos.encode('utf-8')), time.time())
+                )
+                self._evict(conn)
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Error escribiendo la caché OCR: {e}")
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(tamano), 0) FROM resultados").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        exceso = total - self.max_bytes
+        claves = []
+        for clave, tamano in conn.execute("SELECT clave, tamano FROM resultados ORDER BY ultimo_acceso"):
+            claves.append((clave,))
+            exceso -= tamano
+            if exceso <= 0:
+                break
+        conn.executemany("DELETE FROM resultados WHERE clave = ?", claves)
+        logger.info(f"Caché OCR: {len(claves)} entrada(s) desalojadas por tamaño")
@@ -0,0 +1,154 @@
+"""
+Estimación rápida de la calidad de una página para decidir su preprocesamiento.
+
+El perfil aplica las mismas etapas a todas las páginas, pero en una carpeta
+mezclada las páginas limpias (mecanografiadas, bien escaneadas) no necesitan
+CLAHE, nitidez, deskew ni reducción de ruido. analyze() mide sobre una
+miniatura (y un recorte central a resolución completa para la nitidez):
+
+    contrast   : diferencia entre la mediana del papel y la de la tinta
+                 (separadas con Otsu), de 0 a 1
+    noise      : desvío del ruido del fondo en niveles de gris (estimador de
+                 Immerkaer con la mediana, para que los bordes de las letras
+                 no cuenten como ruido)
+    skew       : inclinación en grados, con el estimador del perfil
+    edge_width : ancho en píxeles de la transición tinta-papel; cuanto más
+                 ancho, más borrosa la página
+
+plan_stages() decide con esos números qué etapas corren, siempre dentro de
+lo que el perfil permite: puede apagar una etapa o bajar su fuerza, nunca
+prender una que el perfil tiene desactivada.
+
+Todo se mide una sola vez, sobre la página en grises tal como llegó (antes
+de CLAHE), y los umbrales se refieren a esa imagen, aunque cada etapa
+procese la salida de las anteriores. Medir en cada etapa sería peor:
+
+- CLAHE amplifica el ruido del papel, y los saltos de ese ruido pasan por
+  bordes de letra. En páginas históricas ruidosas el ancho de borde medido
+  después de CLAHE cae a un tercio, y la página borrosa parece nítida.
+- El filtro de ruido corre sobre la página ya binarizada, donde el
+  estimador de Immerkaer no sirve (la mediana de la respuesta es 0). El
+  ruido del original es el que la binarización convierte en motas.
+- La inclinación no cambia con CLAHE.
+"""
+
+import cv2
+import numpy as np
+
+from rotacion import estimate_skew
+
+# Lado mayor de la miniatura (el mismo que usan los estimadores de inclinación)
+THUMB_SIZE = 1000
+# Lado del recorte central donde se mide la nitidez
+CROP_SIZE = 768
+
+# Umbrales sobre las medidas de la página original en grises (antes de CLAHE, ver arriba)
+DEFAULT_THRESHOLDS = {
+    'contrast_ok': 0.45,       # Con más contraste no hace falta CLAHE
+    'noise_min': 1.5,          # Con menos ruido no hace falta el filtro de ruido
+    'noise_full': 4.0,         # Ruido con el que el filtro usa toda la fuerza del perfil
+    'edge_width_sharp': 1.5,   # Bordes más angostos (px): la página ya es nítida
+}
+
+# Kernel del estimador de ruido de Immerkaer (anula la imagen lineal, deja el ruido)
+_NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], np.float32)
+
+def _thumbnail(gray):
+    h, w = gray.shape[:2]
+    scale = min(1.0, THUMB_SIZE / float(max(h, w)))
+    if scale < 1.0:
+        gray = cv2.resize(gray, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    return gray
+
+def _contrast(gray):
+    """Papel y tinta separados con Otsu: diferencia de sus medianas (en niveles de gris)."""
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    ink = gray[mask > 0]
+    paper = gray[mask == 0]
+    if ink.size == 0 or paper.size == 0:
+        return 0.0
+    return max(0.0, float(np.median(paper)) - float(np.median(ink)))
+
+def _noise(gray):
+    response = cv2.filter2D(gray, cv2.CV_32F, _NOISE_KERNEL)
+    # El kernel multiplica el desvío del ruido por 6; 1.4826 pasa de la MAD al desvío
+    return 1.4826 * float(np.median(np.abs(response))) / 6.0
+
+def _edge_width(gray):
+    """Contraste sobre la mayor diferencia entre píxeles vecinos, en un recorte central."""
+    h, w = gray.shape[:2]
+    top, left = max(0, (h - CROP_SIZE) // 2), max(0, (w - CROP_SIZE) // 2)
+    crop = gray[top:top + CROP_SIZE, left:left + CROP_SIZE]
+    contrast = _contrast(crop)
+    pixels = crop.astype(np.int16)
+    peak = max(float(np.percentile(np.abs(np.diff(pixels, axis=1)), 99.5)),
+               float(np.percentile(np.abs(np.diff(pixels, axis=0)), 99.5)))
+    if contrast < 1.0 or peak < 1.0:
+        return 0.0
+    return contrast / peak
+
+def analyze(gray, skew_method=None):
+    """
+    Mide la calidad de una página.
+
+    Args:
+        gray: Página en escala de grises (resolución completa), antes de
+              cualquier etapa: los umbrales de plan_stages se refieren a ella
+        skew_method: Estimador de inclinación (ver rotacion.py); None = no medirla
+
+    Returns:
+        dict: {'contrast', 'noise', 'skew', 'edge_width'} (skew None si no se midió)
+    """
+    thumb = _thumbnail(gray)
+    return {
+        'contrast': round(_contrast(thumb) / 255.0, 3),
+        'noise': round(_noise(thumb), 2),
+        'skew': None if skew_method is None else round(float(estimate_skew(thumb, skew_method)), 2),
+        'edge_width': round(_edge_width(gray), 2),
+    }
+
+def plan_stages(quality, clahe=True, sharpen=True, deskew=True, denoise_h=0,
+                deskew_min_angle=0.3, thresholds=None):
+    """
+    Decide las etapas de una página a partir de su calidad.
+
+    Args:
+        quality: Resultado de analyze()
+        clahe, sharpen, deskew: Etapas que el perfil tiene activadas
+        denoise_h: Fuerza del filtro de ruido del perfil (0 = desactivado)
+        deskew_min_angle: Banda muerta del deskew del perfil (grados)
+        thresholds: Umbrales que reemplazan a los de DEFAULT_THRESHOLDS
+
+    Returns:
+        dict: {'clahe', 'sharpen', 'deskew', 'denoise'} (bool) y 'denoise_h' (fuerza a usar)
+    """
+    t = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    skew = quality.get('skew')
+    noise = quality['noise']
+    h = 0
+    if denoise_h > 0 and noise >= t['noise_min']:
+        h = max(1, round(denoise_h * min(1.0, noise / t['noise_full'])))
+    return {
+        'clahe': clahe and quality['contrast'] < t['contrast_ok'],
+        'sharpen': sharpen and quality['edge_width'] >= t['edge_width_sharp'],
+        'deskew': deskew and (skew is None or abs(skew) >= deskew_min_angle),
+        'denoise': h > 0,
+        'denoise_h': h,
+    }
+
+_STAGE_NAMES = {'clahe': 'CLAHE', 'deskew': 'deskew', 'sharpen': 'nitidez', 'denoise': 'ruido'}
+
+def describe(quality, plan):
+    """Texto de una línea con la calidad medida y la decisión, para el log."""
+    medidas = [f"contraste {quality['contrast']:.2f}", f"ruido {quality['noise']:.1f}",
+               f"bordes {quality['edge_width']:.1f} px"]
+    if quality.get('skew') is not None:
+        medidas.append(f"inclinación {quality['skew']:.1f}°")
+    etapas = []
+    for stage, nombre in _STAGE_NAMES.items():
+        if stage in plan:
+            estado = 'sí' if plan[stage] else 'no'
+            if stage == 'denoise' and plan[stage]:
+                estado = f"h={plan['denoise_h']}"
+            etapas.append(f"{nombre} {estado}")
+    return f"{', '.join(medidas)} -> {', '.join(etapas)}"
@@ -0,0 +1,120 @@
+"""
+Cascada por confianza: un preprocesamiento barato primero y el completo solo si hace falta.
+
+En una carpeta mezclada la mayoría de las páginas se reconocen bien con el
+preprocesamiento mínimo de ALTA_CALIDAD, y la cadena completa de HISTORICOS
+(CLAHE, deskew, nitidez, binarización, filtro de ruido) solo mejora las
+páginas degradadas. Con la cascada cada página pasa primero por el perfil
+rápido y se mide la confianza de lo que reconoció el OCR:
+
+    mean : confianza media de los renglones
+    low  : percentil bajo (por defecto el 10) de las confianzas; detecta las
+           páginas con la mayoría de los renglones bien y unos cuantos mal
+
+Si alguna queda por debajo de su mínimo, la página se reconoce otra vez con
+el perfil completo y se combinan los dos resultados (choose):
+
+    'best'  : se queda con el resultado de mejor puntaje (suma del largo de
+              cada renglón por su confianza, contando solo los renglones que
+              superan el umbral del perfil activo)
+    'lines' : une los dos renglón por renglón (merge_lines)
+
+El camino de cada página se informa en el log, en las métricas y en el
+resumen de la ejecución:
+
+    'rapido'             : bastó el paso rápido
+    'completo'           : se escaló y quedó el resultado del paso completo
+    'combinado'          : se escaló y se unieron los dos resultados
+    'escalada_descartada': se escaló pero el paso rápido puntuó mejor
+"""
+
+import difflib
+
+import numpy as np
+
+# Caminos posibles de una página
+FAST = 'rapido'
+FULL = 'completo'
+MERGED = 'combinado'
+DISCARDED = 'escalada_descartada'
+
+def confidence_stats(lineas, percentile=10):
+    """
+    Confianza de lo que reconoció el OCR en una página.
+
+    Args:
+        lineas: Tuplas (texto, confianza, cuadrilátero) sin filtrar
+        percentile: Percentil que se informa como 'low'
+
+    Returns:
+        dict: {'mean', 'low', 'lines'} (mean y low en 0 si no hubo renglones)
+    """
+    scores = [conf for text, conf, _ in lineas if text.strip()]
+    if not scores:
+        return {'mean': 0.0, 'low': 0.0, 'lines': 0}
+    return {
+        'mean': round(float(np.mean(scores)), 3),
+        'low': round(float(np.percentile(scores, percentile)), 3),
+        'lines': len(scores),
+    }
+
+def needs_escalation(stats, min_mean, min_low):
+    """Si la página tiene que pasar por el preprocesamiento completo."""
+    return stats['mean'] < min_mean or stats['low'] < min_low
+
+def score(lineas, confidence_threshold=0.0):
+    """Puntaje de un resultado: largo de cada renglón aceptado por su confianza."""
+    return sum(len(text.strip()) * conf for text, conf, _ in lineas
+               if conf >= confidence_threshold and text.strip())
+
+def merge_lines(first, second):
+    """
+    Une dos lecturas de la misma página renglón por renglón.
+
+    Los renglones se alinean por su texto (difflib): donde los dos pasos
+    leyeron lo mismo se conserva uno solo; donde leyeron distinto la misma
+    cantidad de renglones se elige, de a pares, el de mayor confianza; si
+    la cantidad difiere se toma el tramo con mejor confianza media. Los
+    renglones que solo encontró uno de los pasos se agregan en su lugar.
+
+    Args:
+        first: Tuplas (texto, confianza, cuadrilátero) del paso rápido
+        second: Tuplas (texto, confianza, cuadrilátero) del paso completo
+
+    Returns:
+        list: Tuplas (texto, confianza, cuadrilátero) en el orden de lectura
+    """
+    matcher = difflib.SequenceMatcher(a=[line[0] for line in first], b=[line[0] for line in second],
+                                      autojunk=False)
+    merged = []
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        a, b = first[i1:i2], second[j1:j2]
+        if len(a) == len(b):
+            # Mismo texto ('equal') o la misma cantidad de renglones leídos distinto
+            merged.extend(x if x[1] >= y[1] else y for x, y in zip(a, b))
+        elif op == 'replace':
+            merged.extend(a if np.mean([line[1] for line in a]) >= np.mean([line[1] for line in b]) else b)
+        else:
+            merged.extend(a or b)
+    return merged
+
+def choose(first, second, mode='best', confidence_threshold=0.0):
+    """
+    Resultado final de una página que pasó por los dos preprocesamientos.
+
+    Args:
+        first: Tuplas (texto, confianza, cuadrilátero) del paso rápido
+        second: Tuplas (texto, confianza, cuadrilátero) del paso completo
+        mode: 'best' (el de mejor puntaje) o 'lines' (merge_lines)
+        confidence_threshold: Umbral del perfil activo (para el puntaje)
+
+    Returns:
+        tuple: (líneas, camino)
+    """
+    if mode == 'lines':
+        return merge_lines(first, second), MERGED
+    if mode != 'best':
+        raise ValueError(f"Modo de cascada desconocido: {mode}. Opciones: best, lines")
+    if score(second, confidence_threshold) > score(first, confidence_threshold):
+        return second, FULL
+    return first, DISCARDED
@@ -14,6 +14,48 @@ Modificá estos valores según tus necesidades.
 # PERFIL 2: Documentos HISTÓRICOS (papel viejo, manchas, bajo contraste, ruido)
 PERFIL_ACTIVO = "HISTORICOS"
 
+# ==============================================================================
+# REGLAS DE LIMPIEZA DEL OCR
+# ==============================================================================
+# Reemplazos que se aplican en orden (cada uno ve el resultado de los anteriores)
+# y símbolos que se eliminan con aggressive_cleaning. Cada perfil usa un juego
+# de reglas; se compilan una sola vez al iniciar (ver limpieza.py).
+REGLAS_LIMPIEZA = {
+    'replacements': {
+        'n0': 'no',
+        'N0': 'NO',
+        'o0': 'oo',
+        'O0': 'OO',
+        '0o': 'oo',
+        '0O': 'OO',
+        'l0': 'lo',
+        'L0': 'LO',
+        '0l': 'ol',
+        '0L': 'OL',
+        'rn': 'm',  # común en OCR
+        '|': 'I',   # barras verticales confundidas con I
+    },
+    'noise_symbols': '~`´¨^°',
+}
+
+# ==============================================================================
+# CALIDAD DE PÁGINA
+# ==============================================================================
+# Con 'adaptive' activado en el perfil (desactivado por defecto: cambia las
+# imágenes preprocesadas y las transcripciones de las páginas que se saltean
+# etapas, y la caché de resultados no se reusa), cada página se mide antes de
+# preprocesarla (contraste, ruido, inclinación y nitidez, ver calidad.py) y se
+# omiten las etapas que no necesita. Nunca se activa una etapa que el perfil
+# tiene desactivada. Las medidas (y estos umbrales) son de la página en grises
+# antes de CLAHE, no de la imagen que recibe cada etapa: el filtro de ruido,
+# por ejemplo, corre sobre la página binarizada (ver calidad.py).
+UMBRALES_CALIDAD = {
+    'contrast_ok': 0.45,       # Contraste (0-1) desde el que no se aplica CLAHE
+    'noise_min': 1.5,          # Ruido (niveles de gris) por debajo del cual no se filtra
+    'noise_full': 4.0,         # Ruido desde el que el filtro usa toda la fuerza (denoise_h)
+    'edge_width_sharp': 1.5,   # Ancho de borde (px) por debajo del cual no se aplica nitidez
+}
+
 # ==============================================================================
 # PERFILES PREDEFINIDOS
 # ==============================================================================
@@ -28,14 +70,24 @@ PERFILES = {
             'binarize_block': 0,       # Sin binarización
             'binarize_C': 2,
             'denoise_h': 0,            # Sin reducción de ruido
+            'denoise_method': 'nlm',   # Filtro: 'nlm', 'nlm_tiled', 'median', 'bilateral' o 'speckle' (ver ruido.py)
+            'denoise_params': {},      # Parámetros del filtro (ej: {'template_window': 5, 'search_window': 11})
             'sharpen': False,          # Sin nitidez
             'deskew': False,           # Sin corrección de rotación
-            'dilate_erode': False      # Sin operaciones morfológicas
+            'deskew_method': 'projection',
+            'deskew_min_angle': 0.3,
+            'dilate_erode': False,     # Sin operaciones morfológicas
+            'target_text_height': 0,   # Alto de letra (px) al que se reducen las páginas (ej: 28). 0 = no reducir
+            'adaptive': False,         # Sin etapas que omitir: medir la calidad sería costo extra
+            'quality_thresholds': UMBRALES_CALIDAD,
+            'crop_margins': False,     # True = recortar márgenes y bordes sin texto antes de la detección
+            'crop_padding': 28         # Píxeles que se dejan alrededor del texto (un alto de letra)
         },
         "spell_check_enabled": False,
         "spell_check_language": "en",
         "generate_raw_output": False,
-        "aggressive_cleaning": False
+        "aggressive_cleaning": False,
+        "cleanup_rules": REGLAS_LIMPIEZA
     },
     
     "HISTORICOS": {
@@ -46,15 +98,25 @@ PERFILES = {
             'contrast_clip': 3.0,       # Contraste moderado
             'binarize_block': 25,       # Binarización menos agresiva (debe ser impar)
             'binarize_C': 8,            # Ajuste suave
-            'denoise_h': 20,            # Reducción de ruido moderada
+            'denoise_h': 20,            # Reducción de ruido moderada (0 = sin filtro de ruido)
+            'denoise_method': 'nlm',    # Filtro: 'nlm', 'nlm_tiled', 'median', 'bilateral' o 'speckle' (ver ruido.py)
+            'denoise_params': {},       # Parámetros del filtro; comparar con benchmarks/bench_ruido.py
             'sharpen': True,            # Nitidez para texto borroso
             'deskew': True,             # Corrección de rotación
-            'dilate_erode': False       # DESACTIVADO - causa pérdida de texto
+            'deskew_method': 'projection',  # Estimador: 'projection', 'hough' o 'minarearect' (original)
+            'deskew_min_angle': 0.3,    # Grados: páginas menos torcidas no se rotan
+            'dilate_erode': False,      # DESACTIVADO - causa pérdida de texto
+            'target_text_height': 0,    # Alto de letra (px, ej: 32): un escaneo a 600 dpi queda a la mitad. 0 = no reducir
+            'adaptive': False,          # True = omitir en cada página las etapas que su calidad no necesita
+            'quality_thresholds': UMBRALES_CALIDAD,
+            'crop_margins': False,      # True = recortar márgenes, bordes del escáner y perforaciones
+            'crop_padding': 32          # Píxeles que se dejan alrededor del texto (un alto de letra)
         },
         "spell_check_enabled": False,   # DESACTIVADO - causa más errores que aciertos
         "spell_check_language": "es",
         "generate_raw_output": True,    # Genera versión sin postprocesar (IMPORTANTE)
-        "aggressive_cleaning": False    # DESACTIVADO - elimina texto válido
+        "aggressive_cleaning": False,   # DESACTIVADO - elimina texto válido
+        "cleanup_rules": REGLAS_LIMPIEZA
     }
 }
 
@@ -81,9 +143,161 @@ AGGRESSIVE_CLEANING = PERFIL.get("aggressive_cleaning", False)
 IMAGE_FOLDER = 'image'          # Carpeta de entrada con imágenes
 OUTPUT_FOLDER = 'texto'         # Carpeta de salida con textos
 PROCESSED_FOLDER = 'procesadas' # Carpeta con imágenes preprocesadas
+MANIFEST_FOLDER = '.paginas'    # Dentro de OUTPUT_FOLDER: manifiesto y resultado de cada página
+
+# Resumen JSON de cada ejecución de la CLI (tiempos por etapa, páginas por
+# segundo, fallas), junto a la carpeta OUTPUT_FOLDER. '' = no generarlo.
+RUN_SUMMARY_FILE = 'resumen_ejecucion.json'
+
+# Salida estructurada: todos los renglones reconocidos (texto, confianza,
+# cuadrilátero y número de renglón) junto a los .txt, para revisar el diseño
+# o regenerar los .txt con otro umbral sin repetir el OCR (ver renglones.py y
+# 'python procesar_ocr.py --regenerate --threshold 0.6').
+#   'npy'   = arreglo de NumPy + textos en UTF-8 (se abre mapeado en memoria)
+#   'jsonl' = una línea JSON por página (para leerlo desde otras herramientas)
+#   ''      = no generarla
+LINES_OUTPUT_FORMAT = 'npy'
+
+# Índice de búsqueda (SQLite FTS5, sin acentos ni mayúsculas) de todas las
+# páginas transcriptas, dentro de OUTPUT_FOLDER. Se actualiza página por
+# página; lo usa GET /search y se reconstruye desde los .txt con
+# 'python procesar_ocr.py --rebuild-index'. '' = no indexar.
+SEARCH_INDEX_FILE = 'busqueda.sqlite'
+
+# Guardar una copia de cada imagen preprocesada en PROCESSED_FOLDER (control visual).
+# Se escribe en segundo plano y no frena el OCR; desactivalo para ahorrar disco.
+SAVE_PROCESSED_IMAGES = True
+
+# ==============================================================================
+# PROCESAMIENTO EN PARALELO
+# ==============================================================================
+# Cantidad de procesos OCR en paralelo. Cada proceso carga su propio motor
+# PaddleOCR una sola vez al arrancar (consume RAM por cada uno).
+#   1    = secuencial (comportamiento original)
+#   None = un proceso por núcleo de la CPU
+OCR_WORKERS = 1
+
+# Cantidad de subcarpetas de 'image/' que se procesan al mismo tiempo.
+# Todas comparten el mismo grupo de OCR_WORKERS procesos.
+FOLDER_WORKERS = 1
+
+# ==============================================================================
+# CASCADA DE CONFIANZA
+# ==============================================================================
+# Cada página se reconoce primero con el preprocesamiento barato de
+# CASCADE_FAST_PROFILE. Solo si la confianza del OCR queda baja (media o
+# percentil bajo bajo su mínimo) se repite con el de CASCADE_FULL_PROFILE
+# (ver cascada.py). El idioma, el umbral y el postprocesamiento son siempre
+# los del perfil activo. El camino de cada página queda en el log y en el
+# resumen de la ejecución.
+CASCADE_ENABLED = False
+CASCADE_FAST_PROFILE = "ALTA_CALIDAD"
+CASCADE_FULL_PROFILE = "HISTORICOS"
+CASCADE_MIN_MEAN = 0.80         # Confianza media mínima para quedarse con el paso rápido
+CASCADE_MIN_LOW = 0.50          # Mínimo del percentil bajo (renglones sueltos mal leídos)
+CASCADE_LOW_PERCENTILE = 10     # Percentil que se compara con CASCADE_MIN_LOW
+CASCADE_MERGE = 'best'          # 'best' = el resultado de mejor puntaje, 'lines' = unir renglón por renglón
+
+# ==============================================================================
+# PÁGINAS DUPLICADAS
+# ==============================================================================
+# Antes de preprocesar, cada página se compara con las ya vistas de la misma
+# carpeta (o del mismo pedido a /process) por su huella perceptual (ver
+# duplicados.py). Un reescaneo o una copia recomprimida no pasa por el OCR:
+# toma la transcripción de la original y queda marcada como duplicado.
+DUPLICATE_DETECTION = True
+DUPLICATE_MAX_DISTANCE = 0.10   # Fracción de bits distintos de la huella para considerarla candidata
+DUPLICATE_MIN_SIMILARITY = 0.93 # Parecido mínimo de las miniaturas alineadas (1 = idénticas)
+
+# ==============================================================================
+# MOTORES OCR
+# ==============================================================================
+# Los motores se crean recién cuando se procesa la primera imagen de cada idioma.
+OCR_TEXTLINE_ORIENTATION = True # Detectar renglones girados 180°
+OCR_LANGUAGES = ['es', 'en']    # Idiomas aceptados por la API
+OCR_MAX_ENGINES = 2             # Motores cargados a la vez (se libera el menos usado)
+OCR_WARMUP_LANGUAGES = []       # Idiomas a precargar al iniciar la API, ej: ['es', 'en']
+
+# Modelos de PaddleOCR. Se pasan explícitos al motor por página y al
+# reconocedor por lotes, así los dos usan exactamente los mismos (y no
+# dependen de los que PaddleOCR elija por defecto en cada versión).
+OCR_DETECTION_MODEL = 'PP-OCRv5_server_det'
+OCR_RECOGNITION_MODELS = {      # Un modelo de reconocimiento por idioma de OCR_LANGUAGES
+    'es': 'latin_PP-OCRv5_mobile_rec',
+    'en': 'en_PP-OCRv5_mobile_rec',
+}
+OCR_TEXTLINE_ORIENTATION_MODEL = 'PP-LCNet_x1_0_textline_ori'
+# Preprocesamiento de documento de PaddleOCR (antes de detectar los renglones).
+# El giro se deshace en los cuadriláteros de la tabla de renglones; el
+# enderezado no se puede deshacer, así que con OCR_DOC_UNWARPING los renglones
+# quedan sin cuadrilátero (NaN). Para tener las posiciones, desactivarlo.
+OCR_DOC_ORIENTATION = True      # Girar las páginas cargadas a 90°/180°/270°
+OCR_DOC_ORIENTATION_MODEL = 'PP-LCNet_x1_0_doc_ori'
+OCR_DOC_UNWARPING = True        # Enderezar páginas curvadas o fotografiadas
+OCR_DOC_UNWARPING_MODEL = 'UVDoc'
+
+# Reconocimiento por lotes entre páginas (CLI). Se detectan los renglones de
+# varias páginas y se reconocen todos juntos en lotes grandes: conviene con
+# muchas páginas cortas (fichas, memos), donde cada llamada al motor reconoce
+# apenas un par de renglones. Usa los mismos modelos y el mismo
+# preprocesamiento de documento que el motor por página, pero no es el mismo
+# pipeline: el orden de los renglones y la detección pueden diferir un poco.
+#   0 = desactivado (una llamada al motor por página, comportamiento original)
+OCR_BATCH_PAGES = 0             # Páginas que se agrupan en cada lote
+OCR_REC_BATCH_SIZE = 32         # Renglones por lote de reconocimiento
+
+# ==============================================================================
+# SERVIDOR DE INFERENCIA COMPARTIDO
+# ==============================================================================
+# Con gunicorn (ver gunicorn.conf.py) el proceso principal lanza un único
+# proceso dueño de los motores OCR y los workers web le mandan las páginas ya
+# preprocesadas por un socket local (ver inferencia.py). Los modelos se
+# cargan una sola vez aunque haya muchos workers, y los pedidos simultáneos
+# se atienden en orden en vez de disputarse los núcleos. Los que llegan
+# dentro de INFERENCE_MAX_WAIT_MS se juntan en un micro-lote de hasta
+# INFERENCE_MAX_BATCH páginas, pero el motor PaddleOCR igual reconoce las
+# páginas de a una: no acelera cada página. Con python app.py o la CLI no
+# se usa.
+INFERENCE_SERVER = True
+INFERENCE_ADDRESS = None        # Socket Unix o tubería con nombre (None = 'ocr_inferencia_<PID de gunicorn>' en el directorio temporal)
+INFERENCE_MAX_BATCH = 8         # Páginas como máximo en cada micro-lote
+INFERENCE_MAX_WAIT_MS = 10      # Espera máxima del primer pedido de un lote a los siguientes
+INFERENCE_TIMEOUT = 120         # Segundos que un worker espera la respuesta del servidor
+
+# ==============================================================================
+# CORRECCIÓN ORTOGRÁFICA
+# ==============================================================================
+# Se usa solo en los perfiles con spell_check_enabled. El corrector de cada
+# idioma se construye una vez por proceso (tarda unos segundos) y se comparte.
+SPELL_MAX_DISTANCE = 2          # Letras cambiadas como máximo en una corrección
+SPELL_PREFIX_LENGTH = 7         # Letras indexadas por palabra (menos = menos RAM, búsquedas más lentas)
+SPELL_MEMO_SIZE = 50000         # Correcciones recordadas por idioma
+# Nombres y lugares del archivo que nunca se corrigen (una palabra por línea)
+SPELL_DOMAIN_WORDS_FILE = 'diccionario_archivo.txt'
+
+# ==============================================================================
+# CACHÉ DE RESULTADOS OCR
+# ==============================================================================
+# Guarda en disco lo que reconoció el OCR para cada imagen. Si volvés a procesar
+# la misma carpeta sin cambiar el preprocesamiento, el umbral ni el idioma, no se
+# repite la inferencia (cambiar la corrección ortográfica o la limpieza sí la reutiliza).
+CACHE_ENABLED = True
+CACHE_FOLDER = '.ocr_cache'     # Carpeta de la caché
+CACHE_MAX_MB = 500              # Tamaño máximo; se eliminan primero las entradas menos usadas
+
+# ==============================================================================
+# TRABAJOS ASÍNCRONOS (API)
+# ==============================================================================
+# POST /jobs guarda los archivos y los procesa en segundo plano.
+JOBS_FOLDER = '.trabajos'       # Carpeta con la base SQLite y los archivos subidos
+JOB_WORKERS = 2                 # Hilos que procesan páginas en cada proceso del servidor
+JOB_LEASE_SECONDS = 300         # Si una página tomada no termina en este plazo, se reintenta
+JOB_RETENTION_HOURS = 24        # Horas que se conservan los trabajos terminados
 
-# Extensiones de imagen válidas
-VALID_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif')
+# Extensiones de imagen válidas. Los TIFF y PDF de varias páginas se procesan
+# página por página; cada una aparece en el .txt como 'archivo#pN'.
+VALID_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tiff', '.tif', '.bmp', '.gif', '.pdf')
+PDF_RENDER_DPI = 200            # Resolución a la que se renderizan las páginas de los PDF
 
 # Configuración de logging
 LOG_FILE = 'ocr_process.log'
@@ -113,9 +327,45 @@ PARA DOCUMENTOS MODERNOS (PDFs nítidos):
 AJUSTES FINOS (si los resultados no son óptimos):
 - Si captura POCO TEXTO: bajar confidence_threshold (ej: 0.50)
 - Si hay MUCHO RUIDO: subir denoise_h (ej: 40)
+- Si el DENOISING es muy LENTO: probar denoise_method = 'speckle' o 'median'
+  (sobre la imagen ya binarizada el NLM cambia muy pocos píxeles; comparar
+  con python benchmarks/bench_ruido.py)
 - Si texto está BORROSO: activar sharpen = True
 - Si imágenes están TORCIDAS: activar deskew = True
+  (si el ángulo detectado falla, probar deskew_method = 'hough')
+  CAMBIO DE COMPORTAMIENTO: el estimador por defecto es 'projection' con
+  una banda muerta de deskew_min_angle grados. El método anterior
+  ('minarearect') sigue disponible, pero con OpenCV >= 4.5 gira 90° las
+  páginas derechas; las transcripciones con deskew activado cambian
+  respecto de versiones anteriores y la caché de resultados no se reusa
 - Si hay MANCHAS/MARCAS: subir binarize_block (ej: 41, 51)
+- Si el preprocesamiento de páginas LIMPIAS tarda mucho: poner adaptive =
+  True (se omiten las etapas que cada página no necesita)
+- Si con adaptive páginas DEGRADADAS salen sin CLAHE/nitidez/filtro de
+  ruido: ajustar UMBRALES_CALIDAD (el log muestra la calidad medida y la
+  decisión de cada página) o volver a adaptive = False
+- Si en una carpeta MEZCLADA la mayoría de las páginas son limpias: activar
+  CASCADE_ENABLED (solo las de baja confianza pasan por el preprocesamiento
+  completo; el resumen de la ejecución muestra cuántas se escalaron)
+- Si los escaneos tienen MÁRGENES ANCHOS, bordes del escáner o
+  perforaciones: poner crop_margins = True (cambia las imágenes
+  preprocesadas, así que la caché de resultados no se reusa)
+- Si con crop_margins se PIERDE TEXTO cerca de los bordes (números de
+  página, notas al margen): subir crop_padding o volver a crop_margins = False
+- Si el UMBRAL DE CONFIANZA deja afuera texto bueno (o deja pasar basura):
+  probar otro con python procesar_ocr.py --regenerate --threshold 0.6
+  (reescribe los .txt desde la tabla de renglones, sin repetir el OCR)
+- Si páginas DISTINTAS salen como duplicadas (formularios iguales con
+  pocos datos a mano): subir DUPLICATE_MIN_SIMILARITY (ej: 0.97) o poner
+  DUPLICATE_DETECTION = False. Los duplicados ya registrados en el
+  manifiesto se vuelven a comparar con --force
+- Si la API con varios workers se queda SIN MEMORIA: dejar
+  INFERENCE_SERVER = True (un solo proceso carga los modelos) y, si hay
+  muchos pedidos simultáneos, subir INFERENCE_MAX_BATCH
+- Si las páginas de ALTA RESOLUCIÓN (600 dpi o más) tardan mucho: poner
+  target_text_height = 32 (se reducen antes de preprocesar; cambia las
+  imágenes preprocesadas, así que la caché de resultados no se reusa). Si
+  después se leen PEOR, subirlo
 
 CREAR TU PROPIO PERFIL:
 Podés agregar un nuevo perfil en el diccionario PERFILES copiando la estructura
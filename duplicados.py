@@ -0,0 +1,254 @@
+"""
+Detección de páginas casi duplicadas antes del OCR.
+
+Los volcados de archivo (como image/FBI/) traen reescaneos y copias de la
+misma página que difieren en unos pocos píxeles o en la recompresión JPEG,
+así que el hash exacto de la caché no las reconoce. Cada página se compara
+en dos pasos:
+
+1. Huella perceptual (dhash) de una miniatura: cada bit dice si un bloque
+   de una grilla de size x size es más claro que el de su derecha (y otros
+   tantos, que el de abajo). Las huellas se guardan en un BK-tree, que
+   encuentra las que están a poca distancia de Hamming sin compararlas a
+   todas. Es solo un filtro: en páginas de texto con el mismo diseño
+   (formularios, memos) las huellas de páginas distintas se parecen.
+2. Verificación de cada candidata: las dos miniaturas se alinean por
+   correlación de fase (un reescaneo suele estar corrido unos píxeles) y se
+   comparan con correlación normalizada. Solo si supera min_similarity la
+   página se considera un duplicado.
+
+Un falso negativo solo cuesta pasar la página por el OCR; un falso positivo
+copia el texto de otra página, así que los umbrales son conservadores: una
+página rotada o recortada distinto no se toma como copia.
+"""
+
+import io
+import os
+from functools import lru_cache
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from paginas import read_page, split_page_ref
+from resolucion import is_jpeg, decode
+
+# Ancho de la miniatura que se compara (las huellas salen de la misma miniatura)
+THUMB_WIDTH = 256
+# Resolución de los PDF al leerlos para la miniatura
+THUMB_DPI = 50
+# Diferencia mínima (sobre 255, con el contraste estirado) entre dos bloques
+# para que el bit valga 1: en las zonas lisas el ruido no cambia la huella
+HASH_EPSILON = 5
+# Miniaturas de páginas ya vistas que se mantienen en memoria para verificar
+THUMB_CACHE_SIZE = 64
+
+def _read_gray(source):
+    """Página en escala de grises, ya reducida si se puede (JPEG a 1/2-1/8 y PDF a THUMB_DPI)."""
+    if not isinstance(source, str):
+        # Bytes de un archivo subido: se decodifican en memoria
+        if not is_jpeg(source):
+            return decode(source, cv2.IMREAD_GRAYSCALE)
+        path, number = io.BytesIO(source), None
+    else:
+        path, number = split_page_ref(source)
+    if number is None and is_jpeg(source):
+        try:
+            with Image.open(path) as header:
+                width = header.size[0]
+        except OSError:
+            return None
+        reduction = max(f for f in (1, 2, 4, 8) if f == 1 or width / f >= THUMB_WIDTH)
+        flags = {1: cv2.IMREAD_GRAYSCALE, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+                 4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+        return decode(source, flags[reduction])
+    img = read_page(source, dpi=THUMB_DPI)
+    if img is None:
+        return None
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+def thumbnail(img):
+    """Miniatura normalizada: gris, THUMB_WIDTH de ancho y contraste estirado entre los percentiles 1 y 99."""
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    h, w = img.shape
+    img = cv2.resize(img, (THUMB_WIDTH, max(1, round(h * THUMB_WIDTH / w))), interpolation=cv2.INTER_AREA)
+    low, high = np.percentile(img, (1, 99))
+    stretched = (img.astype(np.float32) - low) * (255.0 / max(1.0, high - low))
+    return np.clip(stretched, 0, 255).astype(np.uint8)
+
+def dhash(thumb, size=16):
+    """
+    Huella perceptual de una miniatura (ver thumbnail).
+
+    Args:
+        thumb: Miniatura en escala de grises
+        size: Lado de la grilla (la huella tiene 2 * size * size bits)
+
+    Returns:
+        int: La huella
+    """
+    grid = cv2.resize(thumb, (size + 1, size + 1), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = np.concatenate(((grid[:size, 1:] - grid[:size, :-1] > HASH_EPSILON).ravel(),
+                           (grid[1:, :size] - grid[:-1, :size] > HASH_EPSILON).ravel()))
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def image_thumbnail(source):
+    """Miniatura de una página en disco ('archivo.jpg' o 'archivo.pdf#p3') o de los bytes de una imagen; None si no se pudo leer."""
+    gray = _read_gray(source)
+    if gray is None:
+        return None
+    return thumbnail(gray)
+
+@lru_cache(maxsize=THUMB_CACHE_SIZE)
+def _page_thumbnail_version(ref, size, mtime_ns):
+    return image_thumbnail(ref)
+
+def page_thumbnail(ref):
+    """
+    image_thumbnail de una página en disco, recordada para las verificaciones
+    mientras el archivo no cambie (mismo tamaño y fecha, como
+    cache_ocr.hash_file_cached); None si no se pudo leer.
+    """
+    try:
+        stat = os.stat(split_page_ref(ref)[0])
+    except OSError:
+        return None
+    return _page_thumbnail_version(ref, stat.st_size, stat.st_mtime_ns)
+
+def similarity(a, b):
+    """
+    Parecido entre dos miniaturas, de -1 a 1.
+
+    Corrige el corrimiento entre las dos con correlación de fase y devuelve
+    la correlación normalizada de la tinta (1 = idénticas).
+    """
+    h = min(a.shape[0], b.shape[0])
+    a = 255.0 - a[:h].astype(np.float32)
+    b = 255.0 - b[:h].astype(np.float32)
+    window = cv2.createHanningWindow((a.shape[1], h), cv2.CV_32F)
+    (dx, dy), _ = cv2.phaseCorrelate(a, b, window)
+    a = cv2.warpAffine(a, np.float32([[1, 0, dx], [0, 1, dy]]), (a.shape[1], h))
+    a = cv2.GaussianBlur(a, (3, 3), 0)
+    b = cv2.GaussianBlur(b, (3, 3), 0)
+    return float(cv2.matchTemplate(a, b, cv2.TM_CCOEFF_NORMED)[0, 0])
+
+def hamming(a, b):
+    """Cantidad de bits distintos entre dos huellas."""
+    return (a ^ b).bit_count()
+
+class BKTree:
+    """
+    Árbol BK con distancia de Hamming entre huellas.
+
+    Cada nodo guarda sus hijos por distancia; al buscar con tolerancia t solo
+    se baja por los hijos a distancia d ± t del nodo (desigualdad triangular).
+    """
+
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, key, value):
+        """Agrega una huella con su valor asociado."""
+        self._size += 1
+        if self._root is None:
+            self._root = (key, value, {})
+            return
+        node = self._root
+        while True:
+            distance = hamming(key, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (key, value, {})
+                return
+            node = child
+
+    def find(self, key, max_distance):
+        """
+        Huellas a distancia <= max_distance de 'key'.
+
+        Returns:
+            list: Tuplas (distancia, valor), de la más cercana a la más lejana
+        """
+        found = []
+        pending = [self._root] if self._root is not None else []
+        while pending:
+            node_key, value, children = pending.pop()
+            distance = hamming(key, node_key)
+            if distance <= max_distance:
+                found.append((distance, value))
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    pending.append(child)
+        return sorted(found, key=lambda item: item[0])
+
+class DuplicateIndex:
+    """
+    Páginas vistas hasta ahora, para reconocer las casi duplicadas.
+
+    Args:
+        max_distance: Bits distintos tolerados entre huellas para verificar
+                      una candidata, como fracción de la huella (0-1)
+        min_similarity: Parecido mínimo (ver similarity) para que sea un duplicado
+        size: Lado de la grilla de dhash
+    """
+
+    def __init__(self, max_distance=0.1, min_similarity=0.93, size=16):
+        self.max_bits = int(max_distance * 2 * size * size)
+        self.min_similarity = min_similarity
+        self.size = size
+        self._tree = BKTree()
+        self._thumbs = {}
+
+    def __len__(self):
+        return len(self._tree)
+
+    def find(self, key, thumb):
+        """
+        Página ya vista igual a esta.
+
+        Args:
+            key: Huella de la página (ver dhash)
+            thumb: Miniatura de la página (ver thumbnail/page_thumbnail)
+
+        Returns:
+            str | None: Nombre de la página original, o None si no hay
+        """
+        for _, original in self._tree.find(key, self.max_bits):
+            other = self._thumbs.get(original)
+            if other is None:
+                other = page_thumbnail(original)
+            if other is not None and similarity(other, thumb) >= self.min_similarity:
+                return original
+        return None
+
+    def add(self, key, name, thumb=None):
+        """
+        Registra una página como original.
+
+        Args:
+            key: Huella de la página (ver dhash)
+            name: Nombre de la página. Para verificar contra ella más adelante
+                  se vuelve a leer con page_thumbnail(name), salvo que se pase 'thumb'
+            thumb: Miniatura a guardar en memoria (páginas que no están en disco)
+        """
+        self._tree.add(key, name)
+        if thumb is not None:
+            self._thumbs[name] = thumb
+
+    def check(self, name, thumb, keep_thumbnail=False):
+        """
+        Busca una página ya vista igual a esta; si no hay, la registra como original.
+
+        Returns:
+            str | None: Nombre de la página original si es un duplicado
+        """
+        key = dhash(thumb, self.size)
+        original = self.find(key, thumb)
+        if original is None:
+            self.add(key, name, thumb if keep_thumbnail else None)
+        return original
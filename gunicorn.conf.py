@@ -0,0 +1,73 @@
+"""
+Configuración de gunicorn para la API (Procfile, render.yaml).
+
+Con INFERENCE_SERVER activado, el proceso principal lanza antes que los
+workers el servidor de inferencia compartido (procesar_ocr.py
+--serve-inference, ver inferencia.py) y les pasa su dirección y clave por
+el entorno. Los workers quedan livianos: preprocesan y mandan las páginas
+al servidor, que es el único que carga los modelos. Un hilo del proceso
+principal vigila al servidor y lo vuelve a lanzar apenas termina, sin
+esperar a que gunicorn cree otro worker.
+
+Los hilos de cada worker (cola de trabajos, precarga de motores) se
+arrancan recién cuando el worker cargó la aplicación (post_worker_init).
+"""
+
+import os
+import secrets
+import subprocess
+import sys
+import threading
+
+from config import INFERENCE_ADDRESS, INFERENCE_SERVER
+from inferencia import ADDRESS_ENV, AUTHKEY_ENV, default_address
+
+# Segundos que se espera antes de volver a lanzar un servidor que terminó
+# (si muere apenas arranca, no se lo relanza en un ciclo cerrado)
+RESTART_DELAY = 2
+
+_inference_process = None
+_stopping = threading.Event()
+
+def _start_inference_server(log):
+    global _inference_process
+    _inference_process = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'procesar_ocr.py'),
+         '--serve-inference'])
+    log.info(f"Servidor de inferencia lanzado (PID {_inference_process.pid}) en {os.environ[ADDRESS_ENV]}")
+
+def _supervise_inference_server(log):
+    """Vuelve a lanzar el servidor de inferencia cada vez que termina, hasta que gunicorn se detenga."""
+    while not _stopping.is_set():
+        # El código de salida no sirve: gunicorn recoge a todos los procesos hijos que terminan
+        _inference_process.wait()
+        if _stopping.wait(RESTART_DELAY):
+            return
+        log.warning("El servidor de inferencia terminó; se lanza otra vez")
+        _start_inference_server(log)
+
+def on_starting(server):
+    if not INFERENCE_SERVER:
+        return
+    # Los workers (y el servidor) heredan el entorno del proceso principal. La
+    # dirección lleva el PID para que otro despliegue en la misma máquina no la comparta
+    os.environ[ADDRESS_ENV] = INFERENCE_ADDRESS or default_address(f'ocr_inferencia_{os.getpid()}')
+    os.environ[AUTHKEY_ENV] = secrets.token_hex(16)
+    _start_inference_server(server.log)
+    threading.Thread(target=_supervise_inference_server, args=(server.log,),
+                     name="inferencia-vigilancia", daemon=True).start()
+
+def post_worker_init(worker):
+    # La aplicación ya está importada en el worker: se toma el mismo módulo
+    from app import start_background_workers
+    start_background_workers()
+
+def on_exit(server):
+    _stopping.set()
+    if _inference_process is None or _inference_process.poll() is not None:
+        return
+    _inference_process.terminate()
+    try:
+        _inference_process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        _inference_process.kill()
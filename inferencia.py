@@ -0,0 +1,359 @@
+"""
+Servidor de inferencia compartido por los procesos del servidor web.
+
+Con gunicorn cada worker importaba procesar_ocr y cargaba sus propios
+motores PaddleOCR: la memoria se multiplicaba por la cantidad de workers y
+los pedidos simultáneos se disputaban los núcleos sin coordinarse.
+InferenceServer corre en un proceso aparte (lo lanza gunicorn.conf.py), es
+el único dueño de los motores y atiende a los workers por un socket Unix
+(o una tubería con nombre en Windows) de multiprocessing.connection.
+
+Los workers siguen preprocesando cada página y solo mandan la imagen ya
+preprocesada con InferenceClient. El servidor junta los pedidos que llegan
+dentro de una ventana corta en micro-lotes:
+
+- el primer pedido abre el lote y espera como mucho max_wait a los demás;
+- el lote se cierra antes si junta max_batch páginas;
+- las páginas del lote se agrupan por idioma y se pasan en una sola llamada
+  a la función recibida, y a cada worker le vuelven los renglones de sus
+  páginas.
+
+procesar_ocr pasa la lista al predict del mismo motor PaddleOCR que usa
+sin servidor, y ese predict igual recorre las páginas de a una: el lote
+no hace inferencia por lotes. Lo que se gana es que los pedidos de todos
+los workers se atienden en un solo proceso, con una sola copia de los
+modelos y sin que compitan por los núcleos; la cantidad de workers web se
+puede aumentar sin duplicar la memoria.
+
+Los mensajes son ('recognize', idioma, imágenes) y ('status',); este último
+lo responde el servidor enseguida, sin pasar por la cola (ver
+InferenceClient.status, lo usa GET /health).
+"""
+
+import logging
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.connection import AuthenticationError, Client, Listener
+
+logger = logging.getLogger(__name__)
+
+# Variables de entorno con las que el proceso que lanza el servidor le pasa
+# a los workers la dirección y la clave (ver client_from_env)
+ADDRESS_ENV = 'OCR_INFERENCE_ADDRESS'
+AUTHKEY_ENV = 'OCR_INFERENCE_AUTHKEY'
+
+def default_address(name='ocr_inferencia'):
+    """
+    Dirección por defecto: tubería con nombre en Windows, socket Unix en el
+    directorio temporal en el resto. Cada despliegue tiene que usar su propio
+    nombre (gunicorn.conf.py le agrega el PID del proceso principal).
+    """
+    if sys.platform == 'win32':
+        return rf'\\.\pipe\{name}'
+    return os.path.join(tempfile.gettempdir(), f'{name}.sock')
+
+class _Request:
+    """Pedido de un worker: páginas de un idioma y la conexión por la que se responde."""
+
+    def __init__(self, conn, language, images):
+        self.conn = conn
+        self.language = language
+        self.images = images
+
+class InferenceServer:
+    """
+    Servidor de inferencia con micro-lotes dinámicos.
+
+    Args:
+        recognize: Función (idioma, imágenes) -> por cada imagen, tuplas
+                   (texto, confianza, cuadrilátero) en orden de lectura
+        address: Ruta del socket Unix o nombre de la tubería (ver default_address)
+        authkey: Clave que tienen que presentar los clientes (bytes, o None)
+        max_batch: Páginas como máximo en cada micro-lote
+        max_wait: Segundos que el primer pedido de un lote espera a los siguientes
+        status: Función sin argumentos que devuelve un diccionario con datos
+                para agregar al estado del servidor (p. ej. los motores cargados)
+    """
+
+    def __init__(self, recognize, address, authkey=None, max_batch=8, max_wait=0.01, status=None):
+        self.recognize = recognize
+        self.extra_status = status
+        self.address = address
+        self.authkey = authkey
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait))
+        self.batches = 0
+        self.pages = 0
+        self._requests = queue.Queue()
+        self._listener = None
+        self._closing = False
+
+    def _remove_stale_socket(self):
+        """
+        Borra el socket de una ejecución anterior que terminó sin borrarlo.
+        Si todavía hay un servidor atendiendo en la dirección, no se toca.
+
+        Raises:
+            OSError: Si la dirección está en uso por otro servidor
+        """
+        if sys.platform == 'win32' or not os.path.exists(self.address):
+            return
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Nadie escucha: el archivo quedó de un proceso que terminó
+            os.remove(self.address)
+            return
+        except (OSError, AuthenticationError):
+            # Responde otro proceso (con otra clave o sin ella)
+            pass
+        raise OSError(f"Ya hay un servidor de inferencia atendiendo en {self.address}")
+
+    def serve_forever(self):
+        """
+        Atiende conexiones hasta que se llame a close() (bloquea).
+
+        Raises:
+            OSError: Si otro servidor ya atiende en la dirección
+        """
+        self._remove_stale_socket()
+        self._listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._run_batches, name="inferencia-lotes", daemon=True).start()
+        logger.info(f"Servidor de inferencia escuchando en {self.address} "
+                    f"(lote: {self.max_batch} páginas, espera: {self.max_wait * 1000:.0f} ms)")
+        try:
+            while True:
+                try:
+                    conn = self._listener.accept()
+                except AuthenticationError as e:
+                    logger.warning(f"Conexión rechazada por el servidor de inferencia: {e}")
+                    continue
+                except (EOFError, ConnectionError):
+                    # El cliente cortó durante el saludo
+                    continue
+                if self._closing:
+                    conn.close()
+                    break
+                threading.Thread(target=self._serve_connection, args=(conn,),
+                                 name="inferencia-conexion", daemon=True).start()
+        finally:
+            # También si se interrumpió (Ctrl+C o SIGTERM): cerrar el listener borra el socket
+            listener, self._listener = self._listener, None
+            listener.close()
+            self._requests.put(None)
+
+    def close(self):
+        """Deja de aceptar conexiones (serve_forever vuelve)."""
+        if self._listener is None:
+            return
+        # Cerrar el socket desde otro hilo no despierta a accept(): se lo despierta conectándose
+        self._closing = True
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except OSError:
+            pass
+
+    def status(self):
+        """Estado del servidor: micro-lotes y páginas atendidos y lo que agregue la función 'status'."""
+        estado = {'batches': self.batches, 'pages': self.pages}
+        if self.extra_status is not None:
+            estado.update(self.extra_status())
+        return estado
+
+    def _serve_connection(self, conn):
+        """Recibe los pedidos de un worker y los encola; cada worker espera la respuesta antes del siguiente."""
+        try:
+            while True:
+                mensaje = conn.recv()
+                if mensaje[0] == 'status':
+                    conn.send(('ok', self.status()))
+                    continue
+                _, language, images = mensaje
+                self._requests.put(_Request(conn, language, images))
+        except (EOFError, OSError):
+            conn.close()
+
+    def _next_batch(self):
+        """Pedidos del próximo micro-lote (None si el servidor se cerró)."""
+        first = self._requests.get()
+        if first is None:
+            return None
+        batch = [first]
+        pages = len(first.images)
+        deadline = time.monotonic() + self.max_wait
+        while pages < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._requests.put(None)
+                break
+            batch.append(request)
+            pages += len(request.images)
+        return batch
+
+    def _run_batches(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            by_language = {}
+            for request in batch:
+                by_language.setdefault(request.language, []).append(request)
+            for language, requests in by_language.items():
+                self._run(language, requests)
+
+    def _run(self, language, requests):
+        """Reconoce juntas las páginas de un idioma y responde a cada pedido con las suyas."""
+        images = [image for request in requests for image in request.images]
+        inicio = time.perf_counter()
+        try:
+            resultados = self.recognize(language, images)
+            respuestas = []
+            for request in requests:
+                respuestas.append(('ok', resultados[:len(request.images)]))
+                resultados = resultados[len(request.images):]
+        except Exception as e:
+            logger.error(f"Error en un micro-lote de inferencia ({language}, {len(images)} páginas): {e}",
+                         exc_info=True)
+            respuestas = [('error', str(e))] * len(requests)
+        self.batches += 1
+        self.pages += len(images)
+        logger.debug(f"Micro-lote de inferencia: {len(requests)} pedido(s), {len(images)} página(s) "
+                     f"en '{language}', {time.perf_counter() - inicio:.2f} s")
+        for request, respuesta in zip(requests, respuestas):
+            try:
+                request.conn.send(respuesta)
+            except OSError:
+                # El worker se desconectó mientras esperaba
+                pass
+
+class InferenceClient:
+    """
+    Cliente del servidor de inferencia, seguro entre hilos (una conexión por hilo).
+
+    Args:
+        address: Dirección del servidor (ver default_address)
+        authkey: Clave del servidor (bytes, o None)
+        timeout: Segundos que se espera la respuesta de un pedido
+        connect_timeout: Segundos que se reintenta la conexión (el servidor
+                         puede estar arrancando todavía)
+    """
+
+    def __init__(self, address, authkey=None, timeout=120, connect_timeout=30):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                conn = Client(self.address, authkey=self.authkey)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() >= deadline:
+                    raise ConnectionError(f"No se pudo conectar con el servidor de inferencia en {self.address}")
+                time.sleep(0.2)
+        self._local.conn = conn
+        return conn
+
+    def _drop(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def recognize(self, images, language):
+        """
+        Reconoce páginas preprocesadas en el servidor.
+
+        Args:
+            images: Lista de páginas (escala de grises o BGR)
+            language: Código de idioma de PaddleOCR
+
+        Returns:
+            list: Por cada página, tuplas (texto, confianza, cuadrilátero) en orden de lectura
+        """
+        # Si el servidor se reinició, la conexión del hilo quedó cerrada: se reintenta una vez
+        for intento in range(2):
+            conn = self._connection()
+            try:
+                conn.send(('recognize', language, list(images)))
+                respondio = conn.poll(self.timeout)
+                if respondio:
+                    estado, respuesta = conn.recv()
+                break
+            except (EOFError, OSError) as e:
+                self._drop()
+                if intento:
+                    raise ConnectionError(f"Se perdió la conexión con el servidor de inferencia: {e}") from e
+        if not respondio:
+            # La respuesta atrasada no tiene que llegarle al próximo pedido del hilo
+            self._drop()
+            raise TimeoutError(f"El servidor de inferencia no respondió en {self.timeout} s")
+        if estado != 'ok':
+            raise RuntimeError(f"Error en el servidor de inferencia: {respuesta}")
+        return respuesta
+
+    def status(self, timeout=2):
+        """
+        Consulta el estado del servidor por una conexión propia, sin esperar
+        a que arranque (sirve para saber si está vivo).
+
+        Args:
+            timeout: Segundos que se espera la respuesta
+
+        Returns:
+            dict: Estado del servidor (ver InferenceServer.status)
+
+        Raises:
+            ConnectionError: Si el servidor no atiende en la dirección
+            TimeoutError: Si no respondió en 'timeout' segundos
+        """
+        try:
+            conn = Client(self.address, authkey=self.authkey)
+        except (OSError, AuthenticationError) as e:
+            raise ConnectionError(f"No se pudo conectar con el servidor de inferencia en {self.address}: {e}") from e
+        try:
+            conn.send(('status',))
+            respondio = conn.poll(timeout)
+            if respondio:
+                _, respuesta = conn.recv()
+        except (EOFError, OSError) as e:
+            raise ConnectionError(f"Se perdió la conexión con el servidor de inferencia: {e}") from e
+        finally:
+            conn.close()
+        if not respondio:
+            raise TimeoutError(f"El servidor de inferencia no respondió en {timeout} s")
+        return respuesta
+
+    def close(self):
+        """Cierra la conexión del hilo actual."""
+        self._drop()
+
+def client_from_env(**kwargs):
+    """
+    Cliente del servidor que lanzó el proceso padre (ver gunicorn.conf.py).
+
+    Returns:
+        InferenceClient | None: None si no hay un servidor configurado en el entorno
+    """
+    address = os.environ.get(ADDRESS_ENV)
+    if not address:
+        return None
+    authkey = os.environ.get(AUTHKEY_ENV)
+    return InferenceClient(address, authkey.encode() if authkey else None, **kwargs)
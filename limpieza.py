@@ -0,0 +1,143 @@
+"""
+Limpieza de artefactos del OCR con reglas compiladas.
+
+Las reglas de cada perfil (config.py) son reemplazos de texto que se aplican
+en orden, como una serie de str.replace: cada regla ve el resultado de las
+anteriores ('n00' -> 'no0' -> 'noo'), así que el orden es parte del resultado.
+
+Un str.replace recorre el texto en C a velocidad de memoria; medido con estas
+reglas, una sola alternancia de expresiones regulares con todas ellas es unas
+dos veces más lenta que los doce str.replace, y un autómata de Aho-Corasick
+en Python puro bastante más. Por eso CleanupRules no junta las reglas en una
+sola expresión sino que evita los recorridos que no pueden cambiar nada:
+
+- Las reglas consecutivas que comparten un carácter poco común (un dígito, un
+  símbolo, una mayúscula) forman un grupo. Antes de aplicarlo se busca ese
+  carácter una sola vez: si el texto no lo tiene, se saltea el grupo entero.
+  Como la búsqueda se hace justo antes del grupo, el resultado es idéntico al
+  de aplicar todas las reglas.
+- Las expresiones regulares de la limpieza agresiva se compilan una sola vez,
+  y clean_batch() las aplica a los renglones de muchos textos (una o varias
+  páginas) unidos, con un solo recorrido en lugar de uno por renglón.
+"""
+
+import re
+
+def _gate_char(pattern):
+    """Carácter del patrón que menos aparece en texto común (sin él la regla no puede aplicarse)."""
+    return min(pattern, key=lambda c: 2 if c.islower() else 1 if c.isupper() else 0)
+
+def plan_groups(replacements):
+    """
+    Agrupa las reglas consecutivas que comparten el carácter de control.
+
+    Returns:
+        list: Tuplas (carácter de control o None, [(patrón, reemplazo), ...]).
+              Los grupos de una sola regla no tienen control: buscar el
+              carácter costaría lo mismo que el str.replace.
+    """
+    groups = []
+    for old, new in replacements:
+        gate = _gate_char(old)
+        if groups and groups[-1][0] == gate:
+            groups[-1][1].append((old, new))
+        else:
+            groups.append((gate, [(old, new)]))
+    return [(gate if len(rules) > 1 else None, rules) for gate, rules in groups]
+
+class CleanupRules:
+    """
+    Reglas de limpieza de un perfil, compiladas una sola vez.
+
+    Args:
+        replacements: Reemplazos {patrón: reemplazo}, aplicados en orden
+        noise_symbols: Caracteres que se eliminan en la limpieza agresiva
+    """
+
+    def __init__(self, replacements, noise_symbols=''):
+        rules = list(replacements.items())
+        for old, new in rules:
+            if not old:
+                raise ValueError("Las reglas de limpieza no pueden tener un patrón vacío")
+        if '\n' in noise_symbols:
+            raise ValueError("Los símbolos de ruido no pueden incluir saltos de línea")
+
+        self._groups = plan_groups(rules)
+        self._noise = re.compile('[' + re.escape(noise_symbols) + ']') if noise_symbols else None
+        # Igual que \s{2,} dentro de un renglón, sin cruzar al siguiente
+        self._spaces = re.compile(r'[^\S\n]{2,}')
+
+    @property
+    def groups(self):
+        """Cantidad de grupos de reglas (cada uno se saltea si falta su carácter)."""
+        return len(self._groups)
+
+    def _replace(self, text):
+        for gate, rules in self._groups:
+            if gate is not None and gate not in text:
+                continue
+            for old, new in rules:
+                text = text.replace(old, new)
+        return text
+
+    def clean(self, text, aggressive=False):
+        """
+        Limpia un texto (puede tener varios renglones).
+
+        Args:
+            text: Texto a limpiar
+            aggressive: Descartar renglones de 1-2 símbolos, eliminar símbolos
+                        de ruido y espacios múltiples
+
+        Returns:
+            str: Texto limpiado
+        """
+        if not aggressive:
+            return self._replace(text) if text else text
+        return self.clean_batch([text], aggressive)[0]
+
+    def clean_batch(self, texts, aggressive=False):
+        """
+        Limpia muchos textos en una sola llamada (por ejemplo, todos los
+        renglones de varias páginas). Da lo mismo que llamar a clean() con cada uno.
+
+        Args:
+            texts: Lista de textos (renglones sueltos o páginas enteras)
+            aggressive: Ver clean()
+
+        Returns:
+            list: Textos limpiados, en el mismo orden
+        """
+        # Los reemplazos van texto por texto: en un texto corto es más probable
+        # que falte el carácter de control de algún grupo y se lo saltee
+        results = [self._replace(text) if text else text for text in texts]
+        if not aggressive:
+            return results
+        indices = [i for i, text in enumerate(results) if text]
+        if not indices:
+            return results
+
+        # La limpieza agresiva se hace sobre los renglones de todos los textos
+        # juntos: cada expresión regular recorre el texto unido una sola vez
+        lines = [line for i in indices for line in results[i].split('\n')]
+        counts = [results[i].count('\n') + 1 for i in indices]
+        grouped, start = [], 0
+        for n in counts:
+            # Eliminar líneas con solo 1-2 caracteres que sean símbolos o números sueltos
+            grouped.append([line for line in lines[start:start + n]
+                            if len(line.strip()) > 2 or line.strip().isalpha()])
+            start += n
+        lines = [line for group in grouped for line in group]
+        counts = [len(group) for group in grouped]
+        if lines:
+            joined = '\n'.join(lines)
+            if self._noise is not None:
+                joined = self._noise.sub('', joined)
+            joined = self._spaces.sub(' ', joined)
+            lines = joined.split('\n')
+
+        start = 0
+        for i, n in zip(indices, counts):
+            results[i] = '\n'.join(lines[start:start + n])
+            start += n
+        return results
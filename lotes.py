@@ -0,0 +1,192 @@
+"""
+Reconocimiento por lotes entre páginas.
+
+El pipeline de PaddleOCR reconoce los renglones de cada página por separado:
+en páginas con poco texto (fichas, memos cortos) los lotes de reconocimiento
+quedan de 2 o 3 renglones y el costo fijo de cada llamada domina en CPU.
+
+BatchRecognizer separa las etapas: detecta los renglones página por página,
+junta los recortes de muchas páginas y los reconoce en lotes grandes de
+tamaño configurable. Después reparte los resultados a cada página en el
+mismo formato que parse_ocr_result: una lista de tuplas (texto, confianza,
+cuadrilátero) en orden de lectura.
+
+Los modelos (detección, reconocimiento, orientación de renglones) y el
+preprocesamiento de documento (orientación de la página y enderezado UVDoc)
+se reciben explícitos, y procesar_ocr le pasa los mismos que al motor por
+página. Aun así no es el pipeline de PaddleOCR: el orden de lectura sale de
+sort_boxes y los recortes de crop_textline, así que algunos renglones pueden
+salir en otro orden o recortados un poco distinto. Por eso el modo por lotes
+está desactivado por defecto (OCR_BATCH_PAGES = 0).
+"""
+
+import logging
+
+import cv2
+import numpy as np
+from paddleocr import (
+    DocPreprocessor, TextDetection, TextLineOrientationClassification, TextRecognition
+)
+
+from metricas import span
+from renglones import box_list, doc_preprocessor_boxes
+
+logger = logging.getLogger(__name__)
+
+# Parámetros de detección del pipeline OCR de PaddleOCR (OCR.yaml), para que
+# el modo por lotes encuentre los mismos renglones que el modo por página
+DETECTION_PARAMS = {
+    'limit_side_len': 64,
+    'limit_type': 'min',
+    'thresh': 0.3,
+    'box_thresh': 0.6,
+    'unclip_ratio': 1.5,
+}
+
+def sort_boxes(polys):
+    """Ordena los renglones de arriba hacia abajo y de izquierda a derecha (como PaddleOCR)."""
+    boxes = sorted(polys, key=lambda p: (p[0][1], p[0][0]))
+    for i in range(len(boxes) - 1):
+        for j in range(i, -1, -1):
+            if abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10 and boxes[j + 1][0][0] < boxes[j][0][0]:
+                boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
+            else:
+                break
+    return boxes
+
+def crop_textline(image, poly):
+    """
+    Recorta un renglón enderezándolo con una transformación de perspectiva.
+
+    Args:
+        image: Página BGR
+        poly: Cuadrilátero del renglón (4 puntos, sentido horario desde arriba a la izquierda)
+
+    Returns:
+        np.ndarray: Recorte del renglón, o None si quedó vacío
+    """
+    points = np.asarray(poly, dtype=np.float32)
+    width = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+    height = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+    if width <= 0 or height <= 0:
+        return None
+    target = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+    M = cv2.getPerspectiveTransform(points, target)
+    crop = cv2.warpPerspective(image, M, (width, height),
+                               borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+    # Renglones verticales: se acuestan para el reconocedor
+    if crop.shape[0] / float(crop.shape[1]) >= 1.5:
+        crop = np.rot90(crop)
+    return crop
+
+class BatchRecognizer:
+    """
+    Detección por página + reconocimiento agrupado entre páginas.
+
+    Args:
+        detection_model: Modelo de detección de PaddleOCR
+        recognition_model: Modelo de reconocimiento de PaddleOCR
+        orientation_model: Modelo de orientación de renglones (None = no clasificarlos)
+        doc_orientation_model: Modelo de orientación de la página (None = no girarlas)
+        doc_unwarping_model: Modelo de enderezado de la página (None = no enderezarlas)
+        rec_batch_size: Renglones por lote de reconocimiento
+    """
+
+    def __init__(self, detection_model, recognition_model, orientation_model=None,
+                 doc_orientation_model=None, doc_unwarping_model=None, rec_batch_size=32):
+        self.rec_batch_size = max(1, int(rec_batch_size))
+        self.detector = TextDetection(model_name=detection_model, **DETECTION_PARAMS)
+        self.recognizer = TextRecognition(model_name=recognition_model)
+        self.orientation = (TextLineOrientationClassification(model_name=orientation_model)
+                            if orientation_model else None)
+        self.doc_preprocessor = None
+        if doc_orientation_model or doc_unwarping_model:
+            self.doc_preprocessor = DocPreprocessor(
+                doc_orientation_classify_model_name=doc_orientation_model,
+                doc_unwarping_model_name=doc_unwarping_model,
+                use_doc_orientation_classify=bool(doc_orientation_model),
+                use_doc_unwarping=bool(doc_unwarping_model))
+        logger.info(f"Reconocedor por lotes inicializado (detección: {detection_model}, "
+                    f"reconocimiento: {recognition_model}, lote: {self.rec_batch_size})")
+
+    def _preprocess_documents(self, images):
+        """
+        Páginas giradas y enderezadas como en el pipeline de PaddleOCR (los
+        renglones se ubican sobre estas) y el resultado del preprocesador de
+        cada una, para llevar los cuadriláteros a la página recibida.
+        """
+        if self.doc_preprocessor is None:
+            return images, [None] * len(images)
+        results = list(self.doc_preprocessor.predict(input=images, batch_size=1))
+        return [result['output_img'] for result in results], results
+
+    def _detect(self, images):
+        """Cuadriláteros de los renglones de cada página, en orden de lectura."""
+        polys = []
+        for result in self.detector.predict(input=images, batch_size=1):
+            polys.append(sort_boxes(list(result['dt_polys'])))
+        return polys
+
+    def _orient(self, crops):
+        """Gira 180° los renglones que el clasificador detecta invertidos."""
+        if self.orientation is None or not crops:
+            return crops
+        results = self.orientation.predict(input=crops, batch_size=self.rec_batch_size)
+        for i, result in enumerate(results):
+            if int(np.asarray(result['class_ids']).ravel()[0]) == 1:
+                crops[i] = cv2.rotate(crops[i], cv2.ROTATE_180)
+        return crops
+
+    def recognize(self, images):
+        """
+        Reconoce varias páginas preprocesadas compartiendo los lotes de reconocimiento.
+
+        Args:
+            images: Lista de páginas (escala de grises o BGR)
+
+        Returns:
+            list: Por cada página, tuplas (texto, confianza, cuadrilátero) en orden
+                  de lectura; el cuadrilátero es None en las páginas enderezadas
+                  con UVDoc (ver renglones.doc_preprocessor_boxes)
+        """
+        if not images:
+            return []
+        images = [cv2.cvtColor(img, cv2.COLOR_GRAY2BGR) if img.ndim == 2 else img for img in images]
+        with span('ocr.doc_preprocess'):
+            images, doc_results = self._preprocess_documents(images)
+
+        # 1. Detección página por página
+        crops, owners, boxes = [], [], []
+        with span('ocr.detection'):
+            for page, (image, page_polys) in enumerate(zip(images, self._detect(images))):
+                for poly in page_polys:
+                    crop = crop_textline(image, poly)
+                    if crop is not None:
+                        crops.append(crop)
+                        owners.append(page)
+                        boxes.append(box_list(poly))
+        with span('ocr.orientation'):
+            crops = self._orient(crops)
+
+        # 2. Reconocimiento de todos los renglones juntos. Ordenarlos por
+        # proporción ancho/alto reduce el relleno dentro de cada lote.
+        order = sorted(range(len(crops)), key=lambda i: crops[i].shape[1] / float(crops[i].shape[0]))
+        recognized = [None] * len(crops)
+        with span('ocr.recognition'):
+            for start in range(0, len(order), self.rec_batch_size):
+                chunk = order[start:start + self.rec_batch_size]
+                results = self.recognizer.predict(input=[crops[i] for i in chunk], batch_size=len(chunk))
+                for i, result in zip(chunk, results):
+                    recognized[i] = (result['rec_text'], float(result['rec_score']), boxes[i])
+        logger.debug(f"Lote OCR: {len(images)} página(s), {len(crops)} renglones, "
+                     f"{-(-len(crops) // self.rec_batch_size)} lote(s) de reconocimiento")
+
+        # 3. Repartir los resultados a cada página, en el orden original, con
+        # los cuadriláteros sobre la página recibida (sin el giro del preprocesador)
+        lineas = [[] for _ in images]
+        for page, line in zip(owners, recognized):
+            lineas[page].append(line)
+        for page, doc_result in enumerate(doc_results):
+            boxes = doc_preprocessor_boxes([box for _, _, box in lineas[page]], doc_result)
+            lineas[page] = [(text, score, box) for (text, score, _), box in zip(lineas[page], boxes)]
+        return lineas
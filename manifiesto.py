@@ -0,0 +1,213 @@
+"""
+Manifiesto por carpeta para procesamiento incremental y reanudable.
+
+Por cada página se registra ruta, tamaño, fecha de modificación, hash del
+contenido, perfil usado y dónde quedó su resultado. El registro es un diario
+JSONL al que se agrega una línea por página terminada (checkpoint), así que
+un corte a mitad de carpeta no pierde lo ya procesado. Al re-ejecutar solo
+se procesan las páginas nuevas o modificadas y las salidas combinadas se
+reconstruyen a partir de los resultados guardados.
+
+Las páginas que se saltearon por ser copia de otra (ver duplicados.py) se
+registran sin resultado propio, con el nombre de la original
+('duplicado_de'): mientras ninguna de las dos cambie no se vuelven a comparar.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+from cache_ocr import hash_file_cached
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifiesto.jsonl'
+PAGES_SUBFOLDER = 'paginas'
+
+def profile_fingerprint(perfil_nombre, perfil):
+    """
+    Identifica el perfil usado: nombre + hash de todos sus parámetros.
+    Si se edita el perfil en config.py, las páginas se vuelven a procesar.
+
+    Returns:
+        str: Identificador del perfil, p. ej. 'HISTORICOS:3f2a9c1b0d4e'
+    """
+    datos = json.dumps(perfil, sort_keys=True, default=str)
+    return f"{perfil_nombre}:{hashlib.sha256(datos.encode('utf-8')).hexdigest()[:12]}"
+
+def _write_atomic(path, content):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class FolderManifest:
+    """
+    Manifiesto de una carpeta de imágenes.
+
+    Args:
+        folder_dir: Carpeta donde se guardan el manifiesto y los resultados por página
+        profile: Identificador del perfil (ver profile_fingerprint)
+    """
+
+    def __init__(self, folder_dir, profile):
+        self.folder_dir = folder_dir
+        self.profile = profile
+        self.pages_dir = os.path.join(folder_dir, PAGES_SUBFOLDER)
+        self.path = os.path.join(folder_dir, MANIFEST_NAME)
+        self.entries = {}
+        os.makedirs(self.pages_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for numero, linea in enumerate(f, 1):
+                if not linea.strip():
+                    continue
+                try:
+                    entry = json.loads(linea)
+                except ValueError:
+                    # Una línea cortada por una interrupción se descarta
+                    logger.warning(f"Línea {numero} inválida en {self.path}, se ignora")
+                    continue
+                self.entries[entry['archivo']] = entry
+        logger.info(f"Manifiesto cargado: {len(self.entries)} página(s) registradas en {self.path}")
+
+    def is_current(self, filename, full_path):
+        """
+        Indica si la página ya fue procesada con este perfil y no cambió desde entonces.
+        Si cambió la fecha pero no el contenido, se actualiza el registro sin reprocesar.
+        """
+        entry = self.entries.get(filename)
+        if entry is None or entry.get('perfil') != self.profile:
+            return False
+        if 'salida' in entry and not os.path.exists(os.path.join(self.pages_dir, entry['salida'])):
+            return False
+        stat = os.stat(full_path)
+        if entry['tamano'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            return True
+        if entry['tamano'] != stat.st_size or entry['hash'] != hash_file_cached(full_path):
+            return False
+        entry = dict(entry, mtime=stat.st_mtime)
+        self._append(entry)
+        return True
+
+    def record(self, filename, full_path, raw_text, processed_text, lines=None, visual_hash=None):
+        """
+        Guarda el resultado de una página y lo registra en el manifiesto (checkpoint).
+
+        Args:
+            lines: Renglones sin filtrar [(texto, confianza, cuadrilátero), ...] para
+                   la salida estructurada (ver renglones.py)
+            visual_hash: Huella perceptual de la página (ver duplicados.py)
+        """
+        stat = os.stat(full_path)
+        salida = f"{filename}.json"
+        datos = {'raw': raw_text, 'procesado': processed_text}
+        if lines is not None:
+            datos['renglones'] = [[text, score, box] for text, score, box in lines]
+        _write_atomic(os.path.join(self.pages_dir, salida), json.dumps(datos, ensure_ascii=False))
+        self._append({
+            'archivo': filename,
+            'ruta': full_path,
+            'tamano': stat.st_size,
+            'mtime': stat.st_mtime,
+            'hash': hash_file_cached(full_path),
+            'perfil': self.profile,
+            'salida': salida,
+            **({'huella_visual': format(visual_hash, 'x')} if visual_hash is not None else {}),
+        })
+
+    def record_duplicate(self, filename, full_path, original):
+        """
+        Registra una página que tomó la transcripción de 'original' sin pasar
+        por el OCR (checkpoint). No guarda resultado propio: se arma con el de
+        la original.
+        """
+        stat = os.stat(full_path)
+        self._append({
+            'archivo': filename,
+            'ruta': full_path,
+            'tamano': stat.st_size,
+            'mtime': stat.st_mtime,
+            'hash': hash_file_cached(full_path),
+            'perfil': self.profile,
+            'duplicado_de': original,
+        })
+
+    def duplicate_of(self, filename):
+        """Nombre de la página de la que la registrada es copia (None si no es un duplicado)."""
+        entry = self.entries.get(filename)
+        return None if entry is None else entry.get('duplicado_de')
+
+    def visual_hash(self, filename):
+        """Huella perceptual registrada de la página (None si no tiene)."""
+        entry = self.entries.get(filename)
+        if entry is None or 'huella_visual' not in entry:
+            return None
+        return int(entry['huella_visual'], 16)
+
+    def set_visual_hash(self, filename, visual_hash):
+        """Registra la huella perceptual de una página ya procesada sin tocar su resultado."""
+        entry = self.entries.get(filename)
+        if entry is not None:
+            self._append(dict(entry, huella_visual=format(visual_hash, 'x')))
+
+    def _load_page(self, filename):
+        entry = self.entries.get(filename)
+        if entry is None or 'salida' not in entry:
+            return None
+        try:
+            with open(os.path.join(self.pages_dir, entry['salida']), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo leer el resultado guardado de {filename}: {e}")
+            return None
+
+    def load_result(self, filename):
+        """
+        Lee el resultado guardado de una página.
+
+        Returns:
+            tuple | None: (texto_raw, texto_procesado, renglones) o None si no está
+            registrado; 'renglones' es None en las páginas guardadas antes de
+            que existiera la salida estructurada
+        """
+        datos = self._load_page(filename)
+        if datos is None:
+            return None
+        renglones = datos.get('renglones')
+        if renglones is not None:
+            renglones = [(text, score, box) for text, score, box in renglones]
+        return datos['raw'], datos['procesado'], renglones
+
+    def _append(self, entry):
+        self.entries[entry['archivo']] = entry
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def compact(self, filenames):
+        """
+        Reescribe el manifiesto con una sola línea por página, descartando las
+        páginas que ya no están en la carpeta.
+
+        Args:
+            filenames: Archivos presentes actualmente en la carpeta
+        """
+        vigentes = [self.entries[f] for f in filenames if f in self.entries]
+        for filename in set(self.entries) - set(filenames):
+            entry = self.entries.pop(filename)
+            if 'salida' not in entry:
+                continue
+            try:
+                os.remove(os.path.join(self.pages_dir, entry['salida']))
+            except OSError:
+                pass
+        _write_atomic(self.path, ''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in vigentes))
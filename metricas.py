@@ -0,0 +1,227 @@
+"""
+Medición de tiempos por etapa y métricas del procesamiento.
+
+Las etapas del pipeline se envuelven con span('nombre'). Si el hilo tiene un
+colector activo (collect()), la duración se suma ahí; si no, span no hace
+nada más que medir, así que las funciones se pueden usar fuera de la CLI o
+la API sin configurar nada.
+
+Quien procesa la página (la CLI, /process o la cola de trabajos) abre un
+colector por página y entrega los tiempos al registro (MetricsRegistry),
+que los acumula en histogramas por perfil y etapa. El registro se puede
+exportar en formato de texto de Prometheus (/metrics) o como resumen JSON.
+
+Con el pool de procesos los spans se miden dentro de cada worker: los
+tiempos viajan de vuelta junto con el resultado de la página y el proceso
+principal los agrega a su registro.
+
+Las etapas que se omiten en una página (ver calidad.py) se anotan con
+skip('etapa'): viajan en el mismo diccionario, con el prefijo SKIPPED_PREFIX
+y la cantidad de páginas como valor, y el resumen las informa como tiempo
+ahorrado (páginas omitidas por la duración media de la etapa). Del mismo
+modo, count('evento') cuenta páginas por evento (con el prefijo EVENT_PREFIX),
+por ejemplo el camino que tomó cada página en la cascada (ver cascada.py).
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+_local = threading.local()
+
+# Prefijo de las etapas omitidas en los tiempos de una página (ver skip)
+SKIPPED_PREFIX = 'omitida:'
+# Prefijo de los eventos contados en una página (ver count)
+EVENT_PREFIX = 'evento:'
+
+# Límites (segundos) de los buckets de los histogramas
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+@contextmanager
+def collect():
+    """
+    Abre un colector de tiempos para el hilo actual.
+
+    Devuelve un diccionario {etapa: segundos} que se completa a medida que se
+    cierran los spans. Los colectores se pueden anidar: al cerrarse, los
+    tiempos también se suman al colector exterior.
+    """
+    previous = getattr(_local, 'collector', None)
+    tiempos = {}
+    _local.collector = tiempos
+    try:
+        yield tiempos
+    finally:
+        _local.collector = previous
+        if previous is not None:
+            for stage, seconds in tiempos.items():
+                previous[stage] = previous.get(stage, 0.0) + seconds
+
+@contextmanager
+def span(stage):
+    """Mide la duración del bloque y la suma a la etapa en el colector activo."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        collector = getattr(_local, 'collector', None)
+        if collector is not None:
+            collector[stage] = collector.get(stage, 0.0) + (time.perf_counter() - t0)
+
+def skip(stage):
+    """Anota en el colector activo que la etapa no se ejecutó en esta página."""
+    collector = getattr(_local, 'collector', None)
+    if collector is not None:
+        key = SKIPPED_PREFIX + stage
+        collector[key] = collector.get(key, 0.0) + 1
+
+def count(event):
+    """Cuenta un evento de la página en el colector activo."""
+    collector = getattr(_local, 'collector', None)
+    if collector is not None:
+        key = EVENT_PREFIX + event
+        collector[key] = collector.get(key, 0.0) + 1
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(**labels):
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+class MetricsRegistry:
+    """
+    Histogramas de duración por (perfil, etapa) y contadores de páginas.
+
+    Args:
+        keep_samples: Guardar también cada medición para calcular p50/p95
+                      exactos en el resumen JSON (útil en la CLI; en el
+                      servidor conviene dejarlo desactivado)
+    """
+
+    def __init__(self, keep_samples=False):
+        self.keep_samples = keep_samples
+        self._lock = threading.Lock()
+        self._histograms = {}   # (perfil, etapa) -> [conteos por bucket, suma, cantidad]
+        self._samples = {}      # (perfil, etapa) -> [segundos, ...]
+        self._pages = {}        # perfil -> páginas procesadas
+        self._failures = {}     # perfil -> páginas fallidas
+        self._skipped = {}      # (perfil, etapa) -> páginas en que se omitió
+        self._events = {}       # (perfil, evento) -> páginas
+
+    def observe(self, profile, tiempos):
+        """Agrega los tiempos de una página (o de un documento) al registro."""
+        with self._lock:
+            for stage, seconds in tiempos.items():
+                if stage.startswith(SKIPPED_PREFIX):
+                    key = (profile, stage[len(SKIPPED_PREFIX):])
+                    self._skipped[key] = self._skipped.get(key, 0.0) + seconds
+                    continue
+                if stage.startswith(EVENT_PREFIX):
+                    key = (profile, stage[len(EVENT_PREFIX):])
+                    self._events[key] = self._events.get(key, 0.0) + seconds
+                    continue
+                key = (profile, stage)
+                hist = self._histograms.get(key)
+                if hist is None:
+                    hist = self._histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+                for i, limit in enumerate(BUCKETS):
+                    if seconds <= limit:
+                        hist[0][i] += 1
+                hist[1] += seconds
+                hist[2] += 1
+                if self.keep_samples:
+                    self._samples.setdefault(key, []).append(seconds)
+
+    def page_done(self, profile, ok=True):
+        """Cuenta una página procesada (ok=True) o fallida."""
+        counters = self._pages if ok else self._failures
+        with self._lock:
+            counters[profile] = counters.get(profile, 0) + 1
+
+    def render_prometheus(self, gauges=None):
+        """
+        Exporta el registro en el formato de texto de Prometheus.
+
+        Args:
+            gauges: Valores instantáneos extra {nombre: (ayuda, valor)}
+        """
+        out = []
+        with self._lock:
+            out.append("# HELP ocr_stage_seconds Duración de cada etapa del pipeline OCR")
+            out.append("# TYPE ocr_stage_seconds histogram")
+            for (profile, stage), (counts, total, count) in sorted(self._histograms.items()):
+                for limit, n in zip(BUCKETS, counts):
+                    out.append(f"ocr_stage_seconds_bucket{_labels(profile=profile, stage=stage, le=limit)} {n}")
+                out.append(f"ocr_stage_seconds_bucket{_labels(profile=profile, stage=stage, le='+Inf')} {count}")
+                out.append(f"ocr_stage_seconds_sum{_labels(profile=profile, stage=stage)} {total:.6f}")
+                out.append(f"ocr_stage_seconds_count{_labels(profile=profile, stage=stage)} {count}")
+            out.append("# HELP ocr_stage_skipped_total Páginas en que se omitió cada etapa por su calidad")
+            out.append("# TYPE ocr_stage_skipped_total counter")
+            for (profile, stage), n in sorted(self._skipped.items()):
+                out.append(f"ocr_stage_skipped_total{_labels(profile=profile, stage=stage)} {round(n)}")
+            out.append("# HELP ocr_page_events_total Páginas por evento (p. ej. camino en la cascada)")
+            out.append("# TYPE ocr_page_events_total counter")
+            for (profile, event), n in sorted(self._events.items()):
+                out.append(f"ocr_page_events_total{_labels(profile=profile, event=event)} {round(n)}")
+            for name, help_text, counters in (
+                ('ocr_pages_processed_total', 'Páginas procesadas', self._pages),
+                ('ocr_page_failures_total', 'Páginas que no se pudieron procesar', self._failures),
+            ):
+                out.append(f"# HELP {name} {help_text}")
+                out.append(f"# TYPE {name} counter")
+                for profile, n in sorted(counters.items()):
+                    out.append(f"{name}{_labels(profile=profile)} {n}")
+        for name, (help_text, value) in (gauges or {}).items():
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} gauge")
+            out.append(f"{name} {value}")
+        return '\n'.join(out) + '\n'
+
+    def summary(self):
+        """
+        Resumen JSON: por perfil, páginas, fallas y estadísticas de cada etapa
+        (cantidad, total, media y, si se guardaron las mediciones, p50/p95).
+        Las etapas omitidas se informan con el tiempo ahorrado estimado: las
+        páginas en que se omitió por la duración media de la etapa cuando corrió.
+        Los eventos se informan como cantidad de páginas.
+        """
+        resumen = {}
+        with self._lock:
+            profiles = set(self._pages) | set(self._failures) | {p for p, _ in self._histograms}
+            for profile in sorted(profiles):
+                etapas = {}
+                for (p, stage), (_, total, count) in sorted(self._histograms.items()):
+                    if p != profile:
+                        continue
+                    stats = {
+                        'cantidad': count,
+                        'total_s': round(total, 4),
+                        'media_ms': round(1000 * total / count, 2),
+                    }
+                    samples = self._samples.get((p, stage))
+                    if samples:
+                        ms = 1000 * np.asarray(samples)
+                        stats['p50_ms'] = round(float(np.percentile(ms, 50)), 2)
+                        stats['p95_ms'] = round(float(np.percentile(ms, 95)), 2)
+                    etapas[stage] = stats
+                omitidas = {}
+                for (p, stage), n in sorted(self._skipped.items()):
+                    if p != profile:
+                        continue
+                    media = etapas.get(stage, {}).get('media_ms')
+                    omitidas[stage] = {
+                        'paginas': round(n),
+                        # Sin páginas donde la etapa haya corrido no hay con qué estimarlo
+                        'ahorro_estimado_s': None if media is None else round(n * media / 1000, 3),
+                    }
+                resumen[profile] = {
+                    'paginas_procesadas': self._pages.get(profile, 0),
+                    'paginas_fallidas': self._failures.get(profile, 0),
+                    'etapas': etapas,
+                    'etapas_omitidas': omitidas,
+                    'eventos': {event: round(n) for (p, event), n in sorted(self._events.items())
+                                if p == profile},
+                }
+        return resumen
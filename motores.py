@@ -0,0 +1,99 @@
+"""
+Registro de motores OCR creados bajo demanda.
+
+Los motores se construyen recién cuando se necesitan, una sola vez por
+combinación (idioma, orientación de renglones), y se mantienen cargados
+hasta un máximo configurable: al superarlo se libera el usado hace más
+tiempo (LRU). Así un mismo servidor atiende pedidos en 'es' y 'en' sin
+reiniciarse, e importar procesar_ocr ya no carga ningún modelo.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+class EngineRegistry:
+    """
+    Registro LRU de motores OCR.
+
+    Args:
+        factory: Función (idioma, use_textline_orientation) -> motor
+        max_engines: Cantidad máxima de motores cargados a la vez
+    """
+
+    def __init__(self, factory, max_engines=2):
+        self.factory = factory
+        self.max_engines = max(1, int(max_engines))
+        self._engines = OrderedDict()
+        self._lock = threading.Lock()
+        # Un lock por clave para construir cada motor una sola vez
+        self._build_locks = {}
+        # Un lock por clave para no ejecutar inferencias simultáneas sobre el mismo motor
+        self._inference_locks = {}
+
+    def _key_locks(self, key):
+        with self._lock:
+            if key not in self._build_locks:
+                self._build_locks[key] = threading.Lock()
+                self._inference_locks[key] = threading.Lock()
+            return self._build_locks[key], self._inference_locks[key]
+
+    def get(self, language, use_textline_orientation=True):
+        """
+        Devuelve el motor para el idioma pedido, creándolo si hace falta.
+
+        Args:
+            language: Código de idioma de PaddleOCR ('es', 'en', ...)
+            use_textline_orientation: Clasificar la orientación de cada renglón
+        """
+        key = (language, bool(use_textline_orientation))
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is not None:
+                self._engines.move_to_end(key)
+                return engine
+
+        build_lock, _ = self._key_locks(key)
+        with build_lock:
+            # Otro hilo pudo haberlo creado mientras esperábamos
+            with self._lock:
+                engine = self._engines.get(key)
+                if engine is not None:
+                    self._engines.move_to_end(key)
+                    return engine
+            logger.info(f"Creando motor OCR para idioma '{language}' "
+                        f"(orientación de renglones: {key[1]})")
+            engine = self.factory(language, key[1])
+            with self._lock:
+                self._engines[key] = engine
+                while len(self._engines) > self.max_engines:
+                    evicted, _ = self._engines.popitem(last=False)
+                    logger.info(f"Motor OCR liberado (menos usado): {evicted}")
+            return engine
+
+    @contextmanager
+    def use(self, language, use_textline_orientation=True):
+        """
+        Presta el motor del idioma con su lock de inferencia tomado, para que
+        varios hilos no ejecuten el mismo motor a la vez.
+        """
+        engine = self.get(language, use_textline_orientation)
+        _, inference_lock = self._key_locks((language, bool(use_textline_orientation)))
+        with inference_lock:
+            yield engine
+
+    def warm_up(self, languages, use_textline_orientation=True):
+        """Crea por adelantado los motores de los idiomas indicados."""
+        for language in languages:
+            try:
+                self.get(language, use_textline_orientation)
+            except Exception as e:
+                logger.error(f"No se pudo precargar el motor OCR '{language}': {e}")
+
+    def loaded(self):
+        """Claves (idioma, orientación) de los motores cargados, del menos al más usado."""
+        with self._lock:
+            return list(self._engines)
@@ -0,0 +1,187 @@
+"""
+Corrector ortográfico compartido, con índice de borrados precalculado.
+
+SpellChecker.correction() de pyspellchecker genera en cada llamada todas las
+variantes a distancia 1 y 2 de la palabra (cientos de miles de strings para
+una palabra larga) y además el diccionario se recargaba en cada imagen.
+
+SpellCorrector usa el método de borrados simétricos (SymSpell): al construirse
+indexa, para cada palabra del diccionario, las variantes que resultan de
+borrarle hasta 'max_distance' letras a su prefijo. Para corregir una palabra
+alcanza con generar sus propios borrados (unas decenas), buscarlos en el
+índice y verificar la distancia real de los pocos candidatos que aparecen.
+
+- Se construye una sola vez por idioma y por proceso (CorrectorRegistry).
+- Las correcciones ya calculadas se recuerdan en un memo de tamaño acotado.
+- Las palabras del diccionario del archivo (nombres, lugares) nunca se corrigen.
+
+Las frecuencias son las mismas de pyspellchecker, y el criterio de elección
+también: menor distancia de edición y, a igual distancia, la palabra más frecuente.
+"""
+
+import logging
+import os
+import threading
+from functools import lru_cache
+
+from spellchecker import SpellChecker
+
+logger = logging.getLogger(__name__)
+
+def _deletes(word, max_distance):
+    """Variantes de 'word' con hasta max_distance letras borradas (incluye la palabra)."""
+    result = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        siguiente = set()
+        for w in frontier:
+            if len(w) > 1:
+                for i in range(len(w)):
+                    siguiente.add(w[:i] + w[i + 1:])
+        result |= siguiente
+        frontier = siguiente
+    return result
+
+def edit_distance(a, b, max_distance):
+    """
+    Distancia de Damerau-Levenshtein (transposiciones adyacentes) entre a y b.
+    Devuelve max_distance + 1 apenas se sabe que la supera.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > max_distance:
+            return max_distance + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+def load_domain_words(path):
+    """
+    Lee el diccionario del archivo: una palabra por línea; se ignoran las
+    líneas vacías y las que empiezan con '#'. Si el archivo no existe
+    devuelve una lista vacía.
+    """
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+class SpellCorrector:
+    """
+    Corrector de palabras sueltas para un idioma.
+
+    Args:
+        language: Idioma del diccionario de pyspellchecker ('es', 'en', ...)
+        max_distance: Distancia de edición máxima de una corrección
+        prefix_length: Letras del prefijo que se indexan (acota la memoria del índice)
+        memo_size: Cantidad de correcciones recordadas
+        domain_words: Palabras que se aceptan siempre tal cual (nombres, lugares)
+    """
+
+    def __init__(self, language, max_distance=2, prefix_length=7, memo_size=50000, domain_words=()):
+        self.language = language
+        self.max_distance = max_distance
+        self.prefix_length = max(prefix_length, max_distance + 1)
+        self.frequencies = dict(SpellChecker(language=language).word_frequency.dictionary)
+        self.domain_words = {w.lower() for w in domain_words}
+        # Las palabras del archivo también pueden ser el resultado de una corrección
+        # ("Montevldeo" -> "Montevideo"), con la frecuencia mínima del diccionario
+        min_frequency = min(self.frequencies.values(), default=1)
+        for word in self.domain_words:
+            self.frequencies.setdefault(word, min_frequency)
+
+        # Índice: borrado del prefijo -> palabra (o lista de palabras) del diccionario
+        self._index = {}
+        for word in self.frequencies:
+            for variant in _deletes(word[:self.prefix_length], max_distance):
+                actual = self._index.get(variant)
+                if actual is None:
+                    self._index[variant] = word
+                elif isinstance(actual, str):
+                    self._index[variant] = [actual, word]
+                else:
+                    actual.append(word)
+        self._max_length = max((len(w) for w in self.frequencies), default=0)
+        self._correct = lru_cache(maxsize=memo_size)(self._lookup)
+        logger.info(f"Corrector ortográfico '{language}' listo: {len(self.frequencies)} palabras, "
+                    f"{len(self._index)} entradas en el índice")
+
+    def _lookup(self, word):
+        """Corrección de una palabra en minúsculas (None si no hay candidatos)."""
+        if word in self.frequencies:
+            return word
+        if len(word) - self._max_length > self.max_distance:
+            return None
+        best, best_key = None, None
+        seen = set()
+        for variant in _deletes(word[:self.prefix_length], self.max_distance):
+            matches = self._index.get(variant)
+            if matches is None:
+                continue
+            for candidate in ((matches,) if isinstance(matches, str) else matches):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = edit_distance(word, candidate, self.max_distance)
+                if distance > self.max_distance:
+                    continue
+                key = (distance, -self.frequencies[candidate], candidate)
+                if best_key is None or key < best_key:
+                    best, best_key = candidate, key
+        return best
+
+    def correction(self, word):
+        """
+        Corrección más probable de una palabra, respetando la mayúscula inicial.
+
+        Returns:
+            str: La palabra corregida (o la misma si es conocida o del archivo),
+                 None si no hay ninguna palabra a distancia max_distance
+        """
+        lower = word.lower()
+        if lower in self.domain_words:
+            return word
+        corrected = self._correct(lower)
+        if corrected is None or corrected == lower:
+            return word if corrected is not None else None
+        if word[:1].isupper():
+            corrected = corrected[:1].upper() + corrected[1:]
+        return corrected
+
+    def memo_info(self):
+        """Aciertos, fallos y tamaño del memo de correcciones."""
+        return self._correct.cache_info()
+
+class CorrectorRegistry:
+    """
+    Un corrector por idioma, construido la primera vez que se pide y
+    compartido por todos los hilos del proceso.
+
+    Args:
+        factory: Función (idioma) -> SpellCorrector
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._correctors = {}
+        self._lock = threading.Lock()
+
+    def get(self, language):
+        corrector = self._correctors.get(language)
+        if corrector is not None:
+            return corrector
+        # Construir el índice tarda unos segundos: se hace una sola vez aunque
+        # varios hilos lo pidan al mismo tiempo
+        with self._lock:
+            corrector = self._correctors.get(language)
+            if corrector is None:
+                corrector = self._correctors[language] = self.factory(language)
+            return corrector
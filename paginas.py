@@ -0,0 +1,114 @@
+"""
+Documentos de varias páginas (TIFF y PDF).
+
+Cada página de un documento se identifica con una referencia 'archivo#pN'
+(N empieza en 1), que viaja por el pipeline igual que la ruta de una imagen:
+se encola en los workers, forma parte de la clave de caché y del manifiesto,
+y es el título de la sección de la página en los .txt. Las imágenes sueltas
+siguen usando su ruta tal cual.
+
+Las páginas se decodifican de a una y recién cuando se van a preprocesar
+(read_page): nunca se abre el documento entero en memoria. Los TIFF se leen
+con Pillow (seek al cuadro pedido) y los PDF se renderizan con PyMuPDF a la
+resolución indicada.
+"""
+
+import os
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Formatos que pueden tener más de una página
+MULTIPAGE_EXTENSIONS = ('.tif', '.tiff', '.gif', '.pdf')
+PAGE_MARK = '#p'
+
+def _is_pdf(path):
+    return path.lower().endswith('.pdf')
+
+def _open_pdf(path):
+    try:
+        import pymupdf
+    except ImportError:
+        raise ImportError("Para leer PDF hace falta PyMuPDF: pip install pymupdf") from None
+    return pymupdf.open(path)
+
+def page_ref(path, number):
+    """Referencia a la página 'number' (desde 1) de un documento."""
+    return f"{path}{PAGE_MARK}{number}"
+
+def split_page_ref(ref):
+    """
+    Separa una referencia en archivo y número de página.
+
+    Returns:
+        tuple: (ruta del archivo, número de página o None si es una imagen suelta)
+    """
+    path, mark, number = ref.rpartition(PAGE_MARK)
+    if mark and number.isdigit() and path.lower().endswith(MULTIPAGE_EXTENSIONS):
+        return path, int(number)
+    return ref, None
+
+def count_pages(path):
+    """Cantidad de páginas del archivo (1 para las imágenes de un solo cuadro)."""
+    if _is_pdf(path):
+        with _open_pdf(path) as doc:
+            return doc.page_count
+    if path.lower().endswith(MULTIPAGE_EXTENSIONS):
+        with Image.open(path) as img:
+            return getattr(img, 'n_frames', 1)
+    return 1
+
+def iter_page_refs(path):
+    """
+    Genera las referencias a las páginas de un archivo, en orden.
+
+    Los PDF y los TIFF de varias páginas generan 'archivo#p1', 'archivo#p2', ...;
+    una imagen (o un TIFF de una sola página) genera su propia ruta.
+    """
+    pages = count_pages(path)
+    if pages == 1 and not _is_pdf(path):
+        yield path
+        return
+    for number in range(1, pages + 1):
+        yield page_ref(path, number)
+
+def page_filename(ref, extension='.png'):
+    """
+    Nombre de archivo de imagen para una página ('doc.pdf#p3' -> 'doc_p3.png').
+    Las imágenes sueltas conservan su nombre.
+    """
+    path, number = split_page_ref(ref)
+    if number is None:
+        return os.path.basename(path)
+    return f"{os.path.splitext(os.path.basename(path))[0]}_p{number}{extension}"
+
+def read_page(ref, dpi=200):
+    """
+    Decodifica una sola página.
+
+    Args:
+        ref: Ruta de una imagen o referencia 'archivo#pN'
+        dpi: Resolución a la que se renderizan las páginas de los PDF
+
+    Returns:
+        np.ndarray: Página BGR, o None si no se pudo leer
+    """
+    path, number = split_page_ref(ref)
+    if _is_pdf(path):
+        with _open_pdf(path) as doc:
+            if not 1 <= (number or 1) <= doc.page_count:
+                return None
+            pix = doc.load_page((number or 1) - 1).get_pixmap(dpi=dpi, alpha=False)
+            page = np.frombuffer(pix.samples, np.uint8).reshape(pix.height, pix.width, pix.n)
+            if pix.n == 1:
+                return cv2.cvtColor(page, cv2.COLOR_GRAY2BGR)
+            return cv2.cvtColor(page, cv2.COLOR_RGB2BGR)
+    if number is None:
+        return cv2.imread(path)
+    with Image.open(path) as img:
+        try:
+            img.seek(number - 1)
+        except EOFError:
+            return None
+        return cv2.cvtColor(np.asarray(img.convert('RGB')), cv2.COLOR_RGB2BGR)
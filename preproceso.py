@@ -0,0 +1,216 @@
+"""
+Cadena de preprocesamiento compilada, sin reservar memoria por página.
+
+Antes, cada paso de preprocess_image (cvtColor, CLAHE, warpAffine, filter2D,
+adaptiveThreshold, morphologyEx, dilate/erode) devolvía un arreglo nuevo del
+tamaño de la página, y el objeto CLAHE y los kernels se volvían a crear en
+cada llamada. PreprocessPipeline se arma una sola vez por perfil:
+
+- Guarda los kernels de nitidez y morfología.
+- Cada hilo tiene su propio CLAHE (el de OpenCV guarda buffers internos y no
+  se puede compartir entre hilos) y dos buffers de trabajo. Los pasos
+  escriben alternadamente en uno y otro con 'dst='. Los buffers solo crecen:
+  cada página usa una vista de su tamaño, así que las páginas recortadas
+  (de tamaños distintos) tampoco reservan memoria nueva.
+- Solo el resultado final es un arreglo nuevo: quien lo recibe puede
+  guardarlo (caché, lotes, copia de control) mientras se procesa otra página.
+
+El resultado es idéntico, píxel a píxel, al de la función original.
+
+Con 'crop_margins' activado, la página se recorta primero a la zona con
+texto (recorte.py) y todas las etapas trabajan solo sobre ella.
+
+Con 'adaptive' activado, antes de las etapas se mide la calidad de la página
+(calidad.py) y se omiten las que no necesita: cada omisión se anota con
+metricas.skip para que el resumen la informe como tiempo ahorrado.
+"""
+
+import threading
+
+import cv2
+import numpy as np
+
+from calidad import analyze, plan_stages
+from metricas import skip, span
+from recorte import crop, find_text_region
+from rotacion import deskew as deskew_page, rotation_matrix
+from ruido import denoise
+
+class _Workspace(threading.local):
+    """CLAHE y buffers de trabajo de un hilo."""
+
+    def __init__(self):
+        self.clahe = None
+        self.buffers = ()
+
+class PreprocessPipeline:
+    """
+    Preprocesamiento de un perfil (los mismos parámetros que 'preprocess' en config.py).
+
+    Args:
+        contrast_clip: Límite de ecualización adaptativa (CLAHE). 1.0 = sin cambio
+        binarize_block: Tamaño de bloque para umbral adaptativo. 0 = desactivado
+        binarize_C: Constante para umbral adaptativo
+        denoise_h: Fuerza de denoising. 0 = desactivado
+        sharpen: Aplicar filtro de nitidez
+        deskew: Aplicar corrección de rotación automática
+        dilate_erode: Operaciones morfológicas para conectar letras fragmentadas
+        deskew_method: Estimador de inclinación (ver rotacion.py)
+        deskew_min_angle: Inclinación (grados) por debajo de la cual no se rota la página
+        target_text_height: Alto de letra al que se reduce la página al leerla (ver resolucion.py)
+        denoise_method: Filtro de ruido (ver ruido.py)
+        denoise_params: Parámetros propios del filtro de ruido
+        adaptive: Decidir las etapas de cada página según su calidad (ver calidad.py)
+        quality_thresholds: Umbrales de calidad que reemplazan a calidad.DEFAULT_THRESHOLDS
+        crop_margins: Recortar la página a la zona con texto (ver recorte.py)
+        crop_padding: Píxeles que se dejan alrededor del texto al recortar
+    """
+
+    def __init__(self, contrast_clip=2.0, binarize_block=31, binarize_C=10, denoise_h=20, sharpen=True,
+                 deskew=True, dilate_erode=False, deskew_method='projection', deskew_min_angle=0.3,
+                 target_text_height=0, denoise_method='nlm', denoise_params=None,
+                 adaptive=False, quality_thresholds=None, crop_margins=False, crop_padding=0):
+        self.contrast_clip = contrast_clip
+        self.binarize_block = binarize_block
+        self.binarize_C = binarize_C
+        self.denoise_h = denoise_h
+        self.sharpen = sharpen
+        self.deskew = deskew
+        self.dilate_erode = dilate_erode
+        self.deskew_method = deskew_method
+        self.deskew_min_angle = deskew_min_angle
+        self.target_text_height = target_text_height
+        self.denoise_method = denoise_method
+        self.denoise_params = dict(denoise_params or {})
+        self.adaptive = adaptive
+        self.quality_thresholds = dict(quality_thresholds or {})
+        self.crop_margins = crop_margins
+        self.crop_padding = crop_padding
+
+        self.kernel_sharpen = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
+        self.kernel_morph = np.ones((2, 2), np.uint8)
+        self._local = _Workspace()
+
+    def _clahe(self):
+        ws = self._local
+        if ws.clahe is None:
+            ws.clahe = cv2.createCLAHE(clipLimit=self.contrast_clip, tileGridSize=(8, 8))
+        return ws.clahe
+
+    def _buffers(self, shape):
+        """Los dos buffers de trabajo del hilo, como vistas del tamaño de la página."""
+        ws = self._local
+        size = shape[0] * shape[1]
+        if not ws.buffers or ws.buffers[0].size < size:
+            ws.buffers = (np.empty(size, np.uint8), np.empty(size, np.uint8))
+        return tuple(buffer[:size].reshape(shape) for buffer in ws.buffers)
+
+    def _plan(self, gray, info):
+        """
+        Etapas a ejecutar en esta página (las del perfil, o las que decide la
+        calidad medida si 'adaptive' está activado).
+
+        Returns:
+            tuple: ({etapa: bool}, fuerza del filtro de ruido, inclinación ya medida o None)
+        """
+        stages = {'clahe': self.contrast_clip > 1.0, 'deskew': self.deskew,
+                  'sharpen': self.sharpen, 'denoise': self.denoise_h > 0}
+        if not self.adaptive or not any(stages.values()):
+            return stages, self.denoise_h, None
+
+        # Se mide la página en grises sin tocar, no la imagen que recibe cada
+        # etapa: los umbrales se refieren a ella (ver calidad.py)
+        with span('preprocess.analyze'):
+            quality = analyze(gray, self.deskew_method if self.deskew else None)
+            plan = plan_stages(quality, clahe=stages['clahe'], sharpen=stages['sharpen'],
+                               deskew=stages['deskew'], denoise_h=self.denoise_h,
+                               deskew_min_angle=self.deskew_min_angle, thresholds=self.quality_thresholds)
+        for stage, enabled in stages.items():
+            if enabled and not plan[stage]:
+                skip(f'preprocess.{stage}')
+        if info is not None:
+            info['calidad'] = quality
+            info['etapas'] = plan
+        return {stage: plan[stage] for stage in stages}, plan['denoise_h'], quality['skew']
+
+    def run(self, img, info=None):
+        """
+        Preprocesa una página ya decodificada.
+
+        Args:
+            img: Página BGR
+            info: dict opcional donde se informan la zona recortada ('recorte',
+                  solo con 'crop_margins'), la rotación aplicada ('rotacion',
+                  matriz afín de 2x3, si se enderezó la página), la calidad
+                  medida y las etapas decididas ('calidad' y 'etapas', solo
+                  con 'adaptive')
+
+        Returns:
+            np.ndarray: Página preprocesada (un arreglo nuevo, no un buffer de trabajo)
+        """
+        # 0. Recortar los márgenes sin texto (una vista de la página, sin copiar)
+        if self.crop_margins:
+            with span('preprocess.crop'):
+                region = find_text_region(img, self.crop_padding)
+                img = crop(img, region)
+            if info is not None:
+                info['recorte'] = region
+
+        buffers = self._buffers(img.shape[:2])
+        # 'gray' es siempre el resultado del último paso y 'spare' el otro buffer
+        gray, spare = buffers
+
+        # 1. Convertir a escala de grises
+        with span('preprocess.read'):
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=gray)
+
+        # 1b. Etapas que necesita esta página
+        stages, denoise_h, angle = self._plan(gray, info)
+
+        # 2. Mejorar contraste usando ecualización adaptativa (solo si contrast_clip > 1.0)
+        if stages['clahe']:
+            with span('preprocess.clahe'):
+                gray, spare = self._clahe().apply(gray, dst=spare), gray
+
+        # 3. Detectar y corregir rotación (deskew) sobre una miniatura (solo si está activado)
+        if stages['deskew']:
+            with span('preprocess.deskew'):
+                rotated, angle = deskew_page(gray, method=self.deskew_method,
+                                             min_angle=self.deskew_min_angle, dst=spare, angle=angle)
+                if angle:
+                    gray, spare = rotated, gray
+                    if info is not None:
+                        info['rotacion'] = rotation_matrix(gray.shape, angle).tolist()
+
+        # 4. Mejorar nitidez con filtro de realce (opcional)
+        if stages['sharpen']:
+            with span('preprocess.sharpen'):
+                gray, spare = cv2.filter2D(gray, -1, self.kernel_sharpen, dst=spare), gray
+
+        if self.binarize_block > 0:
+            # 5. Umbral adaptativo para binarizar
+            with span('preprocess.binarize'):
+                gray, spare = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                                    cv2.THRESH_BINARY, self.binarize_block,
+                                                    self.binarize_C, dst=spare), gray
+
+            # 6. Apertura morfológica para eliminar ruido pequeño
+            with span('preprocess.morphology'):
+                gray, spare = cv2.morphologyEx(gray, cv2.MORPH_OPEN, self.kernel_morph, dst=spare), gray
+
+            # 6b. Dilate/Erode para conectar letras fragmentadas (solo para documentos históricos)
+            if self.dilate_erode:
+                with span('preprocess.dilate_erode'):
+                    # Dilatar para conectar componentes cercanos y erosionar para volver al tamaño original
+                    gray, spare = cv2.dilate(gray, self.kernel_morph, dst=spare, iterations=1), gray
+                    gray, spare = cv2.erode(gray, self.kernel_morph, dst=spare, iterations=1), gray
+
+        # 7. Eliminación de ruido de fondo (solo si denoise_h > 0)
+        if stages['denoise']:
+            with span('preprocess.denoise'):
+                gray = denoise(gray, method=self.denoise_method, h=denoise_h, **self.denoise_params)
+
+        # El resultado no puede ser un buffer: se reutiliza en la próxima página
+        if any(np.shares_memory(gray, buffer) for buffer in buffers):
+            gray = gray.copy()
+        return gray
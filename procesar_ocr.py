@@ -1,19 +1,56 @@
 import os
-import tempfile
+import argparse
+import atexit
+import json
+import multiprocessing
+import queue
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import cv2
 import numpy as np
+import paddleocr
 from paddleocr import PaddleOCR
 import datetime
-from spellchecker import SpellChecker
 import logging
 import re
+import sqlite3
 from config import (
     OCR_LANGUAGE, CONFIDENCE_THRESHOLD, MIN_TEXT_LENGTH,
     PREPROCESS_CONFIG, SPELL_CHECK_ENABLED, SPELL_CHECK_LANGUAGE,
     IMAGE_FOLDER, OUTPUT_FOLDER, PROCESSED_FOLDER,
     VALID_EXTENSIONS, LOG_FILE, LOG_LEVEL,
-    GENERATE_RAW_OUTPUT, AGGRESSIVE_CLEANING
+    GENERATE_RAW_OUTPUT, AGGRESSIVE_CLEANING,
+    OCR_WORKERS, FOLDER_WORKERS, SAVE_PROCESSED_IMAGES,
+    CACHE_ENABLED, CACHE_FOLDER, CACHE_MAX_MB,
+    PERFIL_ACTIVO, PERFIL, PERFILES, MANIFEST_FOLDER,
+    OCR_TEXTLINE_ORIENTATION, OCR_MAX_ENGINES, OCR_DETECTION_MODEL, OCR_RECOGNITION_MODELS,
+    OCR_TEXTLINE_ORIENTATION_MODEL, OCR_DOC_ORIENTATION, OCR_DOC_ORIENTATION_MODEL,
+    OCR_DOC_UNWARPING, OCR_DOC_UNWARPING_MODEL,
+    OCR_BATCH_PAGES, OCR_REC_BATCH_SIZE, RUN_SUMMARY_FILE, LINES_OUTPUT_FORMAT, SEARCH_INDEX_FILE,
+    SPELL_MAX_DISTANCE, SPELL_PREFIX_LENGTH, SPELL_MEMO_SIZE, SPELL_DOMAIN_WORDS_FILE,
+    PDF_RENDER_DPI, CASCADE_ENABLED, CASCADE_FAST_PROFILE, CASCADE_FULL_PROFILE,
+    CASCADE_MIN_MEAN, CASCADE_MIN_LOW, CASCADE_LOW_PERCENTILE, CASCADE_MERGE,
+    DUPLICATE_DETECTION, DUPLICATE_MAX_DISTANCE, DUPLICATE_MIN_SIMILARITY,
+    OCR_WARMUP_LANGUAGES, INFERENCE_ADDRESS, INFERENCE_MAX_BATCH, INFERENCE_MAX_WAIT_MS, INFERENCE_TIMEOUT
 )
+from cache_ocr import OCRCache, hash_bytes, hash_file_cached, make_cache_key
+from manifiesto import FolderManifest, profile_fingerprint
+from salida import TranscriptWriter, read_sections
+from busqueda import SearchIndex
+from duplicados import DuplicateIndex, dhash, page_thumbnail
+from paginas import iter_page_refs, page_filename, read_page, split_page_ref
+from resolucion import load_normalized, to_original
+from preproceso import PreprocessPipeline
+from calidad import describe as describe_quality
+from motores import EngineRegistry
+from lotes import BatchRecognizer
+from inferencia import ADDRESS_ENV, AUTHKEY_ENV, InferenceServer, client_from_env, default_address
+from metricas import EVENT_PREFIX, MetricsRegistry, collect, count, span
+from cascada import FAST, choose, confidence_stats, needs_escalation
+from renglones import LinesWriter, available_tables, box_list, doc_preprocessor_boxes, load_lines
+from ortografia import CorrectorRegistry, SpellCorrector, load_domain_words
+from limpieza import CleanupRules
 
 # Configurar logging
 logging.basicConfig(
@@ -26,138 +63,339 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Inicializamos el motor OCR de PaddleOCR
-try:
-    ocr_engine = PaddleOCR(lang=OCR_LANGUAGE, use_textline_orientation=True)
-    logger.info("Motor OCR inicializado correctamente")
-except Exception as e:
-    logger.error(f"Error al inicializar PaddleOCR: {e}")
-    raise
+def _recognition_model(language):
+    """Modelo de reconocimiento de config.py para el idioma."""
+    if language not in OCR_RECOGNITION_MODELS:
+        raise ValueError(f"Idioma sin modelo de reconocimiento: {language}. "
+                         f"Opciones: {', '.join(OCR_RECOGNITION_MODELS)}")
+    return OCR_RECOGNITION_MODELS[language]
 
-def preprocess_image(image_path, contrast_clip=2.0, binarize_block=31, binarize_C=10, denoise_h=20, sharpen=True, deskew=True, dilate_erode=False):
+def _create_ocr_engine(language=OCR_LANGUAGE, use_textline_orientation=OCR_TEXTLINE_ORIENTATION):
+    """Crea un motor OCR de PaddleOCR para el idioma indicado, con los modelos de config.py."""
+    try:
+        engine = PaddleOCR(
+            text_detection_model_name=OCR_DETECTION_MODEL,
+            text_recognition_model_name=_recognition_model(language),
+            use_textline_orientation=use_textline_orientation,
+            textline_orientation_model_name=OCR_TEXTLINE_ORIENTATION_MODEL,
+            use_doc_orientation_classify=OCR_DOC_ORIENTATION,
+            doc_orientation_classify_model_name=OCR_DOC_ORIENTATION_MODEL,
+            use_doc_unwarping=OCR_DOC_UNWARPING,
+            doc_unwarping_model_name=OCR_DOC_UNWARPING_MODEL,
+        )
+        logger.info(f"Motor OCR inicializado correctamente (idioma: {language})")
+        return engine
+    except Exception as e:
+        logger.error(f"Error al inicializar PaddleOCR: {e}")
+        raise
+
+def _create_batch_recognizer(language=OCR_LANGUAGE, use_textline_orientation=OCR_TEXTLINE_ORIENTATION):
+    """Crea un reconocedor por lotes entre páginas (ver lotes.py) con los mismos modelos que _create_ocr_engine."""
+    try:
+        return BatchRecognizer(
+            OCR_DETECTION_MODEL, _recognition_model(language),
+            orientation_model=OCR_TEXTLINE_ORIENTATION_MODEL if use_textline_orientation else None,
+            doc_orientation_model=OCR_DOC_ORIENTATION_MODEL if OCR_DOC_ORIENTATION else None,
+            doc_unwarping_model=OCR_DOC_UNWARPING_MODEL if OCR_DOC_UNWARPING else None,
+            rec_batch_size=OCR_REC_BATCH_SIZE)
+    except Exception as e:
+        logger.error(f"Error al inicializar el reconocedor por lotes: {e}")
+        raise
+
+# Registro de motores OCR: se crean recién cuando se usan (ver motores.py)
+ocr_engines = EngineRegistry(_create_ocr_engine, max_engines=OCR_MAX_ENGINES)
+batch_recognizers = EngineRegistry(_create_batch_recognizer, max_engines=OCR_MAX_ENGINES)
+
+# Servidor de inferencia compartido (ver inferencia.py): si el proceso que
+# lanzó este lo configuró en el entorno (gunicorn.conf.py), el OCR de cada
+# página se pide al servidor en lugar de cargar motores propios. El cliente
+# se crea la primera vez que se usa y nunca en el propio servidor, que
+# hereda el mismo entorno
+_inference_client = None
+_inference_client_created = False
+_serving_inference = False
+_inference_client_lock = threading.Lock()
+
+def get_inference_client():
+    """Cliente del servidor de inferencia (se crea la primera vez), o None si no hay uno configurado."""
+    global _inference_client, _inference_client_created
+    if _serving_inference:
+        return None
+    if not _inference_client_created:
+        with _inference_client_lock:
+            if not _inference_client_created:
+                _inference_client = client_from_env(timeout=INFERENCE_TIMEOUT)
+                _inference_client_created = True
+    return _inference_client
+
+def _recognize_inference_batch(language, images):
+    """
+    Reconoce un micro-lote del servidor de inferencia con el mismo motor
+    PaddleOCR que run_ocr: predict recibe la lista de páginas y devuelve un
+    resultado por página, así que los renglones salen iguales que sin el
+    servidor. El pipeline igual procesa las páginas de a una (no es
+    inferencia por lotes como BatchRecognizer).
+    """
+    images = [cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if image.ndim == 2 else image for image in images]
+    with ocr_engines.use(language, OCR_TEXTLINE_ORIENTATION) as engine:
+        results = engine.predict(images)
+    return [parse_ocr_result([result]) for result in results]
+
+def serve_inference():
+    """
+    Corre el servidor de inferencia compartido hasta que se interrumpa.
+
+    La dirección y la clave salen del entorno (las pone gunicorn.conf.py) o,
+    si no están, de INFERENCE_ADDRESS.
+    """
+    global _serving_inference
+    # Este proceso es el que reconoce: nunca se manda las páginas a sí mismo
+    _serving_inference = True
+    address = os.environ.get(ADDRESS_ENV) or INFERENCE_ADDRESS or default_address()
+    authkey = os.environ.get(AUTHKEY_ENV)
+    server = InferenceServer(_recognize_inference_batch, address, authkey.encode() if authkey else None,
+                             max_batch=INFERENCE_MAX_BATCH, max_wait=INFERENCE_MAX_WAIT_MS / 1000,
+                             status=lambda: {'engines_loaded': [language for language, _ in ocr_engines.loaded()]})
+    if OCR_WARMUP_LANGUAGES:
+        threading.Thread(
+            target=ocr_engines.warm_up,
+            args=(OCR_WARMUP_LANGUAGES, OCR_TEXTLINE_ORIENTATION),
+            name="ocr-warmup",
+            daemon=True
+        ).start()
+    # gunicorn lo detiene con SIGTERM: se cierra igual que con Ctrl+C (y se borra el socket)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        # Otro servidor atiende en la dirección: no se le quita el socket
+        logger.error(f"No se pudo iniciar el servidor de inferencia: {e}")
+        raise SystemExit(1)
+    finally:
+        logger.info(f"Servidor de inferencia detenido ({server.batches} micro-lotes, {server.pages} páginas)")
+
+def _init_ocr_worker(batch=False):
+    """
+    Inicializador de cada proceso del pool paralelo.
+    Crea el motor OCR propio del proceso una única vez, al arrancar.
+    Con batch=True se precarga el reconocedor por lotes en lugar del motor por página.
+    """
+    registry = batch_recognizers if batch else ocr_engines
+    registry.warm_up([OCR_LANGUAGE], OCR_TEXTLINE_ORIENTATION)
+    logger.info(f"Worker OCR listo (PID {os.getpid()})")
+
+def _resolve_workers(workers):
+    """Normaliza la cantidad de workers: None o 0 significa un proceso por núcleo."""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+def create_ocr_pool(workers=OCR_WORKERS, batch=False):
+    """
+    Crea un pool de procesos OCR, cada uno con su propio motor PaddleOCR.
+    
+    Se usa el método 'spawn' (igual que en Windows) porque Paddle no es seguro
+    ante fork una vez inicializado.
+    
+    Args:
+        workers: Cantidad de procesos (None = uno por núcleo)
+        batch: Los workers van a reconocer páginas por lotes (ver lotes.py)
+    
+    Returns:
+        ProcessPoolExecutor: Pool listo para recibir páginas
+    """
+    workers = _resolve_workers(workers)
+    logger.info(f"Iniciando pool OCR con {workers} proceso(s)")
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_ocr_worker,
+        initargs=(batch,)
+    )
+
+class ProcessedImageWriter:
+    """
+    Guarda las imágenes preprocesadas (copia de control en 'procesadas/')
+    desde un hilo aparte, para que la escritura a disco nunca frene el OCR.
+    Si la cola está llena, la copia se descarta con un aviso en el log.
+    """
+
+    def __init__(self, max_pending=32):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="procesadas-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            path, image = self._queue.get()
+            try:
+                cv2.imwrite(path, image)
+                logger.debug(f"Imagen preprocesada guardada en: {path}")
+            except Exception as e:
+                logger.warning(f"No se pudo guardar la imagen preprocesada {path}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def submit(self, path, image):
+        """Encola la imagen para guardarla en segundo plano (no bloquea)."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((path, image))
+        except queue.Full:
+            logger.warning(f"Cola de imágenes preprocesadas llena, se omite: {path}")
+
+    def flush(self):
+        """Espera a que se terminen de escribir las imágenes pendientes."""
+        if self._thread is not None:
+            self._queue.join()
+
+processed_writer = ProcessedImageWriter()
+atexit.register(processed_writer.flush)
+
+# Versión del motor/modelos: forma parte de la clave de caché
+ENGINE_VERSION = f"paddleocr-{getattr(paddleocr, '__version__', 'desconocida')}-{OCR_DETECTION_MODEL}"
+if OCR_TEXTLINE_ORIENTATION:
+    ENGINE_VERSION += f"-{OCR_TEXTLINE_ORIENTATION_MODEL}"
+if OCR_DOC_ORIENTATION:
+    ENGINE_VERSION += f"-{OCR_DOC_ORIENTATION_MODEL}"
+if OCR_DOC_UNWARPING:
+    ENGINE_VERSION += f"-{OCR_DOC_UNWARPING_MODEL}"
+
+# Perfil con el que se registran las páginas en el manifiesto de cada carpeta
+PROFILE_ID = profile_fingerprint(PERFIL_ACTIVO, PERFIL)
+if CASCADE_ENABLED:
+    # Con la cascada el resultado también depende de los dos perfiles y los mínimos
+    PROFILE_ID = profile_fingerprint(PERFIL_ACTIVO, dict(PERFIL, cascada=[
+        PERFILES[CASCADE_FAST_PROFILE]['preprocess'], PERFILES[CASCADE_FULL_PROFILE]['preprocess'],
+        CASCADE_MIN_MEAN, CASCADE_MIN_LOW, CASCADE_LOW_PERCENTILE, CASCADE_MERGE]))
+
+# Caché de resultados OCR compartida por la CLI y la API y el índice de
+# búsqueda de las transcripciones (lo consulta GET /search). Se abren recién
+# cuando se usan, como los motores: importar el módulo (--help, el servidor
+# de inferencia) no crea archivos
+_ocr_cache = None
+_search_index = None
+_search_index_failed = False
+_storage_lock = threading.Lock()
+
+def get_ocr_cache():
+    """Caché de resultados OCR (se abre la primera vez), o None si está desactivada."""
+    global _ocr_cache
+    if _ocr_cache is None and CACHE_ENABLED:
+        with _storage_lock:
+            if _ocr_cache is None:
+                _ocr_cache = OCRCache(os.path.join(CACHE_FOLDER, 'resultados.sqlite'), CACHE_MAX_MB * 1024 * 1024)
+    return _ocr_cache
+
+def get_search_index():
+    """Índice de búsqueda (se abre la primera vez), o None si está desactivado o no se pudo abrir."""
+    global _search_index, _search_index_failed
+    if _search_index is None and SEARCH_INDEX_FILE and not _search_index_failed:
+        with _storage_lock:
+            if _search_index is None and not _search_index_failed:
+                try:
+                    _search_index = SearchIndex(os.path.join(OUTPUT_FOLDER, SEARCH_INDEX_FILE))
+                except sqlite3.Error as e:
+                    # Algunas compilaciones de SQLite no traen FTS5
+                    _search_index_failed = True
+                    logger.warning(f"No se pudo abrir el índice de búsqueda: {e}. Las páginas no se indexarán.")
+    return _search_index
+
+# Pipelines de preprocesamiento compilados, uno por configuración (perfil)
+_preprocess_pipelines = {}
+_preprocess_pipelines_lock = threading.Lock()
+
+def preprocess_pipeline(preprocess_config):
+    """Pipeline compilado para los parámetros de preprocesamiento (se arma una sola vez)."""
+    key = json.dumps(preprocess_config, sort_keys=True)
+    pipeline = _preprocess_pipelines.get(key)
+    if pipeline is None:
+        with _preprocess_pipelines_lock:
+            pipeline = _preprocess_pipelines.get(key)
+            if pipeline is None:
+                pipeline = _preprocess_pipelines[key] = PreprocessPipeline(**preprocess_config)
+    return pipeline
+
+def _image_name(image):
+    """Nombre de la imagen para el log (las que no vienen de un archivo no tienen)."""
+    return os.path.basename(image) if isinstance(image, str) else "imagen en memoria"
+
+def preprocess_image(image_path, *, info=None, **preprocess_config):
     """
     Preprocesa la imagen para mejorar el resultado del OCR.
     Parámetros:
-        contrast_clip: float, límite de ecualización adaptativa (CLAHE). 1.0 = sin cambio
-        binarize_block: int, tamaño de bloque para umbral adaptativo. 0 = desactivado
-        binarize_C: int, constante para umbral adaptativo
-        denoise_h: int, fuerza de denoising. 0 = desactivado
-        sharpen: bool, aplicar filtro de nitidez
-        deskew: bool, aplicar corrección de rotación automática
-        dilate_erode: bool, aplicar operaciones morfológicas para conectar letras fragmentadas
-    """
-    img = cv2.imread(image_path)
-    if img is None:
-        raise ValueError(f"No se pudo leer la imagen: {image_path}")
-
-    # 1. Convertir a escala de grises
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-    # 2. Mejorar contraste usando ecualización adaptativa (solo si contrast_clip > 1.0)
-    if contrast_clip > 1.0:
-        clahe = cv2.createCLAHE(clipLimit=contrast_clip, tileGridSize=(8,8))
-        gray = clahe.apply(gray)
-
-    # 3. Detectar y corregir rotación (deskew) usando momentos de imagen (solo si está activado)
-    if deskew:
-        coords = np.column_stack(np.where(gray < 255))
-        if len(coords) > 0:
-            angle = cv2.minAreaRect(coords)[-1]
-            if angle < -45:
-                angle = -(90 + angle)
-            else:
-                angle = -angle
-            (h, w) = gray.shape[:2]
-            center = (w // 2, h // 2)
-            M = cv2.getRotationMatrix2D(center, angle, 1.0)
-            gray = cv2.warpAffine(gray, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
-
-    # 4. Mejorar nitidez con filtro de realce (opcional)
-    if sharpen:
-        kernel_sharpen = np.array([[0, -1, 0], [-1, 5,-1], [0, -1, 0]])
-        gray = cv2.filter2D(gray, -1, kernel_sharpen)
-
-    # 5. Umbral adaptativo para binarizar (solo si binarize_block > 0)
-    if binarize_block > 0:
-        thresh = cv2.adaptiveThreshold(gray, 255,
-                                       cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                       cv2.THRESH_BINARY, binarize_block, binarize_C)
-    else:
-        thresh = gray  # Mantener escala de grises sin binarizar
+        image_path: ruta de la imagen o página de un documento ('archivo.pdf#p3', ver
+              paginas.py), los bytes del archivo (se decodifican en memoria, p. ej. un
+              archivo subido a la API) o la imagen ya decodificada (np.ndarray BGR)
+        info: dict opcional donde se informan la escala aplicada, el alto de texto estimado
+              y el tamaño original (ver resolucion.py)
+        **preprocess_config: parámetros del perfil ('preprocess' en config.py), siempre por
+              nombre como 'info': contrast_clip, binarize_block, binarize_C, denoise_h,
+              denoise_method, denoise_params, sharpen, deskew, deskew_method, deskew_min_angle,
+              dilate_erode, target_text_height, adaptive, quality_thresholds, crop_margins,
+              crop_padding (ver PreprocessPipeline en preproceso.py)
+    """
+    pipeline = preprocess_pipeline(preprocess_config)
+    with span('preprocess.read'):
+        # 0. Leer la página ya reducida al alto de texto objetivo (nunca se agranda)
+        img, normalization = load_normalized(image_path, pipeline.target_text_height,
+                                             lambda ref: read_page(ref, dpi=PDF_RENDER_DPI))
+        if img is None:
+            raise ValueError(f"No se pudo leer la imagen: {_image_name(image_path)}")
+        if info is None:
+            info = {}
+        info.update(normalization)
 
-    # 6. Apertura morfológica para eliminar ruido pequeño (solo si se binarizó)
-    if binarize_block > 0:
-        kernel = np.ones((2,2), np.uint8)
-        clean = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
-    else:
-        clean = thresh
-
-    # 6b. Dilate/Erode para conectar letras fragmentadas (solo para documentos históricos)
-    if dilate_erode and binarize_block > 0:
-        # Dilatar para conectar componentes cercanos
-        kernel_dilate = np.ones((2,2), np.uint8)
-        clean = cv2.dilate(clean, kernel_dilate, iterations=1)
-        # Erosionar para volver al tamaño original
-        kernel_erode = np.ones((2,2), np.uint8)
-        clean = cv2.erode(clean, kernel_erode, iterations=1)
-
-    # 7. Eliminación de ruido de fondo (solo si denoise_h > 0)
-    if denoise_h > 0:
-        denoised = cv2.fastNlMeansDenoising(clean, h=denoise_h)
-    else:
-        denoised = clean
+    preprocessed = pipeline.run(img, info=info)
+    if info.get('recorte') is not None:
+        ancho, alto = info['recorte'][2:]
+        logger.info(f"Márgenes recortados en {_image_name(image_path)}: queda el "
+                    f"{ancho * alto / float(img.shape[0] * img.shape[1]):.0%} de la página")
+    if 'calidad' in info:
+        logger.info(f"Calidad de {_image_name(image_path)}: {describe_quality(info['calidad'], info['etapas'])}")
+    return preprocessed
 
-    return denoised
+# Reglas de limpieza de cada perfil, compiladas una sola vez
+cleanup_rules = {nombre: CleanupRules(**perfil['cleanup_rules']) for nombre, perfil in PERFILES.items()}
 
-def clean_ocr_artifacts(text, aggressive=False):
+def clean_ocr_artifacts(text, aggressive=False, profile=PERFIL_ACTIVO):
     """
     Limpia artefactos comunes del OCR.
     
     Args:
         text: Texto a limpiar
         aggressive: Si True, aplica limpieza más agresiva para documentos deteriorados
+        profile: Perfil cuyas reglas de limpieza se aplican
     
     Returns:
         str: Texto limpiado
     """
     if not text:
         return text
+    return cleanup_rules[profile].clean(text, aggressive)
+
+def clean_ocr_artifacts_batch(texts, aggressive=False, profile=PERFIL_ACTIVO):
+    """
+    Limpia muchos textos en una sola llamada (por ejemplo, todos los renglones
+    de una o varias páginas). Da lo mismo que clean_ocr_artifacts sobre cada uno.
     
-    # Correcciones básicas comunes
-    replacements = {
-        'n0': 'no',
-        'N0': 'NO', 
-        'o0': 'oo',
-        'O0': 'OO',
-        '0o': 'oo',
-        '0O': 'OO',
-        'l0': 'lo',
-        'L0': 'LO',
-        '0l': 'ol',
-        '0L': 'OL',
-        'rn': 'm',  # común en OCR
-        '|': 'I',   # barras verticales confundidas con I
-    }
-    
-    for old, new in replacements.items():
-        text = text.replace(old, new)
-    
-    if aggressive:
-        # Remover caracteres sueltos (probable ruido)
-        lines = text.split('\n')
-        cleaned_lines = []
-        for line in lines:
-            # Eliminar líneas con solo 1-2 caracteres que sean símbolos o números sueltos
-            if len(line.strip()) <= 2 and not line.strip().isalpha():
-                continue
-            # Eliminar símbolos aleatorios comunes del OCR
-            line = re.sub(r'[~`´¨^°]', '', line)
-            # Eliminar espacios múltiples
-            line = re.sub(r'\s{2,}', ' ', line)
-            cleaned_lines.append(line)
-        text = '\n'.join(cleaned_lines)
+    Args:
+        texts: Lista de textos a limpiar
+        aggressive: Si True, aplica limpieza más agresiva para documentos deteriorados
+        profile: Perfil cuyas reglas de limpieza se aplican
     
-    return text
+    Returns:
+        list: Textos limpiados, en el mismo orden
+    """
+    return cleanup_rules[profile].clean_batch(texts, aggressive)
 
 def reconstruct_broken_words(lines):
     """
@@ -201,52 +439,373 @@ def reconstruct_broken_words(lines):
     
     return reconstructed
 
-def extract_text_paddleocr(image_path, confidence_threshold=CONFIDENCE_THRESHOLD):
+def _create_spell_corrector(language):
+    """Construye el corrector ortográfico de un idioma con la configuración de config.py."""
+    return SpellCorrector(
+        language,
+        max_distance=SPELL_MAX_DISTANCE,
+        prefix_length=SPELL_PREFIX_LENGTH,
+        memo_size=SPELL_MEMO_SIZE,
+        domain_words=load_domain_words(os.path.join(os.path.dirname(os.path.abspath(__file__)), SPELL_DOMAIN_WORDS_FILE))
+    )
+
+# Un corrector por idioma, compartido por la CLI, la API y la cola de trabajos
+spell_correctors = CorrectorRegistry(_create_spell_corrector)
+
+def spell_check_lines(lines, language=SPELL_CHECK_LANGUAGE):
+    """
+    Corrige la ortografía palabra por palabra.
+    
+    Args:
+        lines: Lista de líneas de texto
+        language: Idioma del diccionario
+    
+    Returns:
+        tuple: (líneas corregidas, cantidad de palabras corregidas)
+    """
+    spell = spell_correctors.get(language)
+    texto_final = []
+    palabras_corregidas_count = 0
+    for linea in lines:
+        palabras = linea.split()
+        palabras_corregidas = []
+        for palabra in palabras:
+            # Limpiar puntuación para corrección
+            palabra_limpia = palabra.strip('.,;:!?()[]{}«»""\'')
+            # Solo corregir si la palabra no está en el diccionario y no es mayúscula (siglas)
+            if palabra_limpia and palabra_limpia.isalpha() and not palabra_limpia.isupper() and len(palabra_limpia) > 2:
+                corregida = spell.correction(palabra_limpia)
+                if corregida and corregida != palabra_limpia:
+                    # Preservar puntuación original
+                    palabra = palabra.replace(palabra_limpia, corregida)
+                    palabras_corregidas_count += 1
+            palabras_corregidas.append(palabra)
+        texto_final.append(' '.join(palabras_corregidas))
+    return texto_final, palabras_corregidas_count
+
+def spell_check_text(text, language=SPELL_CHECK_LANGUAGE):
+    """
+    Corrige la ortografía de un texto de varias líneas (mantiene los saltos de línea).
+    
+    Args:
+        text: Texto a corregir
+        language: Idioma del diccionario
+    
+    Returns:
+        str: Texto corregido
+    """
+    lines, palabras_corregidas_count = spell_check_lines(text.split('\n'), language)
+    logger.info(f"Corrección ortográfica: {palabras_corregidas_count} palabras corregidas")
+    return '\n'.join(lines)
+
+def run_ocr(image, engine=None, language=OCR_LANGUAGE):
+    """
+    Ejecuta el motor OCR directamente sobre un array de NumPy, sin pasar por disco.
+    
+    Args:
+        image: Imagen preprocesada (escala de grises o BGR)
+        engine: Motor PaddleOCR a usar (default: el del registro para 'language')
+        language: Idioma del motor a usar si no se pasa uno
+    
+    Returns:
+        Resultado crudo de PaddleOCR
+    """
+    # PaddleOCR espera 3 canales; antes se lograba releyendo el .jpg temporal
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    if engine is not None:
+        return engine.ocr(image)
+    with ocr_engines.use(language, OCR_TEXTLINE_ORIENTATION) as engine:
+        return engine.ocr(image)
+
+def parse_ocr_result(result):
+    """
+    Normaliza el resultado de PaddleOCR, que puede variar según la versión.
+    
+    Args:
+        result: Resultado crudo de ocr_engine.ocr
+    
+    Returns:
+        list: Tuplas (texto, confianza, cuadrilátero) en el orden de lectura del
+              motor; el cuadrilátero es [[x, y], ...] en píxeles de la imagen
+              recibida (ya deshecho el giro del preprocesador de documentos de
+              PaddleOCR), o None si el motor no lo informó o la página se
+              enderezó con UVDoc (ver renglones.doc_preprocessor_boxes)
+    """
+    lineas = []
+    if not result:
+        return lineas
+    if isinstance(result, list) and len(result) > 0 and isinstance(result[0], dict):
+        # Formato con diccionarios (nueva versión)
+        texts = result[0].get("rec_texts", [])
+        scores = result[0].get("rec_scores", [])
+        polys = result[0].get("rec_polys")
+        if polys is None:
+            polys = result[0].get("dt_polys", [])
+        polys = list(polys) + [None] * (len(texts) - len(polys))
+        boxes = doc_preprocessor_boxes([box_list(poly) for poly in polys],
+                                       result[0].get("doc_preprocessor_res"))
+        for text, score, box in zip(texts, scores, boxes):
+            lineas.append((text, float(score), box))
+    else:
+        # Formato con listas (versiones anteriores o distinto)
+        for region in result:
+            if not region or not isinstance(region, list):
+                continue
+            for line in region:
+                if (
+                    isinstance(line, list)
+                    and len(line) >= 2
+                    and isinstance(line[1], tuple)
+                    and len(line[1]) == 2
+                ):
+                    lineas.append((line[1][0], float(line[1][1]), box_list(line[0])))
+    return lineas
+
+def _cache_key(image_path, preprocess_config, confidence_threshold, language):
+    """Clave de la caché de resultados para la imagen (None si la caché está desactivada)."""
+    if get_ocr_cache() is None:
+        return None
+    with span('cache'):
+        if isinstance(image_path, np.ndarray):
+            image_hash = f"{hash_bytes(np.ascontiguousarray(image_path).data)}:{image_path.shape}"
+            number = None
+        elif not isinstance(image_path, str):
+            # Bytes del archivo: el mismo hash que si estuviera en disco
+            image_hash = hash_bytes(image_path)
+            number = None
+        else:
+            path, number = split_page_ref(image_path)
+            image_hash = hash_file_cached(path)
+        if number is not None:
+            # Página de un documento: la resolución de los PDF también cambia la imagen
+            image_hash += f"#p{number}@{PDF_RENDER_DPI}dpi"
+        return make_cache_key(image_hash, preprocess_config,
+                              confidence_threshold, language,
+                              f"{ENGINE_VERSION}-{OCR_RECOGNITION_MODELS.get(language)}")
+
+def _load_preprocessed(image_path, preprocess_config, save_processed):
+    """
+    Preprocesa la imagen y, si se pidió, encola la copia de control en 'procesadas/'.
+
+    Returns:
+        tuple: (imagen preprocesada, info de preprocess_image)
+    """
+    normalization = {}
+    preprocessed_img = preprocess_image(image_path, info=normalization, **preprocess_config)
+    if normalization['scale'] < 1.0:
+        logger.info(f"Página reducida a {normalization['scale']:.0%} "
+                    f"(letras de {normalization['text_height']:.0f} px): {_image_name(image_path)}")
+
+    # Guardar imagen preprocesada para control (opcional, en segundo plano)
+    if save_processed and isinstance(image_path, str):
+        os.makedirs(PROCESSED_FOLDER, exist_ok=True)
+        processed_img_path = os.path.join(PROCESSED_FOLDER, page_filename(image_path))
+        processed_writer.submit(processed_img_path, preprocessed_img)
+    return preprocessed_img, normalization
+
+def _to_original_boxes(lineas, info):
+    """Lleva los cuadriláteros de la página preprocesada a píxeles de la imagen original."""
+    return [(text, score, None if box is None else box_list(to_original(box, info)))
+            for text, score, box in lineas]
+
+def recognize_image(image_path, preprocess_config=PREPROCESS_CONFIG,
+                    confidence_threshold=CONFIDENCE_THRESHOLD, language=OCR_LANGUAGE,
+                    save_processed=SAVE_PROCESSED_IMAGES):
+    """
+    Preprocesa una imagen y ejecuta el OCR, usando la caché de resultados si está activada.
+    Si la imagen ya se reconoció con la misma configuración se evitan el
+    preprocesamiento y la inferencia.
+    
+    Args:
+        image_path: Ruta a la imagen a procesar, o sus bytes o la imagen decodificada
+                    (ver preprocess_image; sin ruta no se guarda la copia de control)
+        preprocess_config: Parámetros de preprocess_image del perfil
+        confidence_threshold: Umbral de confianza (forma parte de la clave de caché)
+        language: Idioma del motor OCR
+        save_processed: Guardar copia de control en 'procesadas/'
+    
+    Returns:
+        list: Tuplas (texto, confianza, cuadrilátero) sin filtrar ni postprocesar,
+              con el cuadrilátero en píxeles de la imagen original
+    """
+    cache_key = _cache_key(image_path, preprocess_config, confidence_threshold, language)
+    if cache_key is not None:
+        with span('cache'):
+            lineas = get_ocr_cache().get(cache_key)
+        if lineas is not None:
+            logger.info(f"Resultado OCR tomado de la caché: {_image_name(image_path)}")
+            return lineas
+
+    preprocessed_img, info = _load_preprocessed(image_path, preprocess_config, save_processed)
+
+    # Ejecutar OCR directamente sobre el array en memoria
+    with span('ocr'):
+        inference_client = get_inference_client()
+        if inference_client is not None:
+            lineas = inference_client.recognize([preprocessed_img], language)[0]
+        else:
+            lineas = parse_ocr_result(run_ocr(preprocessed_img, language=language))
+    lineas = _to_original_boxes(lineas, info)
+
+    if cache_key is not None:
+        with span('cache'):
+            get_ocr_cache().put(cache_key, lineas)
+    return lineas
+
+def recognize_images(image_paths, preprocess_config=PREPROCESS_CONFIG,
+                     confidence_threshold=CONFIDENCE_THRESHOLD, language=OCR_LANGUAGE,
+                     save_processed=SAVE_PROCESSED_IMAGES):
+    """
+    Versión por lotes de recognize_image: detecta los renglones de cada página
+    y reconoce los de todas juntas en lotes de OCR_REC_BATCH_SIZE (ver lotes.py).
+    Las páginas que están en la caché no entran al lote.
+    
+    Args:
+        image_paths: Rutas de las imágenes a procesar
+        preprocess_config: Parámetros de preprocess_image del perfil
+        confidence_threshold: Umbral de confianza (forma parte de la clave de caché)
+        language: Idioma del motor OCR
+        save_processed: Guardar copia de control en 'procesadas/'
+    
+    Returns:
+        list: Por cada imagen, tuplas (texto, confianza, cuadrilátero) sin filtrar, o None si
+        no se pudo leer o preprocesar (el error queda en el log)
+    """
+    resultados = [None] * len(image_paths)
+    cache_keys = [None] * len(image_paths)
+    pendientes, imagenes, infos = [], [], []
+    for i, image_path in enumerate(image_paths):
+        try:
+            cache_keys[i] = _cache_key(image_path, preprocess_config, confidence_threshold, language)
+            if cache_keys[i] is not None:
+                with span('cache'):
+                    lineas = get_ocr_cache().get(cache_keys[i])
+                if lineas is not None:
+                    logger.info(f"Resultado OCR tomado de la caché: {os.path.basename(image_path)}")
+                    resultados[i] = lineas
+                    continue
+            imagen, info = _load_preprocessed(image_path, preprocess_config, save_processed)
+            imagenes.append(imagen)
+            infos.append(info)
+            pendientes.append(i)
+        except Exception as e:
+            logger.error(f"Error al preprocesar {image_path}: {e}")
+
+    if imagenes:
+        inference_client = get_inference_client()
+        if inference_client is not None:
+            with span('ocr'):
+                lineas_por_pagina = inference_client.recognize(imagenes, language)
+        else:
+            with span('ocr'), batch_recognizers.use(language, OCR_TEXTLINE_ORIENTATION) as recognizer:
+                lineas_por_pagina = recognizer.recognize(imagenes)
+        for i, info, lineas in zip(pendientes, infos, lineas_por_pagina):
+            lineas = resultados[i] = _to_original_boxes(lineas, info)
+            if cache_keys[i] is not None:
+                with span('cache'):
+                    get_ocr_cache().put(cache_keys[i], lineas)
+    return resultados
+
+# Prefijo del evento con el camino de cada página en la cascada (ver metricas.count)
+CASCADE_EVENT = 'cascada.'
+
+def _cascade_result(image_path, first, stats, second, confidence_threshold, info):
+    """Resultado final de una página de la cascada; anota y registra su camino."""
+    if second is None:
+        lineas, camino = first, FAST
+    else:
+        lineas, camino = choose(first, second, CASCADE_MERGE, confidence_threshold)
+    count(CASCADE_EVENT + camino)
+    detalle = {'camino': camino, 'rapido': stats}
+    mensaje = f"confianza media {stats['mean']:.2f}, p{CASCADE_LOW_PERCENTILE} {stats['low']:.2f}"
+    if second is not None:
+        detalle['completo'] = confidence_stats(second, CASCADE_LOW_PERCENTILE)
+        mensaje += (f" -> completo: media {detalle['completo']['mean']:.2f}, "
+                    f"p{CASCADE_LOW_PERCENTILE} {detalle['completo']['low']:.2f}")
+    logger.info(f"Cascada en {_image_name(image_path)}: {mensaje} ({camino})")
+    if info is not None:
+        info['cascada'] = detalle
+    return lineas
+
+def recognize_cascade(image_path, confidence_threshold=CONFIDENCE_THRESHOLD, language=OCR_LANGUAGE,
+                      save_processed=SAVE_PROCESSED_IMAGES, info=None):
+    """
+    Reconoce una imagen con la cascada de confianza (ver cascada.py): primero
+    con el preprocesamiento de CASCADE_FAST_PROFILE y, solo si la confianza
+    queda baja, otra vez con el de CASCADE_FULL_PROFILE. Los dos pasos usan la caché.
+    
+    Args:
+        image_path: Ruta a la imagen a procesar, o sus bytes o la imagen decodificada
+        confidence_threshold: Umbral de confianza del perfil activo
+        language: Idioma del motor OCR
+        save_processed: Guardar copia de control en 'procesadas/' (la del último paso)
+        info: dict opcional donde se informa el camino y la confianza de cada paso ('cascada')
+    
+    Returns:
+        list: Tuplas (texto, confianza, cuadrilátero) sin filtrar ni postprocesar
+    """
+    first = recognize_image(image_path, PERFILES[CASCADE_FAST_PROFILE]['preprocess'],
+                            confidence_threshold, language, save_processed)
+    stats = confidence_stats(first, CASCADE_LOW_PERCENTILE)
+    second = None
+    if needs_escalation(stats, CASCADE_MIN_MEAN, CASCADE_MIN_LOW):
+        second = recognize_image(image_path, PERFILES[CASCADE_FULL_PROFILE]['preprocess'],
+                                 confidence_threshold, language, save_processed)
+    return _cascade_result(image_path, first, stats, second, confidence_threshold, info)
+
+def recognize_images_cascade(image_paths, confidence_threshold=CONFIDENCE_THRESHOLD, language=OCR_LANGUAGE,
+                             save_processed=SAVE_PROCESSED_IMAGES, infos=None):
+    """
+    Versión por lotes de recognize_cascade: las páginas que se escalan se
+    reconocen juntas en un segundo lote (ver recognize_images).
+    
+    Args:
+        infos: Lista opcional de dicts, uno por imagen (ver recognize_cascade)
+    
+    Returns:
+        list: Por cada imagen, tuplas (texto, confianza, cuadrilátero) sin filtrar, o None si
+        no se pudo leer o preprocesar
+    """
+    firsts = recognize_images(image_paths, PERFILES[CASCADE_FAST_PROFILE]['preprocess'],
+                              confidence_threshold, language, save_processed)
+    stats = [None if lineas is None else confidence_stats(lineas, CASCADE_LOW_PERCENTILE) for lineas in firsts]
+    escalar = [i for i, s in enumerate(stats)
+               if s is not None and needs_escalation(s, CASCADE_MIN_MEAN, CASCADE_MIN_LOW)]
+    seconds = [None] * len(image_paths)
+    if escalar:
+        segundos = recognize_images([image_paths[i] for i in escalar], PERFILES[CASCADE_FULL_PROFILE]['preprocess'],
+                                    confidence_threshold, language, save_processed)
+        for i, lineas in zip(escalar, segundos):
+            seconds[i] = lineas
+    return [None if firsts[i] is None else
+            _cascade_result(path, firsts[i], stats[i], seconds[i], confidence_threshold,
+                            None if infos is None else infos[i])
+            for i, path in enumerate(image_paths)]
+
+def extract_text_paddleocr(image_path, confidence_threshold=CONFIDENCE_THRESHOLD, info=None):
     """
     Extrae texto de una imagen aplicando preprocesamiento y usando PaddleOCR.
-    Guarda la imagen preprocesada en 'procesadas/'.
+    Si SAVE_PROCESSED_IMAGES está activado, guarda una copia de la imagen
+    preprocesada en 'procesadas/' (en segundo plano).
     Filtra resultados de OCR con confianza >= confidence_threshold.
     
     Args:
         image_path: Ruta a la imagen a procesar
         confidence_threshold: Umbral de confianza para filtrar resultados (default: 0.7)
+        info: dict opcional donde se informa el camino en la cascada (con CASCADE_ENABLED)
     
     Returns:
-        str: Texto extraído y procesado
+        tuple: (texto_raw, texto_procesado, renglones), o "" si falló. 'renglones'
+               son todas las tuplas (texto, confianza, cuadrilátero) del OCR, sin
+               filtrar, para la salida estructurada (ver renglones.py)
     """
     try:
         logger.info(f"Procesando imagen: {os.path.basename(image_path)}")
-        preprocessed_img = preprocess_image(
-            image_path,
-            contrast_clip=PREPROCESS_CONFIG['contrast_clip'],
-            binarize_block=PREPROCESS_CONFIG['binarize_block'],
-            binarize_C=PREPROCESS_CONFIG['binarize_C'],
-            denoise_h=PREPROCESS_CONFIG['denoise_h'],
-            sharpen=PREPROCESS_CONFIG['sharpen'],
-            deskew=PREPROCESS_CONFIG['deskew'],
-            dilate_erode=PREPROCESS_CONFIG.get('dilate_erode', False)
-        )
-
-        # Guardar imagen preprocesada para control
-        os.makedirs(PROCESSED_FOLDER, exist_ok=True)
-        base_name = os.path.basename(image_path)
-        processed_img_path = os.path.join(PROCESSED_FOLDER, base_name)
-        cv2.imwrite(processed_img_path, preprocessed_img)
-        logger.debug(f"Imagen preprocesada guardada en: {processed_img_path}")
-
-        # Guardar temporalmente para OCR (PaddleOCR lee archivo)
-        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as tmpfile:
-            cv2.imwrite(tmpfile.name, preprocessed_img)
-            tmp_img_path = tmpfile.name
-
-        # Ejecutar OCR
-        result = ocr_engine.ocr(tmp_img_path)
-        
-        # Limpiar archivo temporal
-        try:
-            os.unlink(tmp_img_path)
-        except Exception:
-            pass
+        if CASCADE_ENABLED:
+            lineas = recognize_cascade(image_path, confidence_threshold, info=info)
+        else:
+            lineas = recognize_image(image_path, PREPROCESS_CONFIG, confidence_threshold)
             
     except FileNotFoundError:
         logger.error(f"Archivo no encontrado: {image_path}")
@@ -258,32 +817,57 @@ def extract_text_paddleocr(image_path, confidence_threshold=CONFIDENCE_THRESHOLD
         logger.error(f"Error al ejecutar OCR en {image_path}: {e}")
         return ""
 
-    texto_extraido = []
+    return _with_lines(postprocess_lines(lineas, image_path, confidence_threshold), lineas)
+
+def _with_lines(resultado, lineas):
+    """Agrega los renglones sin filtrar al resultado de postprocess_lines (si no falló)."""
+    return resultado + (lineas,) if isinstance(resultado, tuple) else resultado
+
+def extract_text_batch(image_paths, confidence_threshold=CONFIDENCE_THRESHOLD, infos=None):
+    """
+    Igual que extract_text_paddleocr pero para varias imágenes a la vez,
+    compartiendo los lotes de reconocimiento entre páginas (ver recognize_images).
+    
+    Args:
+        image_paths: Rutas de las imágenes a procesar
+        confidence_threshold: Umbral de confianza para filtrar resultados
+        infos: Lista opcional de dicts, uno por imagen (ver extract_text_paddleocr)
+    
+    Returns:
+        list: Por cada imagen, lo mismo que extract_text_paddleocr
+              ((texto_raw, texto_procesado, renglones), o "" si falló)
+    """
+    logger.info(f"Procesando lote de {len(image_paths)} imágenes: "
+                f"{', '.join(os.path.basename(p) for p in image_paths)}")
     try:
-        # Manejo de resultado, que puede variar según versión de Paddle OCR
-        if isinstance(result, list) and len(result) > 0 and isinstance(result[0], dict):
-            # Formato con diccionarios (nueva versión)
-            texts = result[0].get("rec_texts", [])
-            scores = result[0].get("rec_scores", [])
-            for text, score in zip(texts, scores):
-                if score >= confidence_threshold and text.strip():
-                    texto_extraido.append(text.strip())
+        if CASCADE_ENABLED:
+            lineas_por_pagina = recognize_images_cascade(image_paths, confidence_threshold, infos=infos)
         else:
-            # Formato con listas (versiones anteriores o distinto)
-            for region in result:
-                if not region or not isinstance(region, list):
-                    continue
-                for line in region:
-                    if (
-                        isinstance(line, list)
-                        and len(line) >= 2
-                        and isinstance(line[1], tuple)
-                        and len(line[1]) == 2
-                    ):
-                        text = line[1][0]
-                        confidence = line[1][1]
-                        if confidence >= confidence_threshold and text.strip():
-                            texto_extraido.append(text.strip())
+            lineas_por_pagina = recognize_images(image_paths, PREPROCESS_CONFIG, confidence_threshold)
+    except Exception as e:
+        logger.error(f"Error al ejecutar OCR por lotes: {e}")
+        return [""] * len(image_paths)
+    return [_with_lines(postprocess_lines(lineas, path, confidence_threshold), lineas) if lineas is not None else ""
+            for path, lineas in zip(image_paths, lineas_por_pagina)]
+
+def postprocess_lines(lineas, image_path, confidence_threshold=CONFIDENCE_THRESHOLD):
+    """
+    Filtra por confianza las líneas reconocidas de una página y aplica la
+    limpieza, la reconstrucción de palabras y la corrección ortográfica.
+    
+    Args:
+        lineas: Tuplas (texto, confianza, cuadrilátero) de la página
+        image_path: Ruta de la imagen (solo para el log)
+        confidence_threshold: Umbral de confianza para filtrar resultados
+    
+    Returns:
+        tuple: (texto_raw, texto_procesado), o "" si falló
+    """
+    texto_extraido = []
+    try:
+        for text, score, _ in lineas:
+            if score >= confidence_threshold and text.strip():
+                texto_extraido.append(text.strip())
         # Filtrar líneas que sean solo números o símbolos (probables falsos positivos)
         texto_extraido = [t for t in texto_extraido if len(t) > MIN_TEXT_LENGTH and not t.isdigit()]
         logger.info(f"Extraídas {len(texto_extraido)} líneas de texto con confianza >= {confidence_threshold}")
@@ -297,45 +881,27 @@ def extract_text_paddleocr(image_path, confidence_threshold=CONFIDENCE_THRESHOLD
     # Postprocesamiento: corrección ortográfica y reconstrucción de palabras
     if SPELL_CHECK_ENABLED:
         try:
-            spell = SpellChecker(language=SPELL_CHECK_LANGUAGE)
-            texto_final = []
-            palabras_corregidas_count = 0
-            
             # Primero limpiar artefactos del OCR
-            texto_extraido_limpio = []
-            for linea in texto_extraido:
-                linea_limpia = clean_ocr_artifacts(linea, aggressive=AGGRESSIVE_CLEANING)
-                if linea_limpia.strip():
-                    texto_extraido_limpio.append(linea_limpia)
+            with span('postprocess.clean'):
+                texto_extraido_limpio = [linea for linea in clean_ocr_artifacts_batch(texto_extraido, aggressive=AGGRESSIVE_CLEANING)
+                                         if linea.strip()]
             
             # Intentar reconstruir palabras partidas
-            texto_extraido_reconstruido = reconstruct_broken_words(texto_extraido_limpio)
+            with span('postprocess.reconstruct'):
+                texto_extraido_reconstruido = reconstruct_broken_words(texto_extraido_limpio)
             
-            for linea in texto_extraido_reconstruido:
-                palabras = linea.split()
-                palabras_corregidas = []
-                for palabra in palabras:
-                    # Limpiar puntuación para corrección
-                    palabra_limpia = palabra.strip('.,;:!?()[]{}«»""\'')
-                    # Solo corregir si la palabra no está en el diccionario y no es mayúscula (siglas)
-                    if palabra_limpia and palabra_limpia.isalpha() and not palabra_limpia.isupper() and len(palabra_limpia) > 2:
-                        corregida = spell.correction(palabra_limpia)
-                        if corregida and corregida != palabra_limpia:
-                            # Preservar puntuación original
-                            palabra = palabra.replace(palabra_limpia, corregida)
-                            palabras_corregidas_count += 1
-                    palabras_corregidas.append(palabra)
-                texto_final.append(' '.join(palabras_corregidas))
-            
-            logger.info(f"Corrección ortográfica: {palabras_corregidas_count} palabras corregidas")
+            with span('postprocess.spell'):
+                texto_final = spell_check_text('\n'.join(texto_extraido_reconstruido)).split('\n')
         except Exception as e:
             logger.warning(f"Error en corrección ortográfica: {e}. Se usará texto sin corregir.")
             texto_final = texto_extraido
     else:
         # Sin corrección ortográfica, pero aplicar limpieza si está activada
         if AGGRESSIVE_CLEANING:
-            texto_extraido_limpio = [clean_ocr_artifacts(linea, aggressive=True) for linea in texto_extraido]
-            texto_final = reconstruct_broken_words(texto_extraido_limpio)
+            with span('postprocess.clean'):
+                texto_extraido_limpio = clean_ocr_artifacts_batch(texto_extraido, aggressive=True)
+            with span('postprocess.reconstruct'):
+                texto_final = reconstruct_broken_words(texto_extraido_limpio)
         else:
             texto_final = texto_extraido
         logger.info("Corrección ortográfica desactivada")
@@ -347,84 +913,515 @@ def extract_text_paddleocr(image_path, confidence_threshold=CONFIDENCE_THRESHOLD
     # Retornar tupla con versión raw y procesada
     return (texto_raw, resultado_procesado)
 
-def process_image_folder(subfolder_path, output_name):
+def _extract_timed(image_path):
+    """extract_text_paddleocr más los tiempos por etapa de la página (corre en el worker)."""
+    with collect() as tiempos:
+        with span('total'):
+            resultado = extract_text_paddleocr(image_path)
+    return resultado, tiempos
+
+def _extract_batch_timed(image_paths):
+    """extract_text_batch más los tiempos por etapa de cada página (corre en el worker)."""
+    infos = [{} for _ in image_paths]
+    with collect() as tiempos:
+        with span('total'):
+            resultados = extract_text_batch(image_paths, infos=infos)
+    # El lote se mide entero: su costo se reparte en partes iguales entre las páginas.
+    # El camino en la cascada sí es de cada página.
+    por_pagina = {stage: seconds / len(image_paths) for stage, seconds in tiempos.items()
+                  if not stage.startswith(EVENT_PREFIX + CASCADE_EVENT)}
+    paginas = []
+    for resultado, info in zip(resultados, infos):
+        tiempos_pagina = dict(por_pagina)
+        if 'cascada' in info:
+            tiempos_pagina[EVENT_PREFIX + CASCADE_EVENT + info['cascada']['camino']] = 1.0
+        paginas.append((resultado, tiempos_pagina))
+    return paginas
+
+def _cascade_path(tiempos):
+    """Camino de la página en la cascada, según los eventos de sus tiempos (None sin cascada)."""
+    prefix = EVENT_PREFIX + CASCADE_EVENT
+    return next((stage[len(prefix):] for stage in tiempos if stage.startswith(prefix)), None)
+
+def _ordered_results(full_paths, executor=None, batch_pages=0):
+    """
+    Ejecuta extract_text_paddleocr sobre cada ruta y genera tuplas
+    (resultado, error, tiempos) en el mismo orden de entrada, sin importar
+    en qué worker terminó cada página.
+    
+    Args:
+        full_paths: Lista de rutas de imágenes
+        executor: Pool de procesos OCR (None = procesar en este proceso)
+        batch_pages: Si es > 0, las páginas se reconocen en grupos de este
+                     tamaño con extract_text_batch
+    """
+    if batch_pages > 0:
+        lotes = [full_paths[i:i + batch_pages] for i in range(0, len(full_paths), batch_pages)]
+        if executor is None:
+            pendientes = lotes
+            obtener = _extract_batch_timed
+        else:
+            pendientes = [executor.submit(_extract_batch_timed, lote) for lote in lotes]
+            obtener = lambda future: future.result()
+        for lote, pendiente in zip(lotes, pendientes):
+            try:
+                resultados = obtener(pendiente)
+            except Exception as e:
+                for _ in lote:
+                    yield None, e, {}
+                continue
+            for resultado, tiempos in resultados:
+                yield resultado, None, tiempos
+        return
+
+    if executor is None:
+        for path in full_paths:
+            try:
+                resultado, tiempos = _extract_timed(path)
+                yield resultado, None, tiempos
+            except Exception as e:
+                yield None, e, {}
+        return
+
+    futures = [executor.submit(_extract_timed, path) for path in full_paths]
+    for future in futures:
+        try:
+            resultado, tiempos = future.result()
+            yield resultado, None, tiempos
+        except Exception as e:
+            yield None, e, {}
+
+# Evento de métricas de las páginas que no pasan por el OCR por ser duplicadas
+DUPLICATE_EVENT = 'duplicado'
+# Marca de las páginas duplicadas en las transcripciones
+DUPLICATE_NOTE = "[Duplicado de {}]"
+
+def find_duplicates(subfolder_path, imagenes, pendientes, manifest, metrics=None):
+    """
+    Busca, entre las páginas pendientes, copias casi idénticas de otra página de la carpeta.
+
+    Las páginas se recorren en orden, así que la original es siempre la
+    primera de cada grupo. Las ya procesadas entran al índice con la huella
+    guardada en el manifiesto (la calculan una sola vez); las registradas
+    como copia de otra no entran.
+
+    Args:
+        subfolder_path: Ruta a la carpeta con imágenes
+        imagenes: Páginas de la carpeta, en orden
+        pendientes: Páginas a procesar
+        manifest: Manifiesto de la carpeta
+        metrics: Registro donde acumular el tiempo de la detección
+
+    Returns:
+        tuple: ({duplicada: original}, {página pendiente: huella} para registrarlas en el manifiesto)
+    """
+    indice = DuplicateIndex(DUPLICATE_MAX_DISTANCE, DUPLICATE_MIN_SIMILARITY)
+    duplicados = {}
+    huellas = {}
+    pendientes = set(pendientes)
+    for filename in imagenes:
+        if filename not in pendientes and manifest.duplicate_of(filename) is not None:
+            continue
+        ref = os.path.join(subfolder_path, filename)
+        with collect() as tiempos, span('duplicates'):
+            key = None if filename in pendientes else manifest.visual_hash(filename)
+            thumb = None
+            if key is None:
+                thumb = page_thumbnail(ref)
+                if thumb is None:
+                    continue
+                key = dhash(thumb, indice.size)
+            original = indice.find(key, thumb) if filename in pendientes else None
+            if original is None:
+                indice.add(key, ref)
+                if filename in pendientes:
+                    huellas[filename] = key
+                elif thumb is not None:
+                    manifest.set_visual_hash(filename, key)
+            else:
+                duplicados[filename] = os.path.basename(original)
+                logger.info(f"{filename} es un duplicado de {duplicados[filename]}: no pasa por el OCR")
+        if metrics is not None:
+            metrics.observe(PERFIL_ACTIVO, tiempos)
+    if duplicados and metrics is not None:
+        metrics.observe(PERFIL_ACTIVO, {EVENT_PREFIX + DUPLICATE_EVENT: len(duplicados)})
+    return duplicados, huellas
+
+def _transcript_writers(output_name):
+    """Escritores del .txt procesado y, si GENERATE_RAW_OUTPUT está activado, del _RAW.txt."""
+    header_procesado = f"Procesamiento: {datetime.datetime.now()}\nCarpeta: {output_name}\n\n"
+    header_raw = f"Procesamiento: {datetime.datetime.now()}\nCarpeta: {output_name}\nVERSIÓN RAW (sin postprocesar)\n\n"
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    writer = TranscriptWriter(os.path.join(OUTPUT_FOLDER, f"{output_name}.txt"), header_procesado)
+    writer_raw = None
+    if GENERATE_RAW_OUTPUT:
+        writer_raw = TranscriptWriter(os.path.join(OUTPUT_FOLDER, f"{output_name}_RAW.txt"), header_raw)
+    return writer, writer_raw
+
+def _commit_transcripts(writer, writer_raw):
+    """Publica los .txt de la carpeta."""
+    writer.commit()
+    logger.info(f"Archivo procesado guardado: {writer.path}")
+    if writer_raw is not None:
+        writer_raw.commit()
+        logger.info(f"Archivo RAW guardado: {writer_raw.path}")
+
+def _index_page(output_name, filename, text):
+    """Agrega (o quita, si no tiene texto) una página del índice de búsqueda."""
+    search_index = get_search_index()
+    if search_index is None:
+        return
+    archivo, pagina = split_page_ref(filename)
+    try:
+        search_index.add_page(output_name, filename, text or "", archivo, pagina)
+    except sqlite3.Error as e:
+        # El índice se puede reconstruir después; no frena el OCR
+        logger.warning(f"No se pudo indexar {filename}: {e}")
+
+def process_image_folder(subfolder_path, output_name, workers=OCR_WORKERS, executor=None, force=False,
+                         batch_pages=OCR_BATCH_PAGES, metrics=None):
     """
     Procesa todas las imágenes de una carpeta y genera un archivo de texto.
     
+    El avance se registra página por página en un manifiesto (ver manifiesto.py):
+    al re-ejecutar solo se procesan las páginas nuevas o modificadas, y las
+    salidas combinadas se reconstruyen con los resultados guardados.
+    
     Args:
         subfolder_path: Ruta a la carpeta con imágenes
         output_name: Nombre base para el archivo de salida
+        workers: Cantidad de procesos OCR en paralelo si no se pasa un executor
+        executor: Pool de procesos OCR compartido (ver create_ocr_pool)
+        force: Reprocesar todas las páginas aunque no hayan cambiado
+        batch_pages: Páginas por lote de reconocimiento (0 = una llamada al motor por página)
+        metrics: Registro donde acumular los tiempos por etapa (ver metricas.py)
+    
+    Returns:
+        dict: Cantidad de imágenes, procesadas, fallidas, tomadas del manifiesto y
+              duplicadas (con 'duplicados': {copia: original} si hubo), y con CASCADE_ENABLED el camino de cada página procesada ('cascada')
+              (None si la carpeta no tenía imágenes o falló)
     """
-    texto_procesado = f"Procesamiento: {datetime.datetime.now()}\nCarpeta: {output_name}\n\n"
-    texto_raw = f"Procesamiento: {datetime.datetime.now()}\nCarpeta: {output_name}\nVERSIÓN RAW (sin postprocesar)\n\n"
     logger.info(f"=== Procesando carpeta: {subfolder_path} ===")
     
     imagenes_procesadas = 0
     imagenes_fallidas = 0
+    caminos = {}    # Camino de cada página en la cascada (solo con CASCADE_ENABLED)
+    sin_renglones = 0   # Páginas del manifiesto guardadas sin renglones (versiones anteriores)
+    own_executor = None
+    writer = writer_raw = lines_writer = None
     
     try:
         archivos = sorted(os.listdir(subfolder_path))
-        imagenes = [f for f in archivos if f.lower().endswith(VALID_EXTENSIONS)]
+        archivos = [f for f in archivos if f.lower().endswith(VALID_EXTENSIONS)]
         
-        if not imagenes:
+        if not archivos:
             logger.warning(f"No se encontraron imágenes válidas en {subfolder_path}")
             return
         
-        logger.info(f"Encontradas {len(imagenes)} imágenes para procesar")
+        # Los TIFF y PDF de varias páginas aportan una entrada 'archivo#pN' por
+        # página (ver paginas.py); acá solo se cuentan, no se decodifican
+        imagenes = []
+        for f in archivos:
+            try:
+                imagenes.extend(os.path.basename(ref) for ref in iter_page_refs(os.path.join(subfolder_path, f)))
+            except Exception as e:
+                logger.error(f"No se pudo abrir {f}: {e}")
+                imagenes_fallidas += 1
+        
+        logger.info(f"Encontradas {len(imagenes)} páginas para procesar en {len(archivos)} archivo(s)")
+        
+        # Manifiesto de la carpeta: qué páginas ya están procesadas y sin cambios.
+        # Las páginas de un documento se comparan contra el archivo del documento.
+        manifest = FolderManifest(os.path.join(OUTPUT_FOLDER, MANIFEST_FOLDER, output_name), PROFILE_ID)
+        pendientes = [f for f in imagenes
+                      if force or not manifest.is_current(f, split_page_ref(os.path.join(subfolder_path, f))[0])]
+        # Las registradas como copia siguen siéndolo si la original tampoco cambió
+        registrados = {}
+        presentes, cambiadas = set(imagenes), set(pendientes)
+        for f in imagenes:
+            original = None if f in cambiadas else manifest.duplicate_of(f)
+            if original is None:
+                continue
+            if DUPLICATE_DETECTION and original in presentes and original not in cambiadas:
+                registrados[f] = original
+            else:
+                cambiadas.add(f)
+        pendientes = [f for f in imagenes if f in cambiadas]
+        if len(pendientes) < len(imagenes):
+            logger.info(f"{len(imagenes) - len(pendientes)} página(s) sin cambios se toman del manifiesto, "
+                        f"{len(pendientes)} a procesar")
+        
+        # Copias casi idénticas de otra página: toman la transcripción de la original
+        duplicados, huellas = {}, {}
+        if DUPLICATE_DETECTION and pendientes:
+            duplicados, huellas = find_duplicates(subfolder_path, imagenes, pendientes, manifest, metrics)
+            if duplicados:
+                logger.info(f"{len(duplicados)} página(s) duplicadas no pasan por el OCR")
+                pendientes = [f for f in pendientes if f not in duplicados]
+        nuevos = set(duplicados)
+        duplicados.update(registrados)
+        originales = {original: None for original in duplicados.values()}
+        
+        # Pool propio solo si no se recibió uno compartido y se pidió paralelismo
+        if executor is None and _resolve_workers(workers) > 1 and len(pendientes) > 1:
+            own_executor = executor = create_ocr_pool(min(_resolve_workers(workers), len(pendientes)),
+                                                      batch=batch_pages > 0)
+        
+        # Las salidas se escriben página por página (ver salida.py y renglones.py)
+        writer, writer_raw = _transcript_writers(output_name)
+        if LINES_OUTPUT_FORMAT:
+            lines_writer = LinesWriter(os.path.join(OUTPUT_FOLDER, output_name), LINES_OUTPUT_FORMAT)
+        
+        resultados = _ordered_results([os.path.join(subfolder_path, f) for f in pendientes], executor,
+                                      batch_pages=batch_pages)
+        pendientes = set(pendientes)
         
         for filename in imagenes:
             full_path = os.path.join(subfolder_path, filename)
-            try:
-                resultado = extract_text_paddleocr(full_path)
-                # Ahora extract_text_paddleocr retorna tupla (raw, procesado)
-                if isinstance(resultado, tuple):
-                    raw_text, processed_text = resultado
-                    if processed_text:
-                        texto_procesado += f"\n\n### {filename} ###\n\n" + processed_text
-                        if GENERATE_RAW_OUTPUT:
-                            texto_raw += f"\n\n### {filename} ###\n\n" + raw_text
-                        imagenes_procesadas += 1
-                    else:
-                        logger.warning(f"No se extrajo texto de {filename}")
-                        imagenes_fallidas += 1
+            original = duplicados.get(filename)
+            if original is not None:
+                resultado = originales[original]
+                if resultado is None:
+                    # La original falló: la copia se reintenta con ella en la próxima ejecución
+                    imagenes_fallidas += 1
+                    continue
+                if filename in nuevos:
+                    manifest.record_duplicate(filename, split_page_ref(full_path)[0], original)
+            elif filename in pendientes:
+                resultado, error, tiempos = next(resultados)
+                ok = error is None and isinstance(resultado, tuple)
+                camino = _cascade_path(tiempos)
+                if camino is not None:
+                    caminos[filename] = camino
+                if metrics is not None:
+                    metrics.observe(PERFIL_ACTIVO, tiempos)
+                    metrics.page_done(PERFIL_ACTIVO, ok=ok)
+                if error is not None:
+                    logger.error(f"Error procesando {filename}: {error}", exc_info=error)
+                    imagenes_fallidas += 1
+                    continue
+                if not ok:
+                    # extract_text_paddleocr retorna "" si falló: se reintenta en la próxima ejecución
+                    imagenes_fallidas += 1
+                    continue
+                # Checkpoint: el resultado de la página queda guardado antes de seguir
+                manifest.record(filename, split_page_ref(full_path)[0], *resultado,
+                                visual_hash=huellas.get(filename))
+            else:
+                resultado = manifest.load_result(filename)
+                if resultado is None:
+                    imagenes_fallidas += 1
+                    continue
+            
+            if filename in originales:
+                originales[filename] = resultado
+            raw_text, processed_text, lineas = resultado
+            if lines_writer is not None:
+                # También las páginas sin texto: con otro umbral pueden tenerlo
+                if lineas is None:
+                    sin_renglones += 1
                 else:
-                    # Compatibilidad con versión anterior (por si acaso)
-                    if resultado:
-                        texto_procesado += f"\n\n### {filename} ###\n\n" + resultado
-                        imagenes_procesadas += 1
-                    else:
-                        imagenes_fallidas += 1
-            except Exception as e:
-                logger.error(f"Error procesando {filename}: {e}", exc_info=True)
+                    lines_writer.add_page(filename, lineas)
+            _index_page(output_name, filename, processed_text)
+            if processed_text:
+                if original is not None:
+                    nota = DUPLICATE_NOTE.format(original)
+                    processed_text, raw_text = f"{nota}\n{processed_text}", f"{nota}\n{raw_text}"
+                writer.write_section(filename, processed_text)
+                if writer_raw is not None:
+                    writer_raw.write_section(filename, raw_text)
+                imagenes_procesadas += 1
+            else:
+                logger.warning(f"No se extrajo texto de {filename}")
                 imagenes_fallidas += 1
 
-        os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-        
-        # Guardar versión procesada
-        output_file = os.path.join(OUTPUT_FOLDER, f"{output_name}.txt")
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write(texto_procesado)
-        logger.info(f"Archivo procesado guardado: {output_file}")
-        
-        # Guardar versión raw si está activada
-        if GENERATE_RAW_OUTPUT:
-            output_file_raw = os.path.join(OUTPUT_FOLDER, f"{output_name}_RAW.txt")
-            with open(output_file_raw, "w", encoding="utf-8") as f:
-                f.write(texto_raw)
-            logger.info(f"Archivo RAW guardado: {output_file_raw}")
+        manifest.compact(imagenes)
+        search_index = get_search_index()
+        if search_index is not None:
+            search_index.retain(output_name, imagenes)
+
+        # Guardar versión procesada y raw (si está activada)
+        _commit_transcripts(writer, writer_raw)
+
+        if lines_writer is not None:
+            if sin_renglones:
+                # Una tabla sin esas páginas no serviría para regenerar los .txt
+                lines_writer.abort()
+                logger.warning(f"{sin_renglones} página(s) del manifiesto no tienen los renglones guardados: "
+                               f"no se actualiza la tabla de renglones (usar --force para generarla)")
+            else:
+                lines_writer.commit()
+                logger.info(f"Renglones guardados: {lines_writer.paths[LINES_OUTPUT_FORMAT]}")
         
         logger.info(f"Resumen - Procesadas: {imagenes_procesadas}, Fallidas: {imagenes_fallidas}")
+        resumen = {
+            'imagenes': len(imagenes),
+            'procesadas': imagenes_procesadas,
+            'fallidas': imagenes_fallidas,
+            'del_manifiesto': len(imagenes) - len(pendientes) - len(duplicados),
+            'duplicadas': len(duplicados),
+        }
+        if duplicados:
+            logger.info(f"Duplicadas - {len(duplicados)} página(s) tomaron la transcripción de otra sin pasar por el OCR")
+            resumen['duplicados'] = duplicados
+        if CASCADE_ENABLED:
+            escaladas = sum(1 for camino in caminos.values() if camino != FAST)
+            logger.info(f"Cascada - Rápidas: {len(caminos) - escaladas}, Escaladas: {escaladas}")
+            resumen['cascada'] = caminos
+        return resumen
         
     except Exception as e:
         logger.error(f"Error procesando carpeta {subfolder_path}: {e}", exc_info=True)
+    finally:
+        # Si algo falló a mitad de camino se descartan los temporales
+        for w in (writer, writer_raw, lines_writer):
+            if w is not None:
+                w.abort()
+        if own_executor is not None:
+            own_executor.shutdown()
+        processed_writer.flush()
+
+def regenerate_folder(output_name, confidence_threshold=CONFIDENCE_THRESHOLD):
+    """
+    Vuelve a generar los .txt de una carpeta desde su tabla de renglones, sin OCR.
+
+    Sirve para probar otro umbral de confianza o volver a aplicar el
+    postprocesamiento sobre lo que ya se reconoció.
 
-def main():
+    Args:
+        output_name: Nombre de la carpeta (el de los archivos en OUTPUT_FOLDER)
+        confidence_threshold: Umbral de confianza para filtrar los renglones
+
+    Returns:
+        dict: Resumen de la carpeta, o None si no hay tabla de renglones
+    """
+    tabla = load_lines(os.path.join(OUTPUT_FOLDER, output_name))
+    if tabla is None:
+        logger.error(f"No hay tabla de renglones de {output_name}: procesar la carpeta con LINES_OUTPUT_FORMAT activado")
+        return None
+    logger.info(f"=== Regenerando {output_name} desde {len(tabla)} renglones (umbral {confidence_threshold}) ===")
+    imagenes_procesadas = 0
+    writer, writer_raw = _transcript_writers(output_name)
+    try:
+        for page, filename in enumerate(tabla.pages):
+            resultado = postprocess_lines(tabla.page_lines(page), filename, confidence_threshold)
+            _index_page(output_name, filename, resultado[1] if resultado else "")
+            if resultado and resultado[1]:
+                writer.write_section(filename, resultado[1])
+                if writer_raw is not None:
+                    writer_raw.write_section(filename, resultado[0])
+                imagenes_procesadas += 1
+            else:
+                logger.warning(f"No quedó texto de {filename} con umbral {confidence_threshold}")
+        _commit_transcripts(writer, writer_raw)
+    finally:
+        for w in (writer, writer_raw):
+            if w is not None:
+                w.abort()
+    return {'imagenes': len(tabla.pages), 'procesadas': imagenes_procesadas,
+            'fallidas': len(tabla.pages) - imagenes_procesadas}
+
+def rebuild_search_index():
+    """
+    Reconstruye el índice de búsqueda desde los .txt de OUTPUT_FOLDER.
+
+    Returns:
+        int: Páginas indexadas, o None si el índice está desactivado
+    """
+    search_index = get_search_index()
+    if search_index is None:
+        logger.error("El índice de búsqueda está desactivado (SEARCH_INDEX_FILE) o no se pudo abrir")
+        return None
+    search_index.clear()
+    paginas = 0
+    for name in sorted(os.listdir(OUTPUT_FOLDER)) if os.path.isdir(OUTPUT_FOLDER) else []:
+        if not name.endswith('.txt') or name.endswith('_RAW.txt'):
+            continue
+        output_name = name[:-len('.txt')]
+        secciones = read_sections(os.path.join(OUTPUT_FOLDER, name))
+        for filename, text in secciones:
+            _index_page(output_name, filename, text)
+        paginas += len(secciones)
+        logger.info(f"Indexadas {len(secciones)} páginas de {output_name}")
+    search_index.optimize()
+    logger.info(f"Índice de búsqueda reconstruido: {paginas} páginas")
+    return paginas
+
+def parse_args(argv=None):
+    """Argumentos de línea de comandos (los valores por defecto salen de config.py)."""
+    parser = argparse.ArgumentParser(description="Procesa con OCR todas las subcarpetas de 'image/'.")
+    parser.add_argument('--workers', type=int, default=OCR_WORKERS,
+                        help="Procesos OCR en paralelo, cada uno con su motor (0 = uno por núcleo)")
+    parser.add_argument('--folder-workers', type=int, default=FOLDER_WORKERS,
+                        help="Subcarpetas procesadas al mismo tiempo")
+    parser.add_argument('--force', action='store_true',
+                        help="Reprocesar todas las páginas aunque el manifiesto indique que no cambiaron")
+    parser.add_argument('--batch-pages', type=int, default=OCR_BATCH_PAGES,
+                        help="Reconocer los renglones de esta cantidad de páginas en lotes compartidos (0 = desactivado)")
+    parser.add_argument('--summary', default=RUN_SUMMARY_FILE,
+                        help="Archivo JSON con el resumen de la ejecución y los tiempos por etapa ('' = no generarlo)")
+    parser.add_argument('--regenerate', action='store_true',
+                        help="Regenerar los .txt desde las tablas de renglones guardadas, sin correr el OCR")
+    parser.add_argument('--threshold', type=float, default=CONFIDENCE_THRESHOLD,
+                        help="Umbral de confianza para --regenerate")
+    parser.add_argument('--rebuild-index', action='store_true',
+                        help="Reconstruir el índice de búsqueda desde los .txt de 'texto/', sin correr el OCR")
+    parser.add_argument('--serve-inference', action='store_true',
+                        help="Correr el servidor de inferencia compartido por los workers web (ver gunicorn.conf.py)")
+    return parser.parse_args(argv)
+
+def write_run_summary(path, args, inicio, fin, carpetas, metrics):
+    """
+    Guarda el resumen de la ejecución: configuración usada, resultado de cada
+    carpeta y tiempos por etapa del registro de métricas.
+    """
+    duracion = (fin - inicio).total_seconds()
+    # Páginas que pasaron por el OCR en esta ejecución (no las tomadas del manifiesto)
+    paginas = sum(c['imagenes'] - c['del_manifiesto'] - c.get('duplicadas', 0) for c in carpetas.values() if c)
+    resumen = {
+        'inicio': inicio.isoformat(timespec='seconds'),
+        'fin': fin.isoformat(timespec='seconds'),
+        'duracion_s': round(duracion, 2),
+        'perfil': PERFIL_ACTIVO,
+        'workers': args.workers,
+        'batch_pages': args.batch_pages,
+        'paginas_ocr': paginas,
+        'paginas_duplicadas': sum(c.get('duplicadas', 0) for c in carpetas.values() if c),
+        'paginas_por_segundo': round(paginas / duracion, 3) if duracion > 0 else None,
+        'carpetas': carpetas,
+        'metricas': metrics.summary(),
+    }
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(resumen, f, indent=2, ensure_ascii=False)
+        logger.info(f"Resumen de la ejecución guardado: {path}")
+    except OSError as e:
+        logger.warning(f"No se pudo guardar el resumen de la ejecución en {path}: {e}")
+
+def main(argv=None):
     """
     Función principal que procesa todas las subcarpetas en 'image/'.
     """
+    args = parse_args(argv)
+    if args.serve_inference:
+        serve_inference()
+        return
+
     logger.info("="*50)
     logger.info("Iniciando proceso de OCR")
     logger.info("="*50)
+
+    if args.rebuild_index:
+        rebuild_search_index()
+        return
+
+    if args.regenerate:
+        tablas = available_tables(OUTPUT_FOLDER)
+        if not tablas:
+            logger.warning(f"No hay tablas de renglones en '{OUTPUT_FOLDER}/'.")
+        regeneradas = sum(regenerate_folder(nombre, args.threshold) is not None for nombre in tablas)
+        logger.info(f"Carpetas regeneradas: {regeneradas}/{len(tablas)}")
+        return
     
     if not os.path.exists(IMAGE_FOLDER):
         logger.error(f"La carpeta '{IMAGE_FOLDER}' no existe. Creándola...")
@@ -445,20 +1442,47 @@ def main():
     if not subfolders:
         logger.warning(f"No se encontró ninguna carpeta dentro de '{IMAGE_FOLDER}/'.")
         logger.info("Creá una subcarpeta dentro de 'image/' y agregá las imágenes a procesar.")
-    else:
+        return
+
+    inicio = datetime.datetime.now()
+    metrics = MetricsRegistry(keep_samples=True)
+    carpetas = {}
+
+    # Un único pool de procesos OCR compartido por todas las carpetas
+    executor = None
+    if _resolve_workers(args.workers) > 1:
+        executor = create_ocr_pool(args.workers, batch=args.batch_pages > 0)
+
+    def procesar_subcarpeta(subfolder):
+        full_path = os.path.join(IMAGE_FOLDER, subfolder)
+        try:
+            carpetas[subfolder] = process_image_folder(full_path, subfolder, workers=args.workers,
+                                                       executor=executor, force=args.force,
+                                                       batch_pages=args.batch_pages, metrics=metrics)
+            return True
+        except Exception as e:
+            logger.error(f"Error al procesar subcarpeta {subfolder}: {e}", exc_info=True)
+            return False
+
+    try:
         # Procesar cada carpeta
-        carpetas_procesadas = 0
-        for subfolder in subfolders:
-            full_path = os.path.join(IMAGE_FOLDER, subfolder)
-            try:
-                process_image_folder(full_path, subfolder)
-                carpetas_procesadas += 1
-            except Exception as e:
-                logger.error(f"Error al procesar subcarpeta {subfolder}: {e}", exc_info=True)
-        
-        logger.info("="*50)
-        logger.info(f"Proceso finalizado. Carpetas procesadas: {carpetas_procesadas}/{len(subfolders)}")
-        logger.info("="*50)
+        folder_workers = min(_resolve_workers(args.folder_workers), len(subfolders))
+        if folder_workers > 1:
+            with ThreadPoolExecutor(max_workers=folder_workers) as folder_pool:
+                resultados = list(folder_pool.map(procesar_subcarpeta, subfolders))
+        else:
+            resultados = [procesar_subcarpeta(subfolder) for subfolder in subfolders]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    carpetas_procesadas = sum(resultados)
+    
+    if args.summary:
+        write_run_summary(args.summary, args, inicio, datetime.datetime.now(), carpetas, metrics)
+    
+    logger.info("="*50)
+    logger.info(f"Proceso finalizado. Carpetas procesadas: {carpetas_procesadas}/{len(subfolders)}")
+    logger.info("="*50)
 
 if __name__ == '__main__':
     # Si se quiere probar una imagen específica, descomentar y ajustar la ruta:
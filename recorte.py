@@ -0,0 +1,123 @@
+"""
+Recorte de márgenes antes del preprocesamiento.
+
+Los escaneos del archivo suelen tener márgenes anchos en blanco, el borde
+oscuro de la tapa del escáner y las sombras de las perforaciones. Todos esos
+píxeles pasan por CLAHE, la binarización, el filtro de ruido y la detección
+de renglones sin aportar texto.
+
+find_text_region() busca la zona con texto sobre una miniatura:
+
+- Binariza con umbral adaptativo (un umbral global como Otsu se lo lleva el
+  borde negro del escáner y deja afuera la tinta gastada) y separa los
+  componentes conexos.
+- Descarta los que tocan el borde de la página y son largos (bordes del
+  escáner, sombras del lomo), las perforaciones y las motas de unos pocos
+  píxeles. Una perforación es un círculo macizo mucho más grande que una
+  letra pero chico respecto de la página, entero dentro de la banda del
+  margen (HOLE_MARGIN) y lejos de las esquinas; los sellos, timbres y fotos
+  macizos (cuadrados, más grandes o fuera de esa banda) se conservan.
+- La zona es el rectángulo que contiene a todos los demás, agrandado en
+  'padding' píxeles de cada lado.
+
+Si el recorte ahorra menos de MIN_SAVING de la página no se recorta. La zona
+se informa para poder llevar coordenadas de la página recortada a la página
+entera (to_page; resolucion.to_original ya lo tiene en cuenta).
+"""
+
+import cv2
+import numpy as np
+
+# Lado mayor de la miniatura donde se busca el texto
+THUMB_SIZE = 1000
+# Fracción mínima de la página que tiene que ahorrar el recorte
+MIN_SAVING = 0.05
+# Componentes con menos píxeles (en la miniatura) son motas, no texto
+MIN_INK_AREA = 8
+# Un componente que toca el borde y mide más que esta fracción del lado es un borde o una sombra
+BORDER_FRACTION = 0.1
+# Una perforación es al menos esta cantidad de veces más alta que una letra
+HOLE_SIZE = 2.0
+# ... y a lo sumo esta fracción del lado menor de la página (~9 mm en A5)
+HOLE_MAX_SIZE = 0.06
+# Banda del margen, como fracción de cada lado, donde puede haber perforaciones
+HOLE_MARGIN = 0.08
+# Relación entre el área y la caja de un círculo macizo (pi/4 ~ 0.785); un cuadrado da ~1
+HOLE_FILL = (0.65, 0.9)
+# Bloque (px de la miniatura, impar) y constante del umbral adaptativo. El
+# bloque es más grande que una perforación para que salga maciza y no un anillo
+BLOCK_SIZE = 51
+BLOCK_C = 15
+
+def _thumbnail(img):
+    """Miniatura en escala de grises y su factor de escala respecto de 'img'."""
+    h, w = img.shape[:2]
+    factor = min(1.0, THUMB_SIZE / float(max(h, w)))
+    if factor < 1.0:
+        img = cv2.resize(img, (max(1, round(w * factor)), max(1, round(h * factor))), interpolation=cv2.INTER_AREA)
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return img, factor
+
+def find_text_region(img, padding=0):
+    """
+    Zona de la página que contiene el texto.
+
+    Args:
+        img: Página BGR o en escala de grises
+        padding: Píxeles (de la página) que se agregan alrededor del texto
+
+    Returns:
+        tuple: (x, y, ancho, alto) en píxeles de la página, o None si no se
+               encontró texto o el recorte no ahorra al menos MIN_SAVING
+    """
+    h, w = img.shape[:2]
+    thumb, factor = _thumbnail(img)
+    th, tw = thumb.shape
+    mask = cv2.adaptiveThreshold(thumb, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV,
+                                 BLOCK_SIZE, BLOCK_C)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    stats = stats[1:]
+    x, y = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+    cw, ch = stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT]
+    area = stats[:, cv2.CC_STAT_AREA]
+
+    touches = (x == 0) | (y == 0) | (x + cw == tw) | (y + ch == th)
+    border = touches & ((cw > BORDER_FRACTION * tw) | (ch > BORDER_FRACTION * th))
+    keep = ~border & (area >= MIN_INK_AREA)
+    if not keep.any():
+        return None
+    # Perforaciones: círculos macizos mucho más altos que la letra típica, dentro
+    # de la banda de un solo margen (en las esquinas suele haber sellos)
+    letter = float(np.median(ch[keep]))
+    size = np.maximum(cw, ch)
+    fill = area / (cw * ch).astype(np.float64)
+    round_ = ((ch > HOLE_SIZE * letter) & (size <= HOLE_MAX_SIZE * min(tw, th))
+              & (np.abs(cw - ch) < 0.2 * size) & (fill >= HOLE_FILL[0]) & (fill <= HOLE_FILL[1]))
+    side = (x + cw <= HOLE_MARGIN * tw) | (x >= (1.0 - HOLE_MARGIN) * tw)
+    end = (y + ch <= HOLE_MARGIN * th) | (y >= (1.0 - HOLE_MARGIN) * th)
+    keep &= ~(round_ & (side ^ end))
+    if not keep.any():
+        return None
+
+    left = max(0, int(np.floor(x[keep].min() / factor)) - padding)
+    top = max(0, int(np.floor(y[keep].min() / factor)) - padding)
+    right = min(w, int(np.ceil((x[keep] + cw[keep]).max() / factor)) + padding)
+    bottom = min(h, int(np.ceil((y[keep] + ch[keep]).max() / factor)) + padding)
+    if (right - left) * (bottom - top) > (1.0 - MIN_SAVING) * w * h:
+        return None
+    return left, top, right - left, bottom - top
+
+def crop(img, region):
+    """La página recortada a la zona (una vista, sin copiar); la página entera si region es None."""
+    if region is None:
+        return img
+    x, y, w, h = region
+    return img[y:y + h, x:x + w]
+
+def to_page(points, region):
+    """Lleva coordenadas de la página recortada a la página entera."""
+    points = np.asarray(points, dtype=np.float32)
+    if region is None:
+        return points
+    return points + np.array(region[:2], dtype=np.float32)
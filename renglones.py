@@ -0,0 +1,315 @@
+"""
+Resultado estructurado por renglón: texto, confianza, cuadrilátero y número de renglón.
+
+El .txt de cada carpeta solo tiene los renglones que superaron el umbral de
+confianza, ya postprocesados. Para revisar el diseño de la página, mostrar
+los renglones sobre la imagen o volver a filtrar con otro umbral hace falta
+lo que devolvió el OCR, y sin esto había que volver a reconocer todo.
+
+LinesWriter guarda, junto a los .txt, todos los renglones reconocidos de la
+carpeta en formato columnar:
+
+    {nombre}.renglones.npy  : arreglo estructurado de NumPy (LINE_DTYPE), un
+                              registro por renglón: página, número de
+                              renglón, confianza, cuadrilátero (4 puntos en
+                              píxeles de la imagen original; NaN si el motor
+                              no lo informó o no se puede llevar a la imagen
+                              original, ver doc_preprocessor_boxes) y
+                              posición del texto en el .utf8
+    {nombre}.renglones.utf8 : los textos de todos los renglones seguidos, en UTF-8
+    {nombre}.renglones.json : versión del formato y páginas en orden (nombre
+                              y cantidad de renglones)
+
+Con el formato 'jsonl' (sin NumPy de por medio, para leerlo desde otras
+herramientas) se escribe {nombre}.renglones.jsonl, una línea por página.
+
+load_lines() abre cualquiera de los dos. El .npy y el .utf8 se mapean en
+memoria: abrir la tabla de una carpeta grande no la lee entera, y cada
+página se decodifica recién cuando se pide.
+"""
+
+import json
+import logging
+import os
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+FORMATS = ('npy', 'jsonl')
+
+LINE_DTYPE = np.dtype([
+    ('page', '<u4'),          # Índice de la página en la tabla
+    ('line', '<u4'),          # Número de renglón dentro de la página (orden de lectura)
+    ('score', '<f4'),         # Confianza del reconocimiento
+    ('box', '<f4', (4, 2)),   # Cuadrilátero (x, y) en sentido horario desde arriba a la izquierda
+    ('offset', '<u8'),        # Posición del texto en el .utf8 (bytes)
+    ('length', '<u4'),        # Largo del texto (bytes)
+])
+
+def box_list(poly):
+    """Cuadrilátero como lista [[x, y], ...] de 4 puntos (None si no hay o no tiene 4 puntos)."""
+    if poly is None:
+        return None
+    points = np.asarray(poly, dtype=np.float32).reshape(-1, 2)
+    if len(points) != 4:
+        return None
+    return [[round(float(x), 1), round(float(y), 1)] for x, y in points]
+
+def _doc_rotation_matrix(shape, angle):
+    """
+    Transformación con la que el preprocesador de documentos de PaddleOCR
+    gira una página de este tamaño (rotate_image de PaddleX: alrededor del
+    centro, agrandando el lienzo para que entre la página girada).
+    """
+    h, w = shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    matrix[0, 2] += (int(h * sin + w * cos) - w) / 2
+    matrix[1, 2] += (int(h * cos + w * sin) - h) / 2
+    return matrix
+
+def doc_preprocessor_boxes(boxes, doc_result):
+    """
+    Lleva los cuadriláteros del OCR a la imagen que recibió el motor.
+
+    PaddleOCR ubica los renglones sobre la imagen que devuelve su
+    preprocesador de documentos ('doc_preprocessor_res' del resultado): la
+    página girada 90, 180 o 270° según el clasificador de orientación y, si
+    está activado, enderezada con UVDoc. El giro se deshace. El enderezado
+    no: UVDoc no informa la deformación que aplicó, así que en las páginas
+    enderezadas todos los cuadriláteros pasan a None antes que guardarlos
+    en coordenadas equivocadas.
+
+    Args:
+        boxes: Cuadriláteros [[x, y], ...] (o None) sobre la imagen preprocesada por PaddleOCR
+        doc_result: 'doc_preprocessor_res' del resultado (None = sin preprocesador de documentos)
+
+    Returns:
+        list: Los cuadriláteros en píxeles de la imagen que recibió el motor, o None
+    """
+    if not doc_result:
+        return boxes
+    settings = doc_result.get('model_settings') or {}
+    if settings.get('use_doc_unwarping'):
+        return [None] * len(boxes)
+    angle = doc_result.get('angle', -1)
+    if angle is None or int(angle) <= 0:
+        return boxes
+    rotated = doc_result.get('rot_img')
+    if rotated is None:
+        rotated = doc_result['output_img']
+    h, w = rotated.shape[:2]
+    # Con 90 y 270 la imagen girada tiene el ancho y el alto de la recibida intercambiados
+    shape = (w, h) if int(angle) in (90, 270) else (h, w)
+    inverse = cv2.invertAffineTransform(_doc_rotation_matrix(shape, int(angle)))
+    originales = []
+    for box in boxes:
+        if box is None:
+            originales.append(None)
+            continue
+        points = np.asarray(box, dtype=np.float64) @ inverse[:, :2].T + inverse[:, 2]
+        # El giro conserva el sentido horario pero no cuál es la esquina de arriba a la izquierda
+        originales.append(box_list(np.roll(points, -int(np.argmin(points.sum(axis=1))), axis=0)))
+    return originales
+
+def line_paths(base):
+    """Archivos de la tabla de renglones de 'base' (ruta sin extensión, p. ej. 'texto/carpeta')."""
+    return {
+        'npy': f"{base}.renglones.npy",
+        'utf8': f"{base}.renglones.utf8",
+        'json': f"{base}.renglones.json",
+        'jsonl': f"{base}.renglones.jsonl",
+    }
+
+def available_tables(folder):
+    """Nombres base de las tablas de renglones guardadas en 'folder'."""
+    if not os.path.isdir(folder):
+        return []
+    names = set()
+    for name in os.listdir(folder):
+        for suffix in ('.renglones.json', '.renglones.jsonl'):
+            if name.endswith(suffix):
+                names.add(name[:-len(suffix)])
+    return sorted(names)
+
+class LinesWriter:
+    """
+    Escritor en streaming de la tabla de renglones de una carpeta.
+
+    Como TranscriptWriter, escribe en temporales y recién en commit() los
+    publica con rename; el índice (.json) se publica último, así que un
+    lector nunca ve una tabla a medio escribir.
+
+    Args:
+        base: Ruta de salida sin extensión (p. ej. 'texto/carpeta')
+        fmt: 'npy' o 'jsonl'
+    """
+
+    def __init__(self, base, fmt='npy'):
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato de renglones desconocido: {fmt}. Opciones: {', '.join(FORMATS)}")
+        self.paths = line_paths(base)
+        self.fmt = fmt
+        self.committed = False
+        self._pages = []
+        self._records = []
+        self._offset = 0
+        main = self.paths['utf8'] if fmt == 'npy' else self.paths['jsonl']
+        self._tmp = [main]
+        self._file = open(f"{main}.tmp", 'wb')
+
+    def add_page(self, filename, lineas):
+        """
+        Agrega los renglones de una página.
+
+        Args:
+            filename: Nombre de la página (como en el .txt)
+            lineas: Tuplas (texto, confianza, cuadrilátero) sin filtrar, en orden de lectura
+        """
+        if self.fmt == 'jsonl':
+            renglones = [{'texto': text, 'confianza': round(float(score), 4), 'caja': box_list(box)}
+                         for text, score, box in lineas]
+            self._file.write((json.dumps({'pagina': filename, 'renglones': renglones},
+                                         ensure_ascii=False) + '\n').encode('utf-8'))
+        else:
+            page = len(self._pages)
+            for number, (text, score, box) in enumerate(lineas):
+                data = text.encode('utf-8')
+                self._file.write(data)
+                corners = box_list(box)
+                self._records.append((page, number, score,
+                                      np.full((4, 2), np.nan) if corners is None else corners,
+                                      self._offset, len(data)))
+                self._offset += len(data)
+        self._pages.append([filename, len(lineas)])
+
+    def commit(self):
+        """Publica la tabla reemplazando la anterior."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        if self.fmt == 'npy':
+            records = np.array(self._records, dtype=LINE_DTYPE)
+            with open(f"{self.paths['npy']}.tmp", 'wb') as f:
+                np.save(f, records)
+            self._tmp.append(self.paths['npy'])
+            index = {'version': FORMAT_VERSION, 'paginas': self._pages,
+                     'renglones': len(records), 'bytes': self._offset}
+            with open(f"{self.paths['json']}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False)
+            self._tmp.append(self.paths['json'])
+        for path in self._tmp:
+            os.replace(f"{path}.tmp", path)
+        # Una tabla del otro formato de una ejecución anterior quedaría desactualizada
+        stale = [self.paths['jsonl']] if self.fmt == 'npy' else [self.paths[k] for k in ('npy', 'utf8', 'json')]
+        for path in stale:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.committed = True
+
+    def abort(self):
+        """Descarta los temporales y deja intacta la tabla anterior (si existía)."""
+        if self.committed:
+            return
+        if not self._file.closed:
+            self._file.close()
+        for path in self._tmp:
+            try:
+                os.remove(f"{path}.tmp")
+            except OSError:
+                pass
+
+class LineTable:
+    """
+    Tabla de renglones de una carpeta (ver load_lines).
+
+    Attributes:
+        pages: Nombres de las páginas, en orden
+        records: Arreglo estructurado LINE_DTYPE (mapeado en memoria con el formato 'npy')
+    """
+
+    def __init__(self, pages, records, texts):
+        self.pages = pages
+        self.records = records
+        self._texts = texts
+        counts = np.bincount(records['page'], minlength=len(pages)) if len(records) else np.zeros(len(pages), int)
+        self._starts = np.concatenate(([0], np.cumsum(counts)))
+
+    def __len__(self):
+        return len(self.records)
+
+    def text(self, i):
+        """Texto del renglón i de la tabla."""
+        offset, length = int(self.records['offset'][i]), int(self.records['length'][i])
+        return bytes(self._texts[offset:offset + length]).decode('utf-8')
+
+    def page_lines(self, page):
+        """
+        Renglones de una página.
+
+        Args:
+            page: Índice o nombre de la página
+
+        Returns:
+            list: Tuplas (texto, confianza, cuadrilátero) como las devuelve el OCR
+        """
+        if not isinstance(page, int):
+            page = self.pages.index(page)
+        lineas = []
+        for i in range(self._starts[page], self._starts[page + 1]):
+            box = self.records['box'][i]
+            lineas.append((self.text(i), float(self.records['score'][i]),
+                           None if np.isnan(box).any() else np.round(box.astype(float), 1).tolist()))
+        return lineas
+
+def _load_npy(paths):
+    with open(paths['json'], encoding='utf-8') as f:
+        index = json.load(f)
+    if index.get('version') != FORMAT_VERSION:
+        raise ValueError(f"versión {index.get('version')} no soportada")
+    records = np.load(paths['npy'], mmap_mode='r')
+    if len(records) != index['renglones']:
+        raise ValueError("la cantidad de renglones no coincide con el índice")
+    if index['bytes'] == 0:
+        texts = np.zeros(0, np.uint8)   # np.memmap no acepta archivos vacíos
+    else:
+        texts = np.memmap(paths['utf8'], dtype=np.uint8, mode='r')
+    return LineTable([name for name, _ in index['paginas']], records, texts)
+
+def _load_jsonl(paths):
+    pages, records, texts = [], [], bytearray()
+    with open(paths['jsonl'], encoding='utf-8') as f:
+        for linea in f:
+            if not linea.strip():
+                continue
+            page = json.loads(linea)
+            for number, renglon in enumerate(page['renglones']):
+                data = renglon['texto'].encode('utf-8')
+                box = renglon.get('caja')
+                records.append((len(pages), number, renglon['confianza'],
+                                np.full((4, 2), np.nan) if box is None else box, len(texts), len(data)))
+                texts.extend(data)
+            pages.append(page['pagina'])
+    return LineTable(pages, np.array(records, dtype=LINE_DTYPE), np.frombuffer(bytes(texts), np.uint8))
+
+def load_lines(base):
+    """
+    Abre la tabla de renglones guardada en 'base' (ruta sin extensión).
+
+    Returns:
+        LineTable | None: La tabla, o None si no existe o no se pudo leer
+    """
+    paths = line_paths(base)
+    try:
+        if os.path.exists(paths['json']):
+            return _load_npy(paths)
+        if os.path.exists(paths['jsonl']):
+            return _load_jsonl(paths)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"No se pudo leer la tabla de renglones de {base}: {e}")
+    return None
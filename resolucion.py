@@ -0,0 +1,206 @@
+"""
+Normalización de resolución antes del preprocesamiento.
+
+CLAHE, la binarización adaptativa y sobre todo fastNlMeansDenoising cuestan
+proporcional a la cantidad de píxeles: un escaneo a 600 dpi cuesta unas 4
+veces lo que uno a 300 dpi y no se reconoce mejor. Lo que importa para el OCR
+es el alto de las letras en píxeles, no los dpi del escáner.
+
+normalize() estima el alto del texto sobre una miniatura (mediana del alto de
+los componentes conexos del tamaño de una letra) y reduce la página hasta el
+alto objetivo del perfil. Nunca agranda. Con JPEG se aprovecha la
+decodificación reducida de libjpeg (cv2.IMREAD_REDUCED_*): la página se
+decodifica directamente a 1/2, 1/4 u 1/8 y solo se ajusta el resto con resize.
+
+El factor de escala aplicado se informa para poder llevar coordenadas de la
+página normalizada (cajas de renglones) a la imagen original (to_original).
+"""
+
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Lado mayor aproximado de la miniatura donde se miden las letras
+THUMB_SIZE = 1200
+# Con JPEG se acepta quedar hasta un 10% por debajo del alto objetivo si así
+# la página sale directo de la decodificación reducida, sin resize
+REDUCED_TOLERANCE = 0.9
+# Componentes necesarios para confiar en la estimación
+MIN_COMPONENTS = 30
+
+_REDUCED_COLOR = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                  4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+_REDUCED_GRAY = {1: cv2.IMREAD_GRAYSCALE, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+                 4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+
+def is_jpeg(source):
+    """Si la imagen (ruta o bytes) es un JPEG, que admite la decodificación reducida."""
+    if isinstance(source, str):
+        return source.lower().endswith(('.jpg', '.jpeg'))
+    return bytes(source[:3]) == b'\xff\xd8\xff'
+
+def decode(source, flags=cv2.IMREAD_COLOR):
+    """Decodifica una imagen desde una ruta o desde sus bytes en memoria (sin pasar por el disco)."""
+    if isinstance(source, str):
+        return cv2.imread(source, flags)
+    if len(source) == 0:
+        return None
+    return cv2.imdecode(np.frombuffer(source, np.uint8), flags)
+
+def estimate_text_height(gray):
+    """
+    Alto típico de las letras en píxeles de la imagen recibida.
+
+    Args:
+        gray: Página (o miniatura) en escala de grises
+
+    Returns:
+        float: Mediana del alto de los componentes con tamaño de letra,
+               o None si no hay suficientes para estimarlo
+    """
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    h, w = mask.shape
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    # Letras: ni motas de ruido ni manchas, bordes o renglones subrayados
+    letters = (heights >= 4) & (heights < h / 15) & (widths < w / 10) & (areas >= 8) & (widths < 4 * heights)
+    if np.count_nonzero(letters) < MIN_COMPONENTS:
+        return None
+    return float(np.median(heights[letters]))
+
+def _thumbnail(gray):
+    """Miniatura de trabajo y su factor de escala respecto de 'gray'."""
+    h, w = gray.shape[:2]
+    factor = min(1.0, THUMB_SIZE / float(max(h, w)))
+    if factor < 1.0:
+        gray = cv2.resize(gray, (max(1, round(w * factor)), max(1, round(h * factor))), interpolation=cv2.INTER_AREA)
+    return gray, factor
+
+def _resize(img, size):
+    if (img.shape[1], img.shape[0]) == size:
+        return img
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+def _target_size(width, height, scale):
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def normalize(img, target_text_height):
+    """
+    Reduce una página ya decodificada hasta el alto de texto objetivo.
+
+    Args:
+        img: Página BGR o en escala de grises
+        target_text_height: Alto objetivo de las letras en píxeles (0 = no normalizar)
+
+    Returns:
+        tuple: (página, info) con info = {'scale', 'text_height', 'original_size'}
+    """
+    h, w = img.shape[:2]
+    info = {'scale': 1.0, 'text_height': None, 'original_size': (w, h)}
+    if target_text_height <= 0:
+        return img, info
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    thumb, factor = _thumbnail(gray)
+    text_height = estimate_text_height(thumb)
+    if text_height is None:
+        return img, info
+    info['text_height'] = text_height / factor
+    scale = min(1.0, target_text_height / info['text_height'])
+    if scale < 1.0:
+        img = _resize(img, _target_size(w, h, scale))
+        info['scale'] = img.shape[1] / float(w)
+    return img, info
+
+def read_normalized(path, target_text_height):
+    """
+    Lee un JPEG directamente a la resolución normalizada.
+
+    Decodifica una miniatura reducida para medir el texto, elige el mayor
+    factor de reducción de libjpeg (1/2, 1/4, 1/8) que no quede por debajo
+    del tamaño objetivo (salvo REDUCED_TOLERANCE) y ajusta el resto con resize.
+
+    La miniatura es una decodificación extra: en las páginas que no hace falta
+    reducir cuesta algo menos de la mitad de leer la imagen, y en las que sí
+    se ahorra la decodificación completa y el resize desde el tamaño original.
+
+    Args:
+        path: Ruta del JPEG o sus bytes
+        target_text_height: Alto objetivo de las letras en píxeles (> 0)
+
+    Returns:
+        tuple: (página BGR o None si no se pudo leer, info como en normalize)
+    """
+    try:
+        with Image.open(path if isinstance(path, str) else io.BytesIO(path)) as header:
+            w, h = header.size
+    except OSError:
+        return None, None
+    info = {'scale': 1.0, 'text_height': None, 'original_size': (w, h)}
+
+    # Miniatura decodificada ya reducida, del orden de THUMB_SIZE
+    thumb_factor = max([f for f in (1, 2, 4, 8) if max(w, h) / f >= THUMB_SIZE] or [1])
+    thumb = decode(path, _REDUCED_GRAY[thumb_factor])
+    if thumb is None:
+        return None, None
+    if (thumb.shape[1] > thumb.shape[0]) != (w > h):
+        # OpenCV aplica la orientación EXIF y Pillow informa el tamaño sin rotar
+        w, h = h, w
+        info['original_size'] = (w, h)
+    # El resto hasta THUMB_SIZE con resize, para medir siempre a la misma escala
+    decoded_width = thumb.shape[1]
+    thumb, factor = _thumbnail(thumb)
+    text_height = estimate_text_height(thumb)
+    scale = 1.0
+    if text_height is not None:
+        info['text_height'] = text_height / factor * w / float(decoded_width)
+        scale = min(1.0, target_text_height / info['text_height'])
+
+    reduction = max(f for f in (1, 2, 4, 8) if 1.0 / f >= scale * REDUCED_TOLERANCE)
+    img = decode(path, _REDUCED_COLOR[reduction])
+    if img is None:
+        return None, None
+    if 1.0 / reduction > scale:
+        img = _resize(img, _target_size(w, h, scale))
+    info['scale'] = img.shape[1] / float(w)
+    return img, info
+
+def load_normalized(path, target_text_height, reader):
+    """
+    Lee una página y la normaliza, usando la decodificación reducida si es JPEG.
+
+    Args:
+        path: Ruta de la imagen o referencia de página ('archivo.pdf#p2'), los
+              bytes de una imagen (p. ej. un archivo subido) o la imagen ya decodificada
+        target_text_height: Alto objetivo de las letras en píxeles (0 = no normalizar)
+        reader: Función (path) -> página BGR o None para las rutas que no son JPEG
+
+    Returns:
+        tuple: (página BGR o None si no se pudo leer, info como en normalize)
+    """
+    if isinstance(path, np.ndarray):
+        return normalize(path, target_text_height)
+    if target_text_height > 0 and is_jpeg(path):
+        return read_normalized(path, target_text_height)
+    img = reader(path) if isinstance(path, str) else decode(path)
+    if img is None:
+        return None, None
+    return normalize(img, target_text_height)
+
+def to_original(points, info):
+    """
+    Lleva coordenadas de la página normalizada a la imagen original. Si la
+    página además se recortó (info['recorte'], ver recorte.py) o se enderezó
+    (info['rotacion'], la matriz de deskew), las coordenadas pueden ser las
+    de la página preprocesada: se deshace la rotación y se suma el recorte.
+    """
+    points = np.asarray(points, dtype=np.float32)
+    if info.get('rotacion') is not None:
+        inverse = cv2.invertAffineTransform(np.asarray(info['rotacion'], dtype=np.float32))
+        points = points @ inverse[:, :2].T + inverse[:, 2]
+    if info.get('recorte') is not None:
+        points = points + np.array(info['recorte'][:2], dtype=np.float32)
+    return points / info['scale']
@@ -0,0 +1,125 @@
+"""
+Reducción de ruido (denoising) con filtros intercambiables.
+
+Cada perfil elige el filtro en config.py ('denoise_method') y sus parámetros
+('denoise_params'); 'denoise_h' sigue siendo la fuerza del NLM y 0 desactiva
+la etapa. Todos los filtros reciben y devuelven una imagen en escala de grises
+(uint8) del mismo tamaño:
+
+    'nlm'       : Non-Local Means de OpenCV (el filtro original). Es el más
+                  caro: cada píxel se compara con todas las ventanas de
+                  'template_window' dentro de 'search_window'.
+    'nlm_tiled' : el mismo NLM repartido en franjas horizontales procesadas en
+                  paralelo por varios hilos. Las franjas se solapan lo que
+                  alcanza la vecindad del filtro, así que el resultado es
+                  idéntico al de 'nlm'. Sirve cuando OpenCV corre con un solo
+                  hilo; si ya paraleliza internamente no gana nada.
+    'median'    : mediana de 'ksize' x 'ksize'. Borra los puntos sueltos de
+                  una imagen binarizada casi sin costo.
+    'bilateral' : suaviza el fondo conservando los bordes (para páginas en
+                  escala de grises, sin binarizar).
+    'speckle'   : elimina las manchas de tinta de menos de 'min_area' píxeles
+                  (componentes conexos). Pensado para la imagen binarizada:
+                  no toca las letras, solo las motas aisladas.
+
+benchmarks/bench_ruido.py compara la latencia y el efecto en el OCR de cada uno.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+# Umbral para considerar tinta un píxel en 'speckle' (la imagen binarizada es 0/255)
+INK_THRESHOLD = 128
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _shared_executor():
+    """Hilos para 'nlm_tiled', creados una sola vez por proceso (OpenCV libera el GIL)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='nlm')
+        return _executor
+
+def denoise_nlm(img, h=20, template_window=7, search_window=21):
+    """Non-Local Means de OpenCV (ventanas por defecto: las de OpenCV, 7 y 21)."""
+    return cv2.fastNlMeansDenoising(img, h=h, templateWindowSize=template_window,
+                                    searchWindowSize=search_window)
+
+def denoise_nlm_tiled(img, h=20, template_window=7, search_window=21, tiles=None):
+    """
+    Non-Local Means por franjas en paralelo, con el mismo resultado que denoise_nlm.
+
+    Args:
+        tiles: Cantidad de franjas (por defecto, una por núcleo)
+    """
+    tiles = tiles or os.cpu_count() or 1
+    height = img.shape[0]
+    # Filas de las que depende cada píxel del resultado
+    margin = search_window // 2 + template_window // 2
+    tiles = max(1, min(tiles, height // max(1, 2 * margin)))
+    if tiles == 1:
+        return denoise_nlm(img, h, template_window, search_window)
+
+    bounds = np.linspace(0, height, tiles + 1).astype(int)
+
+    def run(i):
+        top, bottom = bounds[i], bounds[i + 1]
+        start, end = max(0, top - margin), min(height, bottom + margin)
+        strip = denoise_nlm(img[start:end], h, template_window, search_window)
+        return strip[top - start:top - start + bottom - top]
+
+    return np.vstack(list(_shared_executor().map(run, range(tiles))))
+
+def denoise_median(img, h=None, ksize=3):
+    """Filtro de mediana ('ksize' impar)."""
+    return cv2.medianBlur(img, ksize)
+
+def denoise_bilateral(img, h=None, d=5, sigma_color=50, sigma_space=50):
+    """Filtro bilateral: suaviza el fondo sin borronear los bordes de las letras."""
+    return cv2.bilateralFilter(img, d, sigma_color, sigma_space)
+
+def denoise_speckle(img, h=None, min_area=8):
+    """Pinta de blanco las manchas de tinta (componentes conexos) de menos de 'min_area' píxeles."""
+    ink = (img < INK_THRESHOLD).astype(np.uint8)
+    _, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    small = stats[:, cv2.CC_STAT_AREA] < min_area
+    small[0] = False  # El fondo
+    if not small.any():
+        return img
+    result = img.copy()
+    result[small[labels]] = 255
+    return result
+
+BACKENDS = {
+    'nlm': denoise_nlm,
+    'nlm_tiled': denoise_nlm_tiled,
+    'median': denoise_median,
+    'bilateral': denoise_bilateral,
+    'speckle': denoise_speckle,
+}
+
+def denoise(img, method='nlm', h=20, **params):
+    """
+    Reduce el ruido de una página con el filtro indicado.
+
+    Args:
+        img: Página en escala de grises o binarizada (uint8)
+        method: Filtro a usar (ver BACKENDS)
+        h: Fuerza del NLM (los demás filtros la ignoran)
+        **params: Parámetros propios del filtro (ventanas, ksize, min_area...)
+
+    Returns:
+        np.ndarray: Página filtrada, del mismo tamaño
+    """
+    try:
+        backend = BACKENDS[method]
+    except KeyError:
+        raise ValueError(f"Filtro de ruido desconocido: {method}. "
+                         f"Opciones: {', '.join(BACKENDS)}")
+    return backend(img, h, **params)
@@ -0,0 +1,82 @@
+"""
+Escritura incremental de las transcripciones combinadas (.txt y _RAW.txt).
+
+Cada página se agrega al archivo apenas termina, en lugar de acumular todo
+el texto de la carpeta en memoria. Se escribe sobre un archivo temporal en
+la misma carpeta y recién al final se reemplaza el .txt definitivo con un
+rename atómico, así que nunca queda a la vista un archivo a medio escribir.
+"""
+
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+class TranscriptWriter:
+    """
+    Escritor en streaming de un archivo de transcripción.
+
+    El formato es el mismo que se generaba antes: el encabezado seguido de una
+    sección "\\n\\n### archivo ###\\n\\n<texto>" por página.
+
+    Args:
+        path: Ruta final del archivo .txt
+        header: Encabezado del archivo
+    """
+
+    def __init__(self, path, header):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.sections = 0
+        self.committed = False
+        self._file = open(self.tmp_path, "w", encoding="utf-8")
+        self._file.write(header)
+
+    def write_section(self, filename, text):
+        """Agrega la sección de una página y la vuelca al disco."""
+        self._file.write(f"\n\n### {filename} ###\n\n" + text)
+        self._file.flush()
+        self.sections += 1
+
+    def commit(self):
+        """Cierra el temporal y lo publica reemplazando el archivo final."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+        self.committed = True
+
+    def abort(self):
+        """Descarta el temporal y deja intacto el archivo final anterior (si existía)."""
+        if self.committed:
+            return
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+def read_sections(path):
+    """
+    Lee las páginas de un .txt escrito por TranscriptWriter.
+
+    Returns:
+        list: Tuplas (archivo, texto) en el orden del archivo
+    """
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    # Cada sección empieza con "\n\n### archivo ###\n\n"; lo anterior es el encabezado
+    parts = re.split(r"\n\n### (.+?) ###\n\n", content)
+    return list(zip(parts[1::2], parts[2::2]))
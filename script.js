@@ -1,6 +1,9 @@
 // Configuración de la API - Cambiar esta URL al desplegar el backend
 const API_URL = 'http://localhost:5000';
 
+// Cada cuánto se consulta el avance de un trabajo (ms)
+const POLL_INTERVAL = 1500;
+
 // Estado de la aplicación
 let selectedFiles = [];
 
@@ -15,6 +18,7 @@ const resultsSection = document.getElementById('resultsSection');
 const errorSection = document.getElementById('errorSection');
 const resultText = document.getElementById('resultText');
 const errorText = document.getElementById('errorText');
+const loadingText = document.getElementById('loadingText');
 
 // Eventos del drop zone
 dropZone.addEventListener('click', () => fileInput.click());
@@ -40,7 +44,7 @@ fileInput.addEventListener('change', (e) => {
 
 // Manejar archivos seleccionados
 function handleFiles(files) {
-    const validExtensions = ['jpg', 'jpeg', 'png', 'bmp', 'tiff', 'tif'];
+    const validExtensions = ['jpg', 'jpeg', 'png', 'bmp', 'tiff', 'tif', 'pdf'];
     
     Array.from(files).forEach(file => {
         const ext = file.name.split('.').pop().toLowerCase();
@@ -100,6 +104,7 @@ processBtn.addEventListener('click', async () => {
     resultsSection.style.display = 'none';
     errorSection.style.display = 'none';
     loadingSection.style.display = 'block';
+    loadingText.textContent = 'Procesando imágenes... Por favor espera';
 
     const formData = new FormData();
     
@@ -115,17 +120,26 @@ processBtn.addEventListener('click', async () => {
     formData.append('language', language);
 
     try {
-        const response = await fetch(`${API_URL}/process`, {
+        // Crear el trabajo: el servidor responde enseguida con su id
+        const response = await fetch(`${API_URL}/jobs`, {
             method: 'POST',
             body: formData
         });
 
-        const data = await response.json();
+        const job = await response.json();
+
+        if (!response.ok) {
+            loadingSection.style.display = 'none';
+            showError(job.error || 'Error al procesar los archivos');
+            return;
+        }
+
+        const data = await waitForJob(job.job_id);
 
         loadingSection.style.display = 'none';
 
-        if (response.ok) {
-            showResults(data.text, data.filename);
+        if (data.ok) {
+            showResults(data.result.text, data.result.filename);
         } else {
             showError(data.error || 'Error al procesar los archivos');
         }
@@ -136,6 +150,28 @@ processBtn.addEventListener('click', async () => {
     }
 });
 
+// Consultar el avance de un trabajo hasta que termine
+async function waitForJob(jobId) {
+    while (true) {
+        const statusResponse = await fetch(`${API_URL}/jobs/${jobId}`);
+        const status = await statusResponse.json();
+
+        if (!statusResponse.ok) {
+            return { ok: false, error: status.error };
+        }
+
+        loadingText.textContent = `Procesando páginas... ${status.pages_done} de ${status.pages_total}`;
+
+        if (status.status === 'completado' || status.status === 'fallido') {
+            const resultResponse = await fetch(`${API_URL}/jobs/${jobId}/result`);
+            const result = await resultResponse.json();
+            return { ok: resultResponse.ok, result: result, error: result.error };
+        }
+
+        await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL));
+    }
+}
+
 // Mostrar resultados
 function showResults(text, filename) {
     resultsSection.style.display = 'block';
@@ -4,6 +4,7 @@ Script de prueba simple para verificar que la API funciona
 
 import requests
 import os
+import time
 
 # URL del servidor (cambiar si es necesario)
 API_URL = "http://localhost:5000"
@@ -89,6 +90,90 @@ def test_process():
         print(f"❌ Error: {e}")
         return False
 
+def test_jobs():
+    """Probar el flujo asíncrono: POST /jobs y consulta de avance"""
+    print("\n🔍 Probando /jobs...")
+    
+    test_image = None
+    for root, dirs, files in os.walk("image"):
+        for file in files:
+            if file.lower().endswith(('.jpg', '.jpeg', '.png')):
+                test_image = os.path.join(root, file)
+                break
+        if test_image:
+            break
+    
+    if not test_image:
+        print("⚠️  No se encontró ninguna imagen de prueba en la carpeta 'image/'")
+        return False
+    
+    try:
+        with open(test_image, 'rb') as f:
+            response = requests.post(f"{API_URL}/jobs", files={'files': f},
+                                     data={'profile': 'HISTORICOS', 'language': 'es'})
+        if response.status_code != 202:
+            print(f"❌ Error: Status code {response.status_code}")
+            return False
+        
+        job_id = response.json()['job_id']
+        print(f"   Trabajo creado: {job_id}")
+        
+        # Esperar a que termine (máximo 2 minutos)
+        for _ in range(120):
+            status = requests.get(f"{API_URL}/jobs/{job_id}").json()
+            if status['status'] in ('completado', 'fallido'):
+                break
+            time.sleep(1)
+        print(f"   Estado: {status['status']} ({status['pages_done']}/{status['pages_total']} páginas)")
+        
+        response = requests.get(f"{API_URL}/jobs/{job_id}/result")
+        if response.status_code == 200:
+            print("✅ Trabajo completado")
+            print(f"   Caracteres extraídos: {len(response.json().get('text', ''))}")
+            return True
+        else:
+            print(f"❌ Error: Status code {response.status_code}")
+            print(f"   Mensaje: {response.json()}")
+            return False
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+def test_metrics():
+    """Probar endpoint de métricas (formato Prometheus)"""
+    print("\n🔍 Probando /metrics...")
+    try:
+        response = requests.get(f"{API_URL}/metrics")
+        if response.status_code == 200 and "ocr_job_queue_depth" in response.text:
+            series = [l for l in response.text.splitlines() if l and not l.startswith('#')]
+            print(f"✅ Métricas disponibles: {len(series)} series")
+            return True
+        else:
+            print(f"❌ Error: Status code {response.status_code}")
+            return False
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+def test_search():
+    """Probar endpoint de búsqueda (usa el índice de las transcripciones de 'texto/')"""
+    print("\n🔍 Probando /search...")
+    try:
+        response = requests.get(f"{API_URL}/search", params={'q': 'documento'})
+        if response.status_code == 200:
+            result = response.json()
+            print(f"✅ Búsqueda en {result['time_ms']} ms: {len(result['results'])} resultado(s)")
+            for hit in result['results'][:3]:
+                print(f"   {hit['folder']}/{hit['page_name']}: {hit['snippet']}")
+            return True
+        else:
+            print(f"❌ Error: Status code {response.status_code}")
+            print(f"   Mensaje: {response.json()}")
+            return False
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
 def main():
     print("=" * 60)
     print("  OCR Transcriptor - Test de API")
@@ -101,6 +186,9 @@ def main():
     if health_ok:
         test_profiles()
         test_process()
+        test_jobs()
+        test_metrics()
+        test_search()
     
     print("\n" + "=" * 60)
     print("  Tests completados")
@@ -0,0 +1,76 @@
+"""
+Pruebas del recorte de márgenes (recorte.py) sobre páginas sintéticas.
+
+    python test_recorte.py
+"""
+
+import os
+import sys
+
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from documentos import TEXTOS, render_text
+from recorte import find_text_region
+
+DPI = 300
+
+def _page():
+    """Página A5 apaisada a 300 dpi con texto en negro y márgenes de 0.6 pulgadas."""
+    gray = render_text(TEXTOS['es'], DPI, 0)
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+def _punch_holes(page):
+    """Dos perforaciones de 6 mm en el margen izquierdo (sombras grises macizas)."""
+    h = page.shape[0]
+    for y in (h // 3, 2 * h // 3):
+        cv2.circle(page, (int(0.3 * DPI), y), int(0.125 * DPI), (60, 60, 60), -1, cv2.LINE_AA)
+    return int(0.3 * DPI + 0.125 * DPI)
+
+def _contains(region, box):
+    x, y, w, h = region
+    left, top, right, bottom = box
+    return x <= left and y <= top and x + w >= right and y + h >= bottom
+
+def test_punch_holes_are_cropped():
+    """Las perforaciones del margen quedan afuera del recorte."""
+    page = _page()
+    hole_right = _punch_holes(page)
+    region = find_text_region(page)
+    assert region is not None
+    assert region[0] > hole_right, f"El recorte {region} incluye las perforaciones"
+
+def test_filled_seal_in_corner_is_kept():
+    """Un sello macizo en la esquina es contenido de la página, no una perforación."""
+    page = _page()
+    _punch_holes(page)
+    h, w = page.shape[:2]
+    center, radius = (w - int(0.9 * DPI), h - int(0.9 * DPI)), int(0.2 * DPI)
+    cv2.circle(page, center, radius, (20, 20, 20), -1, cv2.LINE_AA)
+    seal = (center[0] - radius, center[1] - radius, center[0] + radius, center[1] + radius)
+    region = find_text_region(page)
+    assert region is None or _contains(region, seal), f"El recorte {region} deja afuera el sello {seal}"
+
+def test_square_stamp_in_margin_is_kept():
+    """Un sello cuadrado macizo en el margen no es redondo: no es una perforación."""
+    page = _page()
+    h, w = page.shape[:2]
+    stamp = (w - int(0.7 * DPI), h // 2, w - int(0.3 * DPI), h // 2 + int(0.4 * DPI))
+    cv2.rectangle(page, stamp[:2], stamp[2:], (40, 40, 40), -1)
+    region = find_text_region(page)
+    assert region is None or _contains(region, stamp), f"El recorte {region} deja afuera el sello {stamp}"
+
+def main():
+    fallidas = 0
+    for test in (test_punch_holes_are_cropped, test_filled_seal_in_corner_is_kept, test_square_stamp_in_margin_is_kept):
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+        except AssertionError as e:
+            fallidas += 1
+            print(f"❌ {test.__doc__}\n   {e}")
+    return fallidas
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+"""
+Trabajos OCR asíncronos para la API.
+
+POST /jobs guarda los archivos y crea un trabajo en un SQLite local; un
+grupo de hilos en segundo plano procesa las páginas y GET /jobs/<id>
+informa el avance. Como el estado vive en disco, los trabajos sobreviven a
+un reinicio del worker de gunicorn, y varios workers pueden compartir la
+misma cola: cada página se "toma" con una actualización atómica y un
+plazo (lease). Si un proceso muere con una página tomada, otro la retoma
+cuando vence el plazo.
+
+El módulo no sabe nada de OCR: recibe dos funciones desde app.py,
+process_page(ruta, trabajo) y finalize(trabajo, paginas), y opcionalmente
+split_pages(ruta), que divide un archivo subido en páginas (TIFF y PDF).
+"""
+
+import json
+import logging
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from werkzeug.utils import secure_filename
+
+logger = logging.getLogger(__name__)
+
+# Estados de un trabajo
+EN_COLA = 'en_cola'
+PROCESANDO = 'procesando'
+FINALIZANDO = 'finalizando'
+COMPLETADO = 'completado'
+FALLIDO = 'fallido'
+
+# Estados de una página
+PENDIENTE = 'pendiente'
+OK = 'ok'
+ERROR = 'error'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id TEXT PRIMARY KEY,
+    estado TEXT NOT NULL,
+    perfil TEXT NOT NULL,
+    idioma TEXT NOT NULL,
+    creado REAL NOT NULL,
+    actualizado REAL NOT NULL,
+    resultado TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS paginas (
+    trabajo_id TEXT NOT NULL,
+    indice INTEGER NOT NULL,
+    archivo TEXT NOT NULL,
+    ruta TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    tomado_por TEXT,
+    tomado_en REAL,
+    datos TEXT,
+    error TEXT,
+    PRIMARY KEY (trabajo_id, indice)
+);
+CREATE INDEX IF NOT EXISTS idx_paginas_estado ON paginas (estado);
+"""
+
+class JobManager:
+    """
+    Cola persistente de trabajos OCR con un grupo de hilos que la procesa.
+
+    Args:
+        db_path: Ruta del SQLite de trabajos
+        folder: Carpeta donde se guardan los archivos subidos de cada trabajo
+        process_page: Función (ruta, trabajo) -> datos JSON de la página
+        finalize: Función (trabajo, [(archivo, datos | None)]) -> resultado JSON
+        workers: Cantidad de hilos de procesamiento
+        lease_seconds: Plazo tras el cual una página tomada se considera abandonada
+        retention_hours: Horas que se conservan los trabajos terminados
+        split_pages: Función (ruta) -> rutas de sus páginas; cada una se encola
+                     como una página aparte (None = una página por archivo)
+    """
+
+    def __init__(self, db_path, folder, process_page, finalize, workers=2,
+                 lease_seconds=300, retention_hours=24, split_pages=None):
+        self.db_path = db_path
+        self.folder = folder
+        self.process_page = process_page
+        self.finalize = finalize
+        self.split_pages = split_pages
+        self.workers = max(1, int(workers))
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_hours * 3600
+        # Prefijo del token de cada toma (ver _claim_page): identifica el proceso en la base
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._last_purge = 0.0
+        os.makedirs(folder, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        # Una conexión por hilo, en modo autocommit (las transacciones son explícitas)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _connect(self):
+        return _Transaction(self._connection())
+
+    # ------------------------------------------------------------------
+    # API para app.py
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Arranca los hilos de procesamiento (una sola vez por proceso)."""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"ocr-jobs-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Cola de trabajos OCR iniciada con {self.workers} hilo(s)")
+
+    def create_job(self, profile, language, files):
+        """
+        Guarda los archivos subidos y encola un trabajo.
+
+        Args:
+            profile: Perfil de procesamiento
+            language: Idioma
+            files: Lista de FileStorage de Flask (ya validados por extensión y
+                   tamaño: la API descarta los que pasan el límite mientras los
+                   recibe, ver UploadStream en app.py)
+
+        Returns:
+            tuple: (id del trabajo o None si no quedó ningún archivo, páginas encoladas)
+        """
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.folder, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        paginas = []
+        for file in files:
+            filename = secure_filename(file.filename)
+            path = os.path.join(job_dir, f"{len(paginas):04d}_{filename}")
+            file.save(path)
+            if self.split_pages is None:
+                paginas.append((len(paginas), filename, path))
+                continue
+            try:
+                # 'doc.pdf#p2' en el avance del trabajo para la página 2 de doc.pdf
+                for ruta in self.split_pages(path):
+                    paginas.append((len(paginas), filename + ruta[len(path):], ruta))
+            except Exception as e:
+                logger.warning(f"No se pudo abrir {filename}: {e}")
+
+        if not paginas:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            return None, 0
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO trabajos (id, estado, perfil, idioma, creado, actualizado) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, EN_COLA, profile, language, now, now)
+            )
+            conn.executemany(
+                "INSERT INTO paginas (trabajo_id, indice, archivo, ruta, estado) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, indice, archivo, ruta, PENDIENTE) for indice, archivo, ruta in paginas]
+            )
+        logger.info(f"Trabajo {job_id} encolado con {len(paginas)} página(s)")
+        self._wakeup.set()
+        return job_id, len(paginas)
+
+    def get_status(self, job_id):
+        """
+        Estado de un trabajo con el avance de cada página.
+
+        Returns:
+            dict | None: Estado o None si el trabajo no existe
+        """
+        conn = self._connection()
+        job = conn.execute("SELECT * FROM trabajos WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        paginas = conn.execute(
+            "SELECT indice, archivo, estado, error FROM paginas WHERE trabajo_id = ? ORDER BY indice",
+            (job_id,)
+        ).fetchall()
+        return {
+            'job_id': job_id,
+            'status': job['estado'],
+            'profile': job['perfil'],
+            'language': job['idioma'],
+            'created': job['creado'],
+            'pages_total': len(paginas),
+            'pages_done': sum(1 for p in paginas if p['estado'] in (OK, ERROR)),
+            'pages_failed': sum(1 for p in paginas if p['estado'] == ERROR),
+            'pages': [{'filename': p['archivo'], 'status': p['estado'], 'error': p['error']} for p in paginas],
+            'error': job['error'],
+        }
+
+    def get_result(self, job_id):
+        """
+        Resultado de un trabajo terminado.
+
+        Returns:
+            tuple | None: (estado, resultado | None, error | None) o None si no existe
+        """
+        job = self._connection().execute(
+            "SELECT estado, resultado, error FROM trabajos WHERE id = ?", (job_id,)
+        ).fetchone()
+        if job is None:
+            return None
+        resultado = json.loads(job['resultado']) if job['resultado'] else None
+        return job['estado'], resultado, job['error']
+
+    def queue_depth(self):
+        """Cantidad de páginas pendientes o en proceso en toda la cola."""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM paginas WHERE estado IN (?, ?)", (PENDIENTE, PROCESANDO)
+        ).fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Procesamiento en segundo plano
+    # ------------------------------------------------------------------
+
+    def _worker_loop(self):
+        while True:
+            try:
+                if not self._process_next_page():
+                    self._finalize_ready_jobs()
+                    self._purge_expired()
+                    self._wakeup.wait(timeout=1.0)
+                    self._wakeup.clear()
+            except Exception as e:
+                logger.error(f"Error en la cola de trabajos: {e}", exc_info=True)
+                time.sleep(1.0)
+
+    def _claim_page(self):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT p.trabajo_id, p.indice, p.archivo, p.ruta, t.perfil, t.idioma "
+                "FROM paginas p JOIN trabajos t ON t.id = p.trabajo_id "
+                "WHERE p.estado = ? OR (p.estado = ? AND p.tomado_en < ?) "
+                "ORDER BY t.creado, p.indice LIMIT 1",
+                (PENDIENTE, PROCESANDO, now - self.lease_seconds)
+            ).fetchone()
+            if row is None:
+                return None
+            # Un token por toma: si vence el plazo y otro hilo (o este mismo
+            # proceso) retoma la página, el resultado tardío de esta toma se descarta
+            token = f"{self.worker_id}:{uuid.uuid4().hex}"
+            conn.execute(
+                "UPDATE paginas SET estado = ?, tomado_por = ?, tomado_en = ? WHERE trabajo_id = ? AND indice = ?",
+                (PROCESANDO, token, now, row['trabajo_id'], row['indice'])
+            )
+            conn.execute(
+                "UPDATE trabajos SET estado = ?, actualizado = ? WHERE id = ? AND estado = ?",
+                (PROCESANDO, now, row['trabajo_id'], EN_COLA)
+            )
+        return dict(row, token=token)
+
+    def _process_next_page(self):
+        page = self._claim_page()
+        if page is None:
+            return False
+        job = {'id': page['trabajo_id'], 'perfil': page['perfil'], 'idioma': page['idioma']}
+        logger.info(f"Trabajo {job['id']}: procesando {page['archivo']}")
+        try:
+            datos = self.process_page(page['ruta'], job)
+            estado, error, datos = OK, None, json.dumps(datos, ensure_ascii=False)
+        except Exception as e:
+            logger.error(f"Trabajo {job['id']}: error procesando {page['archivo']}: {e}")
+            estado, error, datos = ERROR, str(e), None
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE paginas SET estado = ?, datos = ?, error = ? "
+                "WHERE trabajo_id = ? AND indice = ? AND estado = ? AND tomado_por = ?",
+                (estado, datos, error, page['trabajo_id'], page['indice'], PROCESANDO, page['token'])
+            )
+        if cur.rowcount != 1:
+            logger.warning(f"Trabajo {job['id']}: {page['archivo']} se retomó al vencer el plazo; "
+                           "se descarta este resultado")
+        self._finalize_job(job['id'])
+        return True
+
+    def _finalize_ready_jobs(self):
+        # Trabajos con todas sus páginas terminadas (incluye finalizaciones interrumpidas)
+        rows = self._connection().execute(
+            "SELECT id FROM trabajos t WHERE (estado IN (?, ?) OR (estado = ? AND actualizado < ?)) "
+            "AND NOT EXISTS (SELECT 1 FROM paginas p WHERE p.trabajo_id = t.id AND p.estado IN (?, ?))",
+            (EN_COLA, PROCESANDO, FINALIZANDO, time.time() - self.lease_seconds, PENDIENTE, PROCESANDO)
+        ).fetchall()
+        for row in rows:
+            self._finalize_job(row['id'], force=True)
+
+    def _finalize_job(self, job_id, force=False):
+        now = time.time()
+        with self._connect() as conn:
+            pendientes = conn.execute(
+                "SELECT COUNT(*) FROM paginas WHERE trabajo_id = ? AND estado IN (?, ?)",
+                (job_id, PENDIENTE, PROCESANDO)
+            ).fetchone()[0]
+            if pendientes:
+                return
+            # Con force se retoman también finalizaciones interrumpidas (plazo vencido)
+            cur = conn.execute(
+                "UPDATE trabajos SET estado = ?, actualizado = ? WHERE id = ? "
+                "AND (estado IN (?, ?) OR (? AND estado = ? AND actualizado < ?))",
+                (FINALIZANDO, now, job_id, EN_COLA, PROCESANDO, int(force), FINALIZANDO, now - self.lease_seconds)
+            )
+            if cur.rowcount != 1:
+                return  # Otro hilo o proceso ya lo está finalizando
+            job = dict(conn.execute("SELECT id, perfil, idioma FROM trabajos WHERE id = ?", (job_id,)).fetchone())
+            paginas = [
+                (p['archivo'], json.loads(p['datos']) if p['datos'] else None)
+                for p in conn.execute(
+                    "SELECT archivo, datos FROM paginas WHERE trabajo_id = ? ORDER BY indice", (job_id,)
+                )
+            ]
+
+        try:
+            resultado = self.finalize(job, paginas)
+            estado, error, resultado = COMPLETADO, None, json.dumps(resultado, ensure_ascii=False)
+            logger.info(f"Trabajo {job_id} completado")
+        except Exception as e:
+            logger.error(f"Trabajo {job_id} fallido: {e}")
+            estado, error, resultado = FALLIDO, str(e), None
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE trabajos SET estado = ?, resultado = ?, error = ?, actualizado = ? WHERE id = ?",
+                (estado, resultado, error, time.time(), job_id)
+            )
+        # Los archivos subidos ya no hacen falta
+        shutil.rmtree(os.path.join(self.folder, job_id), ignore_errors=True)
+
+    def _purge_expired(self):
+        now = time.time()
+        if now - self._last_purge < 600:
+            return
+        self._last_purge = now
+        with self._connect() as conn:
+            viejos = [r['id'] for r in conn.execute(
+                "SELECT id FROM trabajos WHERE estado IN (?, ?) AND actualizado < ?",
+                (COMPLETADO, FALLIDO, now - self.retention_seconds)
+            )]
+            for job_id in viejos:
+                conn.execute("DELETE FROM paginas WHERE trabajo_id = ?", (job_id,))
+                conn.execute("DELETE FROM trabajos WHERE id = ?", (job_id,))
+        for job_id in viejos:
+            shutil.rmtree(os.path.join(self.folder, job_id), ignore_errors=True)
+        if viejos:
+            logger.info(f"Se eliminaron {len(viejos)} trabajo(s) vencidos")
+
+class _Transaction:
+    """Transacción SQLite con BEGIN IMMEDIATE, segura entre procesos."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False